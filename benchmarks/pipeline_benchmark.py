@@ -0,0 +1,92 @@
+"""
+Пропускная способность всего конвейера (ApiQuery -> Filter -> Downloader ->
+Converter) на локальном сервере FakeYoutube, без обращения к YouTube.
+
+Запуск из корня проекта:
+    python -m benchmarks.pipeline_benchmark [-n 50] [-w 4] [--latency 0.05]
+
+Паузы регулятора темпа между загрузками по умолчанию отключены (--pacing их
+включает), лимит скорости регулятора действует как обычно. Остальные настройки
+берутся из .env.example и переопределяются параметрами -s, например
+-s STREAM_CONVERT=TRUE -s CONVERT_WORKERS=2.
+"""
+import io
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+from contextlib import ExitStack, redirect_stderr, redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import scripts  # noqa: E402
+from test.fake_youtube import FakeYoutube, make_videos, offline_environment  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--videos", type=int, default=50, help="Количество видео")
+    parser.add_argument("-d", "--duration", type=int, default=30,
+                        help="Длительность аудио, с")
+    parser.add_argument("-w", "--workers", type=int, default=4,
+                        help="DOWNLOAD_WORKERS")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Задержка каждого ответа сервера, с")
+    parser.add_argument("--throughput", type=int, default=0,
+                        help="Скорость отдачи аудио, КиБ/с (0 - без ограничения)")
+    parser.add_argument("--fail-429", type=int, default=0,
+                        help="Сколько запросов к API получат 429")
+    parser.add_argument("--fail-403", type=int, default=0,
+                        help="Сколько загрузок аудио получат 403")
+    parser.add_argument("--pacing", action="store_true",
+                        help="Не отключать паузы регулятора темпа")
+    parser.add_argument("-s", "--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="Переменная настроек, как в .env")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Вывод загрузчика")
+    args = parser.parse_args()
+
+    settings = dict(item.split("=", 1) for item in args.set)
+    settings.setdefault("DOWNLOAD_WORKERS", str(args.workers))
+
+    if not args.verbose:
+        logging.getLogger().disabled = True
+        logging.getLogger('yt-dlp').disabled = True
+
+    fake = FakeYoutube(audio_seconds=args.duration, latency=args.latency,
+                       throughput=args.throughput * 1024 or None)
+    playlist_id = fake.add_playlist("Benchmark", make_videos(args.videos))
+    if args.fail_429:
+        fake.fail(fake.api_path, 429, times=args.fail_429, retry_after=0)
+    if args.fail_403:
+        fake.fail("/media/", 403, times=args.fail_403)
+
+    with fake, tempfile.TemporaryDirectory() as tmp_dir:
+        with offline_environment(fake, tmp_dir, pacing=args.pacing, **settings):
+            start = time.perf_counter()
+            with ExitStack() as output:
+                if not args.verbose:
+                    # yt-dlp пишет прогресс и предупреждения напрямую в консоль
+                    output.enter_context(redirect_stdout(io.StringIO()))
+                    output.enter_context(redirect_stderr(io.StringIO()))
+                scripts.download_audio(
+                    f"https://www.youtube.com/playlist?list={playlist_id}")
+            elapsed = time.perf_counter() - start
+
+        save_path = os.path.join(tmp_dir, "downloads", "Benchmark")
+        files = [name for name in os.listdir(save_path) if name.endswith(".opus")] \
+            if os.path.isdir(save_path) else []
+
+    api_calls = sum(count for name, count in fake.hits.items()
+                    if name not in ("watch", "manifest", "media", "thumb", "fault"))
+    print(f"Videos:      {len(files)} of {args.videos} in {elapsed:.2f}s "
+          f"({len(files) / elapsed:.2f}/s)")
+    print(f"Audio:       {fake.hits['media']} request(s), "
+          f"{fake.bytes_sent / 1024 / 1024 / elapsed:.2f} MiB/s served")
+    print(f"API:         {api_calls} request(s), injected errors: {fake.hits['fault']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Сравнение встроенного ремуксера WebM -> Ogg Opus с ffmpeg (-c:a copy).
+
+Запуск из корня проекта:
+    python -m benchmarks.remux_benchmark [файл.webm] [-n 10]
+
+Без файла тестовый трек генерируется ffmpeg (синус, libopus, 10 минут).
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.converter.webm_remuxer import remux_webm_to_opus  # noqa: E402
+
+
+def generate_webm(path: str, duration: int) -> None:
+    subprocess.run(
+        ["ffmpeg", "-y", "-v", "error", "-f", "lavfi",
+         "-i", f"sine=frequency=440:duration={duration}", "-ac", "2",
+         "-c:a", "libopus", "-b:a", "160k", path],
+        check=True
+    )
+
+
+def remux_ffmpeg(input_path: str, output_path: str) -> None:
+    subprocess.run(
+        ["ffmpeg", "-y", "-v", "error", "-i", input_path, "-c:a", "copy", output_path],
+        check=True
+    )
+
+
+def measure(func, input_path: str, output_path: str, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(input_path, output_path)
+        timings.append(time.perf_counter() - start)
+        os.remove(output_path)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", nargs="?", help="Исходный файл .webm с Opus")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Количество повторов")
+    parser.add_argument("-d", "--duration", type=int, default=600,
+                        help="Длительность сгенерированного трека, с")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = args.file
+        if input_path is None:
+            input_path = os.path.join(tmp_dir, "bench.webm")
+            generate_webm(input_path, args.duration)
+        output_path = os.path.join(tmp_dir, "bench.opus")
+        size_mb = os.path.getsize(input_path) / 1024 / 1024
+
+        print(f"Input: {input_path} ({size_mb:.1f} MiB), best of {args.runs} runs")
+        for name, func in (("native", remux_webm_to_opus), ("ffmpeg", remux_ffmpeg)):
+            best = measure(func, input_path, output_path, args.runs)
+            print(f"{name:>8}: {best * 1000:8.1f} ms  {size_mb / best:8.1f} MiB/s  "
+                  f"{1 / best:6.1f} files/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,14 @@ import argparse
 from src.config.app_config import get_config
 from src.config.logging_config import load_logger_config
 from src.utils import open_settings
-from src.scripts import download_audio
+from src.scripts import (
+    download_audio,
+    download_batch,
+    download_links_file,
+    migrate_library,
+    print_quota_report
+)
+from src.quota import get_quota_ledger
 
 
 def main():
@@ -24,18 +31,35 @@ def main():
             "  ./run.sh https://www.youtube.com/watch?v=6OaTvs07k5U\n\n"
             "  # Download audio from a playlist (Limit 10000 API requests/day)\n"
             "  ./run.sh https://youtube.com/playlist?list=PL-adxGZ1y-OXzOAXG5gB0pF5g5Pw7jBEG\n\n"
-            "  # Download audio from a channel (Limit 100 API requests/day)\n"
-            "  ./run.sh https://www.youtube.com/@808nation\n"
+            "  # Download audio from a channel (Limit 10000 API requests/day)\n"
+            "  ./run.sh https://www.youtube.com/@808nation\n\n"
+            "  # Download several links at once, or links listed in a file\n"
+            "  ./run.sh https://www.youtube.com/@808nation https://youtu.be/6OaTvs07k5U\n"
+            "  ./run.sh --file links.txt\n\n"
+            "  # Show today's API quota usage by job and endpoint\n"
+            "  ./run.sh --quota-report\n\n"
+            "  # Re-encode already downloaded files to AUDIO_EXT from the settings\n"
+            "  ./run.sh --migrate ~/Music/YouTube\n"
         ),
         formatter_class=argparse.RawTextHelpFormatter  # Сохраняет форматирование текста
     )
 
-    # Добавляем аргумент для URL видео, плейлиста или канала
+    # Добавляем аргумент для URL видео, плейлистов или каналов
     parser.add_argument(
-        'url',
+        'urls',
         type=str,
-        nargs='?',
-        help="URL of the YouTube video, playlist, or channel to download."
+        nargs='*',
+        metavar='url',
+        help="URLs of the YouTube videos, playlists, or channels to download."
+    )
+
+    # Добавляем аргумент для файла со списком ссылок
+    parser.add_argument(
+        '-f', '--file',
+        type=str,
+        metavar='FILE',
+        help="Download all links from FILE (one per line, lines starting with #\n"
+             "are ignored) together with the URLs given on the command line."
     )
 
     # Добавляем аргумент для открытия файла конфигурации
@@ -45,15 +69,53 @@ def main():
         help="Open the .env file in the default console editor."
     )
 
+    # Добавляем аргумент для перекодирования уже скачанной библиотеки
+    parser.add_argument(
+        '-m', '--migrate',
+        type=str,
+        metavar='DIR',
+        help="Re-encode all downloaded files in DIR to AUDIO_EXT from the settings,\n"
+             "carrying over tags and cover art. Source files are replaced.\n"
+             "Already converted files are skipped, so the command can be resumed."
+    )
+
+    # Добавляем аргументы для журнала квоты API
+    parser.add_argument(
+        '-j', '--job',
+        type=str,
+        default="default",
+        metavar='NAME',
+        help="Job name under which API quota usage of this run is recorded."
+    )
+    parser.add_argument(
+        '-q', '--quota-report',
+        type=str,
+        nargs='?',
+        const="",
+        metavar='DAY',
+        help="Show API quota usage by job and endpoint for DAY (YYYY-MM-DD,\n"
+             "Pacific time), today by default."
+    )
+
     # Разбираем аргументы
     args = parser.parse_args()
+    get_quota_ledger().job = args.job
 
     # Если указан флаг -s, открываем файл .env
     if args.settings:
         open_settings()
-    elif args.url:
+    elif args.quota_report is not None:
+        print_quota_report(args.quota_report or None)
+    elif args.migrate:
+        migrate_library(args.migrate)
+    elif args.file:
+        download_links_file(args.file, args.urls)
+    elif len(args.urls) == 1:
         # Вызываем функцию для загрузки аудио
-        download_audio(args.url)
+        download_audio(args.urls[0])
+    elif args.urls:
+        # Несколько ссылок скачиваются одной общей очередью
+        download_batch(args.urls)
     else:
         parser.print_help()
 
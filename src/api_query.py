@@ -1,9 +1,20 @@
 import logging
-from typing import Dict, List, Optional
-from urllib.parse import urlparse
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
 
 import requests
 from .config.app_config import get_config
+from .handle_cache import HandleCache
+from .proxy_pool import get_proxy_pool
+from .quota import get_quota_ledger
+from .response_cache import ResponseCache
+from .transport import HttpTransport
+
+
+# Ссылка на видео по его ID. Офлайн-тесты и бенчмарки подменяют ее на
+# локальный сервер, чтобы загрузчик не обращался к YouTube.
+VIDEO_URL = "https://www.youtube.com/watch?v={}"
 
 
 class ApiQuery:
@@ -12,7 +23,21 @@ class ApiQuery:
         self._logger = logging.getLogger()
         self._api_key_yt = self._config.api.yt_token
         self._endpoint = self._config.api.endpoint
-        self._proxy = self._parse_proxy(self._config.extended.proxy)
+        self._transport = HttpTransport(
+            read_timeout=self._config.performance.api_timeout,
+            retries=self._config.performance.api_retries
+        )
+        self._response_cache = ResponseCache()
+        self._handle_cache = HandleCache()
+        self._quota = get_quota_ledger()
+        # Первые страницы плейлистов загрузок, уже полученные при проверке
+        # хэндла из кэша: их запрос из _iter_pages не повторяется
+        self._prefetched: Dict[str, Dict] = {}
+        # Запросы к API распределяются по тому же пулу прокси, что и загрузки
+        self._proxy_pool = get_proxy_pool()
+        self._proxies = {
+            proxy_url: self._parse_proxy(proxy_url) for proxy_url in self._proxy_pool.urls
+        }
 
     def _parse_proxy(self, proxy_url: str) -> Optional[Dict[str, str]]:
         """Парсит прокси URL и возвращает словарь для requests."""
@@ -23,12 +48,67 @@ class ApiQuery:
 
         if proxy_scheme not in {"http", "https", "socks4", "socks5"}:
             raise ValueError(f"Unsupported proxy scheme: {proxy_scheme}")
-        return {proxy_scheme: proxy_url}
+        return {"http": proxy_url, "https": proxy_url}
 
     def _make_request(self, url: str, params: Dict) -> Optional[Dict]:
-        """Выполняет запрос к API и обрабатывает результат."""
+        """
+        Выполняет запрос к API через самый здоровый прокси пула. Квота
+        резервируется и записывается в журнал для каждой HTTP-попытки, включая
+        повторы транспорта и повторный запрос после 304.
+
+        :raises QuotaExceeded: Если очередная попытка превысила бы бюджет квоты.
+        """
+        prefetched = self._prefetched.pop(self._response_cache.make_key(url, params), None)
+        if prefetched is not None:
+            return prefetched
+
+        endpoint = url.rstrip('/').rsplit('/', 1)[-1]
+        proxy_url = self._proxy_pool.acquire()
+        if proxy_url is None:
+            self._logger.error("API request skipped: all proxies are in the bot block.")
+            return None
+
+        try:
+            return self._send_request(url, params, proxy_url, endpoint)
+        finally:
+            self._proxy_pool.release(proxy_url)
+
+    def _record_attempt(
+        self, endpoint: str, response: Optional[requests.Response], latency: float
+    ) -> None:
+        """Записывает одну HTTP-попытку в журнал квоты, 304 - ответ из кэша."""
+        if response is None:
+            self._quota.record(endpoint, latency, 0, False, 0)
+            return
+        self._quota.record(endpoint, latency, len(response.content),
+                           response.status_code == 304, response.status_code)
+
+    def _send_request(
+        self, url: str, params: Dict, proxy_url: str, endpoint: str
+    ) -> Optional[Dict]:
+        # Условный запрос: если ответ не изменился, сервер вернет 304 без тела
+        cache_key = self._response_cache.make_key(url, params)
+        cached = self._response_cache.get(cache_key)
+        headers = {'If-None-Match': cached[0]} if cached else None
+
+        quota_hooks = {
+            'before_attempt': partial(self._quota.reserve, endpoint),
+            'after_attempt': partial(self._record_attempt, endpoint)
+        }
+
         try:
-            response = requests.get(url, params=params, proxies=self._proxy)
+            response = self._transport.get(url, params=params,
+                                           proxies=self._proxies[proxy_url],
+                                           headers=headers, **quota_hooks)
+            if response.status_code == 304 and cached:
+                data = self._response_cache.touch(cache_key)
+                if data is not None:
+                    return data
+                # Запись успели вытеснить, запрашиваем заново без ETag
+                response = self._transport.get(url, params=params,
+                                               proxies=self._proxies[proxy_url],
+                                               **quota_hooks)
+
             if response.status_code != 200:
                 self._logger.error(
                     f"API request failed. Status code: {response.status_code}, "
@@ -36,13 +116,18 @@ class ApiQuery:
                 )
                 return None  # Возвращаем None при неудачном статусе
 
-            return response.json()  # Возвращаем результат при успешном запросе
+            data = response.json()
+            self._response_cache.put(
+                cache_key, response.headers.get('ETag') or data.get('etag', ''), data)
+            return data  # Возвращаем результат при успешном запросе
 
         except requests.ConnectionError:
+            self._proxy_pool.report_failure(proxy_url)
             self._logger.error("Connection error: There may be problems with the Internet.")
             return None
 
         except requests.Timeout:
+            self._proxy_pool.report_failure(proxy_url)
             self._logger.error("Request timed out: The server did not respond on time.")
             return None
 
@@ -50,34 +135,48 @@ class ApiQuery:
             self._logger.error(f"API request error: {e}")
             return None
 
-    def _process_pagination(
-        self, url: str, params: Dict, process_func
-    ) -> List[Dict[str, str]]:
-        """Обрабатывает пагинацию и возвращает обработанные данные."""
-        results = []
+    def _iter_pages(
+        self, url: str, params: Dict, process_func, paging: Optional[Dict] = None
+    ) -> Iterator[List[Dict[str, str]]]:
+        """
+        Обрабатывает пагинацию и отдает обработанные данные постранично.
 
+        :param paging: (Optional[Dict]) Сюда записывается 'complete': True, если
+            получен ответ без nextPageToken. Если запрос страницы не удался,
+            страницы просто заканчиваются, и отличить это от конца плейлиста
+            можно только по этому признаку.
+        """
         while True:
             data = self._make_request(url, params)
             if not data:
                 break
 
             # Обработка данных на странице
-            processed_items = process_func(data)
-            results.extend(processed_items)
+            yield process_func(data)
 
             # Проверяем наличие токена для следующей страницы
             next_page_token = data.get('nextPageToken')
             if next_page_token:
                 params['pageToken'] = next_page_token
             else:
+                if paging is not None:
+                    paging['complete'] = True
                 break
 
+    def _process_pagination(
+        self, url: str, params: Dict, process_func
+    ) -> List[Dict[str, str]]:
+        """Обрабатывает пагинацию и возвращает обработанные данные."""
+        results = []
+        for processed_items in self._iter_pages(url, params, process_func):
+            results.extend(processed_items)
         return results
 
     def get_playlist_info(self, playlist_id: str) -> Optional[Dict[str, str]]:
         params = {
             'part': 'snippet',
             'id': playlist_id,
+            'fields': 'items/snippet(title,publishedAt,channelId)',
             'key': self._api_key_yt
         }
 
@@ -99,33 +198,56 @@ class ApiQuery:
 
     def get_channel_info(self, handle: str) -> Optional[Dict[str, str]]:
         """
-        Возвращает словарь с информацией о канале, включая количество видео и плейлист загрузок.
+        Возвращает словарь с информацией о канале, включая плейлист загрузок.
+        Хэндл ищется через channels.list?forHandle (1 единица квоты вместо 100
+        у search.list и точное совпадение вместо поиска), а результат
+        запоминается. Для хэндла из кэша запрашивается первая страница его
+        плейлиста загрузок (она все равно понадобится для загрузки): если
+        плейлиста больше нет или он пуст, хэндл мог перейти к другому каналу,
+        и он ищется заново.
+
         :param handle: (str) Хэндл канала, начиная с '@'.
             Пример: handle: "@808nation"
         """
-        search_params = {
-            'part': 'snippet',
-            'q': handle,
-            'type': 'channel',
+        # Ссылка вида youtube.com/@handle/videos
+        handle = unquote(handle.split('/')[0].split('?')[0])
+        info = self._handle_cache.get(handle)
+        if info is not None:
+            url, params = self._playlist_items_request(info['uploads'])[:2]
+            first_page = self._make_request(url, params)
+            if first_page and first_page.get('items'):
+                self._prefetched[self._response_cache.make_key(url, params)] = first_page
+                self._logger.info(f"Channel info retrieved from cache: {info['title']}")
+                return info
+            self._logger.warning(
+                f"Cached uploads playlist of {handle} is unavailable, resolving the handle again.")
+            self._handle_cache.invalidate(handle)
+
+        params = {
+            'part': 'snippet,contentDetails',
+            'forHandle': handle,
+            'fields': 'items(id,snippet(title,publishedAt),'
+                      'contentDetails/relatedPlaylists/uploads)',
             'key': self._api_key_yt
         }
-        search_url = f"{self._endpoint}/search"
-        data = self._make_request(search_url, search_params)
+        url = f"{self._endpoint}/channels"
+        data = self._make_request(url, params)
 
         if not data or 'items' not in data or not data['items']:
             self._logger.error(f"No channel found for handle: {handle}")
             return None
 
-        channel_id = data['items'][0]['snippet']['channelId']
-        uploads_playlist_id = 'UU' + channel_id[2:]
-        channel_info = data['items'][0]['snippet']
+        item = data['items'][0]
+        uploads_playlist_id = item.get('contentDetails', {}) \
+            .get('relatedPlaylists', {}).get('uploads') or 'UU' + item['id'][2:]
 
         info = {
-            'title': channel_info['title'],
-            'publishedAt': channel_info['publishedAt'],
-            'channelId': channel_id,
+            'title': item['snippet']['title'],
+            'publishedAt': item['snippet']['publishedAt'],
+            'channelId': item['id'],
             'uploads': uploads_playlist_id
         }
+        self._handle_cache.put(handle, info)
 
         self._logger.info(f"Channel info retrieved: {info['title']}")
         return info
@@ -135,6 +257,7 @@ class ApiQuery:
         params = {
             'part': 'snippet',
             'id': video_id,
+            'fields': 'items/snippet(title,publishedAt)',
             'key': self._api_key_yt
         }
 
@@ -146,20 +269,47 @@ class ApiQuery:
         snippet = data['items'][0]['snippet']
         return [{
             'title': snippet['title'],
-            'url': f"https://www.youtube.com/watch?v={video_id}",
+            'url': VIDEO_URL.format(video_id),
             'published': snippet['publishedAt'],
+            'video_id': video_id,
         }]
 
-    def get_playlist_snippets(
-        self,
-        playlist_id: str,
-    ) -> List[Dict[str, str]]:
+    def get_videos_status(self, video_ids: List[str]) -> Optional[Dict[str, Dict]]:
+        """
+        Запрашивает длительность, статус и региональные ограничения видео
+        пачками по 50 ID (1 единица квоты на пачку).
 
+        :param video_ids: (List[str]) ID видео.
+        :return: (Optional[Dict[str, Dict]]) Словарь ID -> {'contentDetails',
+            'status'}. Удаленных и приватных видео в нем нет. None, если
+            запрос не удался.
+        """
+        url = f"{self._endpoint}/videos"
+        result = {}
+        for i in range(0, len(video_ids), 50):
+            params = {
+                'part': 'contentDetails,status',
+                'id': ','.join(video_ids[i:i + 50]),
+                'maxResults': 50,
+                'fields': 'items(id,contentDetails(duration,regionRestriction),'
+                          'status(uploadStatus,privacyStatus))',
+                'key': self._api_key_yt
+            }
+            data = self._make_request(url, params)
+            if data is None:
+                return None
+            for item in data.get('items', []):
+                result[item['id']] = item
+        return result
+
+    def _playlist_items_request(self, playlist_id: str):
         url = f"{self._endpoint}/playlistItems"
         params = {
             'part': 'snippet',
             'playlistId': playlist_id,
             'maxResults': 50,
+            # Частичный ответ: только поля, которые реально читаются
+            'fields': 'nextPageToken,items/snippet(title,publishedAt,resourceId/videoId)',
             'key': self._api_key_yt
         }
 
@@ -170,9 +320,81 @@ class ApiQuery:
                 videoId = snippet['resourceId']['videoId']
                 items.append({
                     'title': snippet['title'],
-                    'url': f"https://www.youtube.com/watch?v={videoId}",
+                    'url': VIDEO_URL.format(videoId),
                     'published': snippet['publishedAt'],
+                    'video_id': videoId,
                 })
             return items
 
-        return self._process_pagination(url, params, process_func)
+        return url, params, process_func
+
+    def get_playlist_snippets(
+        self,
+        playlist_id: str,
+    ) -> List[Dict[str, str]]:
+        return self._process_pagination(*self._playlist_items_request(playlist_id))
+
+    def iter_playlist_snippets(
+        self,
+        playlist_id: str,
+        stop_at: Optional[Tuple[str, str]] = None,
+        min_published: Optional[str] = None,
+        paging: Optional[Dict] = None
+    ) -> Iterator[List[Dict[str, str]]]:
+        """
+        Отдает элементы плейлиста постранично, по мере получения страниц из API,
+        чтобы загрузка могла начаться сразу после первой страницы.
+
+        Параметры остановки подходят только для плейлиста загрузок канала,
+        который отсортирован от новых к старым.
+
+        :param playlist_id: (str) ID плейлиста.
+        :param stop_at: (Optional[Tuple[str, str]]) ID и дата публикации уже
+            известного видео (инкрементальная синхронизация). Чтение страниц
+            прекращается на этом видео или на первом более старом.
+        :param min_published: (Optional[str]) Самая ранняя нужная дата публикации
+            (нижняя граница FILTER_DATE). Чтение прекращается на первом более
+            старом видео.
+        :param paging: (Optional[Dict]) Сюда записывается 'complete': True, если
+            плейлист прочитан до конца или до уже синхронизированных видео, и
+            'trimmed': True, если чтение остановила граница min_published.
+        """
+        if paging is None:
+            paging = {}
+        pages = self._iter_pages(*self._playlist_items_request(playlist_id), paging)
+        if stop_at is None and min_published is None:
+            return pages
+
+        def is_old(item: Dict[str, str]) -> Optional[str]:
+            # Даты в формате ISO 8601 UTC сравниваются как строки
+            if stop_at is not None and (item['video_id'] == stop_at[0] or
+                                        item['published'] < stop_at[1]):
+                # Дальше только то, что уже было синхронизировано полностью
+                paging['complete'] = True
+                return "reached already synced videos"
+            if min_published is not None and item['published'] < min_published:
+                # Остаток плейлиста не прочитан, хотя он и не синхронизирован
+                paging['trimmed'] = True
+                return "the rest is older than FILTER_DATE allows"
+            return None
+
+        return self._iter_until(pages, is_old)
+
+    def _iter_until(
+        self,
+        pages: Iterator[List[Dict[str, str]]],
+        is_old: Callable[[Dict[str, str]], Optional[str]]
+    ) -> Iterator[List[Dict[str, str]]]:
+        """
+        Отдает страницы до первого элемента, для которого is_old возвращает
+        причину остановки. Следующие страницы не запрашиваются.
+        """
+        for page_number, page in enumerate(pages, start=1):
+            for i, item in enumerate(page):
+                reason = is_old(item)
+                if reason:
+                    self._logger.info(
+                        f"Stopped paging after {page_number} page(s): {reason}.")
+                    yield page[:i]
+                    return
+            yield page
@@ -8,6 +8,7 @@ from threading import Lock
 class Api:
     yt_token: str
     endpoint: str
+    quota_budget: int
 
 
 @dataclass
@@ -28,6 +29,33 @@ class Extended:
     filter_date: str
     filter_downloaded_recursive: bool
     proxy: str
+    proxy_file: str
+    state_directory: str
+    region_code: str
+
+
+@dataclass
+class Performance:
+    download_workers: int
+    convert_workers: int
+    pipeline_queue_size: int
+    info_cache_ttl: int
+    info_cache_size_mb: int
+    stream_convert: bool
+    segmented_download: int
+    segmented_min_size_mb: int
+    native_remux: bool
+    single_pass: bool
+    cover_cache_size_mb: int
+    ffmpeg_timeout: int
+    ffmpeg_stall_timeout: int
+    api_timeout: int
+    api_retries: int
+    preflight_check: bool
+    api_cache_ttl: int
+    api_cache_size_mb: int
+    incremental_sync: bool
+    resolve_workers: int
 
 
 @dataclass
@@ -35,6 +63,7 @@ class Config:
     api: Api
     download: Download
     extended: Extended
+    performance: Performance
 
 
 class ConfigManager:
@@ -46,7 +75,8 @@ class ConfigManager:
         cls._instance = Config(
             api=Api(
                 yt_token=env.str("API_KEY_YOUTUBE"),
-                endpoint=env.str("ENDPOINT")
+                endpoint=env.str("ENDPOINT"),
+                quota_budget=env.int("QUOTA_BUDGET", 0)
             ),
             download=Download(
                 write_thumbnail=env.bool("WRITE_THUMBNAIL", True),
@@ -62,7 +92,32 @@ class ConfigManager:
                 debug_mode=env.bool("DEBUG_MODE", False),
                 filter_date=env.str("FILTER_DATE") or "",
                 filter_downloaded_recursive=env.bool("FILTER_DOWNLOADED_RECURSIVE") or False,
-                proxy=env.str("PROXY") or ""
+                proxy=env.str("PROXY") or "",
+                proxy_file=env.str("PROXY_FILE", "") or "",
+                state_directory=env.str("STATE_DIRECTORY", "") or ".state",
+                region_code=(env.str("REGION_CODE", "") or "").upper()
+            ),
+            performance=Performance(
+                download_workers=env.int("DOWNLOAD_WORKERS", 1),
+                convert_workers=env.int("CONVERT_WORKERS", 0),
+                pipeline_queue_size=env.int("PIPELINE_QUEUE_SIZE", 4),
+                info_cache_ttl=env.int("INFO_CACHE_TTL", 3600),
+                info_cache_size_mb=env.int("INFO_CACHE_SIZE_MB", 64),
+                stream_convert=env.bool("STREAM_CONVERT", False),
+                segmented_download=env.int("SEGMENTED_DOWNLOAD", 0),
+                segmented_min_size_mb=env.int("SEGMENTED_MIN_SIZE_MB", 32),
+                native_remux=env.bool("NATIVE_REMUX", True),
+                single_pass=env.bool("SINGLE_PASS", False),
+                cover_cache_size_mb=env.int("COVER_CACHE_SIZE_MB", 32),
+                ffmpeg_timeout=env.int("FFMPEG_TIMEOUT", 1800),
+                ffmpeg_stall_timeout=env.int("FFMPEG_STALL_TIMEOUT", 120),
+                api_timeout=env.int("API_TIMEOUT", 20),
+                api_retries=env.int("API_RETRIES", 4),
+                preflight_check=env.bool("PREFLIGHT_CHECK", True),
+                api_cache_ttl=env.int("API_CACHE_TTL", 604800),
+                api_cache_size_mb=env.int("API_CACHE_SIZE_MB", 64),
+                incremental_sync=env.bool("INCREMENTAL_SYNC", True),
+                resolve_workers=env.int("RESOLVE_WORKERS", 8)
             )
         )
 
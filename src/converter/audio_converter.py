@@ -1,10 +1,15 @@
 import os
-import subprocess
+import time
 import logging
-from typing import Tuple
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from ..entities import AudioExt
 from ..config.app_config import get_config
+from .bitrate_probe import BitrateProbe
+from .ffmpeg_runner import FFmpegRunner
+from .image_embedder import ImageEmbedder
+from .webm_remuxer import WebmError, remux_webm_to_opus
 
 
 class AudioConverter:
@@ -21,6 +26,12 @@ class AudioConverter:
         self._config = get_config()
         self._yt_dlp_logger = logging.getLogger('yt-dlp')
         self._audio_ext = self._config.download.audio_ext
+        self._native_remux = self._config.performance.native_remux
+        self._bitrate_probe = BitrateProbe()
+        self._ffmpeg = FFmpegRunner(
+            timeout=self._config.performance.ffmpeg_timeout,
+            stall_timeout=self._config.performance.ffmpeg_stall_timeout
+        )
 
     def _get_output_params(self, audio_path: str) -> Tuple[str, str, bool]:
         filename, ext = os.path.splitext(os.path.basename(audio_path))
@@ -48,74 +59,250 @@ class AudioConverter:
         acodec, is_need_bitrate = AudioConverter._codec_map[scheme]
         return output_filepath, acodec, is_need_bitrate
 
-    def _get_bitrate(self, file_path: str) -> int:
+    def _execute_ffmpeg(
+            self,
+            cmd: list,
+            stdin_chunks: Optional[Iterable[bytes]] = None,
+            wall_timeout: bool = True
+    ):
+        result = self._ffmpeg.run(cmd, stdin_chunks, wall_timeout)
+
+        if not result.ok:
+            reason = result.killed_reason or f"return code {result.returncode}"
+            self._yt_dlp_logger.error(
+                f"[*convertor] FFmpeg command failed ({reason}): {result.stderr}")
+            return None, result.stderr  # Или другой способ обработки ошибки
+
+        speed = f"{result.speed:.1f}x" if result.speed is not None else "N/A"
+        self._yt_dlp_logger.info(
+            f"[*convertor] Audio has been saved in {result.elapsed:.1f}s "
+            f"(speed {speed}, CPU {result.cpu_time:.1f}s, "
+            f"peak RSS {result.peak_rss / 1024:.0f}MiB): {cmd[-1]}")
+        return b"", result.stderr
+
+    def _remux_native(
+            self,
+            audio_path: str,
+            output_filepath: str,
+            comments: Optional[Dict[str, str]] = None
+    ) -> bool:
+        """
+        Перепаковывает WebM с Opus в Ogg Opus в текущем процессе, без запуска
+        ffmpeg. Если файл не удалось разобрать, возвращает False, и конвертация
+        выполняется через ffmpeg.
+        """
+        start = time.time()
+        try:
+            written = remux_webm_to_opus(audio_path, output_filepath, comments)
+        except WebmError as e:
+            self._yt_dlp_logger.warning(
+                f"[*convertor] Native remux failed, falling back to FFmpeg: {e}")
+            return False
+        self._yt_dlp_logger.info(
+            f"[*convertor] Audio has been remuxed in {time.time() - start:.2f}s "
+            f"({written / 1024:.0f}KiB): {output_filepath}")
+        return True
+
+    @staticmethod
+    def _to_ffmetadata(comments: Dict[str, str]) -> bytes:
+        """Теги в формате FFMETADATA1 для передачи ffmpeg через stdin."""
+        def escape(text: str) -> str:
+            for char in ("\\", "=", ";", "#", "\n"):
+                text = text.replace(char, "\\" + char)
+            return text
+
+        lines = [";FFMETADATA1"]
+        lines.extend(f"{escape(key)}={escape(value)}" for key, value in comments.items())
+        return ("\n".join(lines) + "\n").encode()
+
+    @staticmethod
+    def _get_tag_args(
+            output_filepath: str,
+            tags: Dict[str, str],
+            cover: Optional[bytes]
+    ) -> Tuple[List[str], List[str], Optional[bytes]]:
         """
-        Определяет битрейт аудиофайла с помощью ffprobe.
+        Аргументы ffmpeg, чтобы теги и обложка записывались вместе со звуком.
 
-        :param file_path: Путь к аудиофайлу.
-        :return: Битрейт файла в кбит/с.
+        :return: Дополнительные входы, параметры выхода и данные для stdin.
         """
+        inputs, outputs = [], ["-map", "0:a"]
+        ext = os.path.splitext(output_filepath)[1].lstrip(".")
+
+        if ext == AudioExt.OPUS:
+            # Обложка в Ogg - это тег, слишком длинный для командной строки,
+            # поэтому все теги передаются файлом метаданных через stdin
+            comments = dict(tags)
+            if cover:
+                comments['METADATA_BLOCK_PICTURE'] = ImageEmbedder.get_picture_block(cover)
+            if not comments:
+                return inputs, outputs, None
+            inputs.extend(["-f", "ffmetadata", "-i", "pipe:0"])
+            outputs.extend(["-map_metadata", "1"])
+            return inputs, outputs, AudioConverter._to_ffmetadata(comments)
+
+        stdin_data = None
+        if cover and ext in (AudioExt.MP3, AudioExt.M4A):
+            inputs.extend(["-f", "jpeg_pipe", "-i", "pipe:0"])
+            outputs.extend(["-map", "1:v", "-c:v", "copy",
+                            "-disposition:v:0", "attached_pic"])
+            stdin_data = cover
+        for key, value in tags.items():
+            outputs.extend(["-metadata", f"{key}={value}"])
+        if ext == AudioExt.MP3:
+            outputs.extend(["-id3v2_version", "3"])
+        return inputs, outputs, stdin_data
+
+    def convert_audio(
+            self,
+            audio_path: str,
+            bitrate: Optional[float] = None,
+            tags: Optional[Dict[str, str]] = None,
+            cover: Optional[bytes] = None
+    ) -> str:
+        """
+        Конвертирует скачанный файл.
+
+        :param audio_path: (str) Путь к исходному файлу.
+        :param bitrate: (Optional[float]) Битрейт исходного аудио в кбит/с из
+            информации yt-dlp; если не задан, определяется по заголовкам файла.
+        :param tags: (Optional[Dict[str, str]]) Теги, которые записываются
+            вместе со звуком (режим SINGLE_PASS).
+        :param cover: (Optional[bytes]) Обложка в JPEG для того же режима.
+        :return: (str) Путь к выходному файлу.
+        """
+        output_filepath, acodec, is_need_bitrate = self._get_output_params(audio_path)
+        single_pass = tags is not None or cover is not None
+
+        if self._native_remux and acodec == "copy" \
+                and audio_path.endswith(f".{AudioExt.WEBM}"):
+            comments = None
+            if single_pass:
+                comments = dict(tags or {})
+                if cover:
+                    comments['METADATA_BLOCK_PICTURE'] = \
+                        ImageEmbedder.get_picture_block(cover)
+            if self._remux_native(audio_path, output_filepath, comments):
+                return output_filepath
+
+        if not self._run_ffmpeg(audio_path, output_filepath, acodec, is_need_bitrate,
+                                bitrate, tags, cover):
+            raise RuntimeError(f"FFmpeg failed to convert: {audio_path}")
+        return output_filepath
+
+    def _run_ffmpeg(
+            self,
+            audio_path: str,
+            output_filepath: str,
+            acodec: str,
+            is_need_bitrate: bool,
+            bitrate: Optional[float] = None,
+            tags: Optional[Dict[str, str]] = None,
+            cover: Optional[bytes] = None
+    ) -> bool:
+        """
+        Собирает и выполняет команду ffmpeg, True - если она завершилась успешно.
+        ffmpeg пишет во временный файл рядом с выходным, который переименовывается
+        только после успешного завершения: если ffmpeg упал или был остановлен
+        сторожем, недописанный файл удаляется и не выдается за результат.
+        """
+        out_dir, out_name = os.path.split(output_filepath)
+        # Расширение сохраняется: по нему ffmpeg выбирает формат
+        fd, tmp_output = tempfile.mkstemp(prefix=".ffmpeg-", suffix="-" + out_name,
+                                          dir=out_dir or None)
+        os.close(fd)
+        os.chmod(tmp_output, 0o644)  # mkstemp создает файл только для владельца
+
+        cmd = ["ffmpeg", "-y", "-i", audio_path]
+        output_args = ["-c:a", acodec]
+        stdin_data = None
+        if tags is not None or cover is not None:
+            inputs, tag_args, stdin_data = self._get_tag_args(
+                output_filepath, tags or {}, cover)
+            cmd.extend(inputs)
+            output_args = tag_args + output_args
+        cmd.extend(output_args)
+        if is_need_bitrate:
+            cur_br = self._bitrate_probe.probe(audio_path, bitrate)
+            cmd.extend(["-b:a", f"{cur_br}k"])
+        cmd.append(tmp_output)
+
         try:
-            # Получаем информацию о продолжительности с помощью ffprobe
-            result = subprocess.run(
-                ['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration',
-                 '-of', 'csv=p=0', file_path],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=True
-            )
-
-            # Парсим продолжительность
-            duration = float(result.stdout.strip())
-            # Получаем размер файла в байтах
-            file_size = os.path.getsize(file_path)
-            # Битрейт рассчитывается как (размер файла в байтах * 8) /
-            # (длительность в секундах * 1000). Переводим в кбит/с
-            bitrate = int((file_size * 8) / (duration * 1000)) + 1
-            self._yt_dlp_logger.info(
-                f"[*convertor] Calculated bitrate for audio: {bitrate} kbps")
-            return bitrate
-
-        except subprocess.CalledProcessError as e:
-            self._yt_dlp_logger.error(f"[*convertor] Error executing ffprobe: {e.stderr}")
-            raise
-
-        except ValueError:
-            self._yt_dlp_logger.error(
-                f"[*convertor] The bitrate could not be determined.")
-            raise
+            stdout, _ = self._execute_ffmpeg(
+                cmd, stdin_chunks=None if stdin_data is None else [stdin_data])
+            if stdout is None:
+                return False
+            os.replace(tmp_output, output_filepath)
+            return True
+        finally:
+            if os.path.exists(tmp_output):
+                os.remove(tmp_output)
 
-        except FileNotFoundError:
-            self._yt_dlp_logger.error(f"[*convertor] File {file_path} not found.")
-            raise
+    def transcode(
+            self,
+            audio_path: str,
+            output_filepath: str,
+            tags: Optional[Dict[str, str]] = None,
+            cover: Optional[bytes] = None
+    ) -> None:
+        """
+        Перекодирует готовый файл библиотеки в формат, заданный расширением
+        output_filepath (миграция на другой AUDIO_EXT). Теги и обложка
+        записываются тем же вызовом ffmpeg.
+        """
+        target_ext = os.path.splitext(output_filepath)[1].lstrip(".")
+        scheme = {
+            AudioExt.OPUS: "opus_convert",
+            AudioExt.M4A: "m4a_convert",
+            AudioExt.MP3: AudioExt.MP3
+        }[AudioExt(target_ext)]
+        acodec, is_need_bitrate = AudioConverter._codec_map[scheme]
 
-    def _execute_ffmpeg(self, cmd: list):
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
+        if not self._run_ffmpeg(audio_path, output_filepath, acodec, is_need_bitrate,
+                                tags=tags or {}, cover=cover):
+            raise RuntimeError(f"FFmpeg failed to convert: {audio_path}")
 
-        if process.returncode != 0:
-            error_message = stderr.decode()
-            self._yt_dlp_logger.error(
-                f"[*convertor] FFmpeg command failed with return code "
-                f"{process.returncode}: {error_message}")
-            return None, error_message  # Или другой способ обработки ошибки
-        else:
-            self._yt_dlp_logger.info(f"[*convertor] Audio has been saved: {cmd[-1]}")
-        return stdout, stderr
+    def convert_stream(
+            self,
+            chunks: Iterable[bytes],
+            audio_path: str,
+            bitrate: Optional[float] = None
+    ) -> str:
+        """
+        Конвертирует аудио, которое поступает из загрузки кусками, через stdin
+        ffmpeg, не сохраняя промежуточный файл на диск.
 
-    def convert_audio(self, audio_path: str) -> str:
+        :param chunks: (Iterable[bytes]) Байты исходного аудио по мере загрузки.
+        :param audio_path: (str) Путь, по которому yt-dlp сохранил бы исходный файл,
+            по нему определяются имя и формат выходного файла.
+        :param bitrate: (Optional[float]) Битрейт исходного аудио в кбит/с,
+            нужен для перекодирования.
+        :return: (str) Путь к выходному файлу.
+        """
         output_filepath, acodec, is_need_bitrate = self._get_output_params(audio_path)
+        # Пишем во временный каталог и переносим после успешного завершения, чтобы
+        # недописанный файл не попал в каталог загрузок
+        tmp_dir = os.path.dirname(audio_path)
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_output = os.path.join(tmp_dir, "stream_" + os.path.basename(output_filepath))
 
         cmd = [
             "ffmpeg", "-y",
-            "-i", audio_path,
+            "-i", "pipe:0",
             "-c:a", acodec
         ]
         if is_need_bitrate:
-            cur_br = self._get_bitrate(audio_path)
-            cmd.extend(["-b:a", f"{cur_br}k"])
-        cmd.append(output_filepath)
+            if not bitrate:
+                raise ValueError(f"The bitrate is unknown for stream: {audio_path}")
+            cmd.extend(["-b:a", f"{self._bitrate_probe.probe(audio_path, bitrate)}k"])
+        cmd.append(tmp_output)
 
-        self._execute_ffmpeg(cmd)
+        try:
+            stdout, _ = self._execute_ffmpeg(cmd, stdin_chunks=chunks, wall_timeout=False)
+            if stdout is None:
+                raise RuntimeError(f"FFmpeg failed to convert stream: {audio_path}")
+            os.replace(tmp_output, output_filepath)
+        finally:
+            if os.path.exists(tmp_output):
+                os.remove(tmp_output)
         return output_filepath
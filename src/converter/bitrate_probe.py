@@ -0,0 +1,138 @@
+import os
+import struct
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import mutagen
+
+from .webm_remuxer import WebmError, read_element, read_payload, skip_payload
+
+
+# Идентификаторы элементов Matroska, нужные для оценки битрейта
+_SEGMENT = 0x18538067
+_CLUSTER = 0x1F43B675
+_INFO = 0x1549A966
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_CLUSTER_TIMECODE = 0xE7
+_SIMPLE_BLOCK = 0xA3
+_BLOCK_GROUP = 0xA0
+
+_MASTER_IDS = {_SEGMENT, _CLUSTER, _INFO}
+
+
+def probe_webm(file_path: str) -> Tuple[float, int]:
+    """
+    Читает из WebM длительность и суммарный размер аудиоблоков, не считая
+    служебных данных контейнера. Полезная нагрузка блоков пропускается
+    перемещением по файлу, а не чтением.
+
+    :return: (Tuple[float, int]) Длительность в секундах и размер блоков в байтах.
+    """
+    timecode_scale = 1_000_000  # нс, значение по умолчанию в Matroska
+    duration: Optional[float] = None
+    cluster_timecode = last_timecode = 0
+    payload_size = 0
+
+    with open(file_path, "rb") as stream:
+        while (element := read_element(stream)) is not None:
+            element_id, size = element
+            if element_id in _MASTER_IDS:
+                continue
+            if element_id == _TIMECODE_SCALE:
+                timecode_scale = int.from_bytes(read_payload(stream, size), "big")
+            elif element_id == _DURATION:
+                data = read_payload(stream, size)
+                duration = struct.unpack(">f" if size == 4 else ">d", data)[0]
+            elif element_id == _CLUSTER_TIMECODE:
+                cluster_timecode = int.from_bytes(read_payload(stream, size), "big")
+            elif element_id == _SIMPLE_BLOCK:
+                if size is None or size < 4:
+                    raise WebmError("Invalid block size")
+                # Номер дорожки (1 байт), смещение времени (2 байта), флаги
+                header = read_payload(stream, 4)
+                last_timecode = max(last_timecode, cluster_timecode +
+                                    struct.unpack(">h", header[1:3])[0])
+                skip_payload(stream, size - 4)
+                payload_size += size - 4
+            elif element_id == _BLOCK_GROUP:
+                # Такой блок обычно один (последний, с DiscardPadding), поэтому его
+                # служебные байты не вычитаем
+                payload_size += size
+                skip_payload(stream, size)
+            else:
+                skip_payload(stream, size)
+
+    if duration is None:
+        # Поток записан без Duration: берем время последнего блока
+        duration = float(last_timecode)
+    seconds = duration * timecode_scale / 1_000_000_000
+    if seconds <= 0 or payload_size <= 0:
+        raise WebmError(f"Unable to determine the duration: {file_path}")
+    return seconds, payload_size
+
+
+class BitrateProbe:
+    """
+    Определение битрейта аудио без запуска ffprobe. В первую очередь берется
+    значение abr/tbr, которое yt-dlp уже получил вместе с информацией о видео,
+    иначе битрейт читается из заголовков потока (mutagen, для WebM - разбор
+    блоков). Результат кэшируется по файлу.
+    """
+
+    def __init__(self):
+        self._yt_dlp_logger = logging.getLogger('yt-dlp')
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[str, int, int], float] = {}
+
+    def _read_bitrate(self, file_path: str) -> float:
+        """Битрейт аудиопотока в кбит/с по заголовкам файла."""
+        if file_path.endswith(".webm"):
+            seconds, payload_size = probe_webm(file_path)
+            return payload_size * 8 / seconds / 1000
+
+        audio = mutagen.File(file_path)
+        if audio is None or audio.info is None:
+            raise ValueError(f"Unsupported audio file: {file_path}")
+        bitrate = getattr(audio.info, "bitrate", 0)
+        if bitrate:
+            return bitrate / 1000
+        length = getattr(audio.info, "length", 0)
+        if not length:
+            raise ValueError(f"Unable to determine the duration: {file_path}")
+        return os.path.getsize(file_path) * 8 / length / 1000
+
+    def probe(self, file_path: str, known_bitrate: Optional[float] = None) -> int:
+        """
+        Возвращает битрейт аудиофайла.
+
+        :param file_path: (str) Путь к аудиофайлу.
+        :param known_bitrate: (Optional[float]) Битрейт из информации yt-dlp
+            (abr или tbr) в кбит/с, если он известен.
+        :return: (int) Битрейт в кбит/с, округленный вверх.
+        """
+        if known_bitrate:
+            bitrate = float(known_bitrate)
+            source = "info"
+        else:
+            stat = os.stat(file_path)
+            key = (file_path, stat.st_size, stat.st_mtime_ns)
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached is None:
+                try:
+                    cached = self._read_bitrate(file_path)
+                except (mutagen.MutagenError, WebmError, struct.error) as e:
+                    self._yt_dlp_logger.error(
+                        f"[*convertor] The bitrate could not be determined: {e}")
+                    raise ValueError(str(e)) from e
+                with self._lock:
+                    self._cache[key] = cached
+            bitrate = cached
+            source = "headers"
+
+        result = int(bitrate) + 1
+        self._yt_dlp_logger.info(
+            f"[*convertor] Bitrate for audio ({source}): {result} kbps")
+        return result
@@ -1,3 +1,5 @@
+from typing import Iterable, Optional
+
 from ..config.app_config import get_config
 from ..entities import Metadata
 from .audio_converter import AudioConverter
@@ -12,11 +14,69 @@ class Converter:
         self._image_embedder = ImageEmbedder()
         self._metadata_handler = MetadataHandler()
 
-    def convert(self, audio_path: str, cover_path: str, metadata: Metadata) -> None:
-        converted_audio = self._audio_converter.convert_audio(audio_path)
+    def convert_audio(self, audio_path: str, bitrate: Optional[float] = None) -> str:
+        """Конвертирует аудио и возвращает путь к выходному файлу."""
+        return self._audio_converter.convert_audio(audio_path, bitrate)
 
-        if self._config.download.write_thumbnail:
-            self._image_embedder.embed_image(converted_audio, cover_path)
+    def convert_stream(
+            self,
+            chunks: Iterable[bytes],
+            audio_path: str,
+            bitrate: Optional[float] = None
+    ) -> str:
+        """Конвертирует аудио из потока байтов без промежуточного файла."""
+        return self._audio_converter.convert_stream(chunks, audio_path, bitrate)
 
+    def convert_tagged(
+            self,
+            audio_path: str,
+            cover_path: str,
+            metadata: Metadata,
+            bitrate: Optional[float] = None
+    ) -> str:
+        """
+        Конвертирует аудио и сразу записывает обложку и теги (режим SINGLE_PASS),
+        так что выходной файл пишется на диск один раз.
+        """
+        tags = {}
         if self._config.download.write_metadata:
+            tags = self._metadata_handler.get_tags(metadata)
+        cover = None
+        if self._config.download.write_thumbnail and cover_path:
+            cover = self._image_embedder.get_jpeg_cover(cover_path)
+        return self._audio_converter.convert_audio(audio_path, bitrate, tags, cover)
+
+    def add_tags(self, converted_audio: str, cover_path: str, metadata: Metadata) -> int:
+        """
+        Встраивает обложку и метаданные в уже сконвертированный файл.
+
+        :return: (int) Сколько раз файл был перезаписан.
+        """
+        write_cover = self._config.download.write_thumbnail and cover_path
+        write_metadata = self._config.download.write_metadata
+
+        if self._config.performance.single_pass:
+            if not write_cover and not write_metadata:
+                return 0
+            # Обложка и теги сохраняются одной записью файла
+            audio = self._metadata_handler.open_audio(converted_audio)
+            if write_cover:
+                self._image_embedder.add_cover(audio, cover_path)
+            if write_metadata:
+                self._metadata_handler.set_tags(audio, metadata)
+            audio.save(converted_audio)
+            return 1
+
+        writes = 0
+        if write_cover:
+            self._image_embedder.embed_image(converted_audio, cover_path)
+            writes += 1
+
+        if write_metadata:
             self._metadata_handler.add_metadata(converted_audio, metadata)
+            writes += 1
+        return writes
+
+    def convert(self, audio_path: str, cover_path: str, metadata: Metadata) -> None:
+        converted_audio = self.convert_audio(audio_path)
+        self.add_tags(converted_audio, cover_path, metadata)
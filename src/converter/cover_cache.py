@@ -0,0 +1,121 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+import sqlite3
+from typing import Optional
+
+from ..config.app_config import get_config
+from ..storage import open_database
+
+
+class CoverCache:
+    """
+    Дисковый кэш обработанных обложек (после уменьшения и перекодирования) по
+    хэшу содержимого исходного изображения. У треков одного канала обложки
+    часто совпадают, и тогда декодирование и LANCZOS выполняются один раз.
+    При превышении COVER_CACHE_SIZE_MB вытесняются давно не использованные
+    записи (LRU).
+    """
+
+    _filename = "cover_cache.sqlite3"
+
+    def __init__(self):
+        self._config = get_config()
+        self._yt_dlp_logger = logging.getLogger('yt-dlp')
+        self._max_size = self._config.performance.cover_cache_size_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_time = 0.0  # Сколько секунд обработки сэкономлено попаданиями
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_size > 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _db(self) -> sqlite3.Connection:
+        # После fork соединение родителя использовать нельзя, открываем свое
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = open_database(self._filename)
+            self._pid = os.getpid()
+            with self._connection:
+                self._connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS covers (
+                        key TEXT PRIMARY KEY,
+                        data BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        elapsed REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                    """
+                )
+        return self._connection
+
+    @staticmethod
+    def make_key(source: bytes, variant: str) -> str:
+        """
+        Ключ записи: хэш исходного изображения и параметры обработки (формат,
+        размер), чтобы смена настроек не выдавала старый результат.
+        """
+        return f"{hashlib.sha256(source).hexdigest()}:{variant}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+
+        with self._lock, self._db() as db:
+            row = db.execute(
+                "SELECT data, elapsed FROM covers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE covers SET last_access = ? WHERE key = ?",
+                       (time.time(), key))
+            self.hits += 1
+            self.saved_time += row["elapsed"]
+
+        self._yt_dlp_logger.debug(
+            f"[*convertor] Cover taken from cache, hit rate {self.hit_rate:.0%} "
+            f"({self.hits}/{self.hits + self.misses}), saved {self.saved_time:.2f}s")
+        return bytes(row["data"])
+
+    def put(self, key: str, data: bytes, elapsed: float) -> None:
+        """
+        :param key: (str) Ключ из make_key.
+        :param data: (bytes) Обработанная обложка.
+        :param elapsed: (float) Время обработки, которое сэкономит попадание, с.
+        """
+        if not self.enabled or len(data) > self._max_size:
+            return
+
+        now = time.time()
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO covers (key, data, size, elapsed, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), elapsed, now)
+            )
+            self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Удаляет самые давние по доступу записи сверх лимита размера."""
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM covers").fetchone()[0]
+        if total <= self._max_size:
+            return
+
+        for row in db.execute(
+                "SELECT key, size FROM covers ORDER BY last_access").fetchall():
+            db.execute("DELETE FROM covers WHERE key = ?", (row["key"],))
+            total -= row["size"]
+            if total <= self._max_size:
+                break
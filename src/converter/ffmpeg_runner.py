@@ -0,0 +1,195 @@
+import os
+import time
+import signal
+import logging
+import threading
+import subprocess
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Iterable, Optional
+
+
+@dataclass
+class FFmpegResult:
+    """Итог одного запуска ffmpeg."""
+    returncode: int
+    stderr: str  # Последние строки stderr
+    elapsed: float  # Время выполнения, с
+    speed: Optional[float]  # Скорость относительно реального времени (x)
+    cpu_time: float  # Процессорное время ffmpeg (user + system), с
+    peak_rss: int  # Пиковый объем памяти ffmpeg, КиБ
+    killed_reason: str = ""  # Причина принудительной остановки
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.killed_reason
+
+
+class FFmpegRunner:
+    """
+    Запуск ffmpeg с машиночитаемым прогрессом (-progress pipe:1). Прогресс
+    выводится в лог, stderr хранится только последними строками, а сторожевой
+    поток останавливает ffmpeg, если он работает дольше общего лимита или
+    перестал продвигаться (лимит зависания). Для каждого запуска собираются
+    скорость, процессорное время и пиковый объем памяти (через wait4).
+    """
+
+    stderr_lines = 50
+    log_interval = 5.0  # Как часто выводить прогресс в лог, с
+    poll_interval = 0.5
+
+    def __init__(self, timeout: float = 0, stall_timeout: float = 0):
+        """
+        :param timeout: (float) Лимит времени выполнения, с, 0 - без лимита.
+        :param stall_timeout: (float) Сколько секунд ffmpeg может не сообщать о
+            прогрессе, 0 - без лимита.
+        """
+        self._timeout = timeout
+        self._stall_timeout = stall_timeout
+        self._yt_dlp_logger = logging.getLogger('yt-dlp')
+
+    def _read_progress(self, process: subprocess.Popen, state: dict) -> None:
+        """Разбирает блоки key=value из -progress и обновляет состояние задания."""
+        assert process.stdout is not None
+        block = {}
+        last_log = time.time()
+        for raw_line in process.stdout:
+            key, _, value = raw_line.decode(errors="replace").strip().partition("=")
+            if key != "progress":
+                block[key] = value
+                continue
+
+            # Конец блока: ffmpeg продвинулся
+            state["last_progress"] = time.time()
+            speed = block.get("speed", "").rstrip("x").strip()
+            try:
+                state["speed"] = float(speed)
+            except ValueError:
+                pass
+            state["out_time"] = block.get("out_time", state.get("out_time", ""))
+            if time.time() - last_log >= self.log_interval or value == "end":
+                last_log = time.time()
+                self._yt_dlp_logger.debug(
+                    f"[*convertor] FFmpeg progress: time={state['out_time']}, "
+                    f"speed={block.get('speed', 'N/A').strip()}, "
+                    f"size={int(block.get('total_size', 0) or 0) / 1024:.0f}KiB")
+            block = {}
+
+    @staticmethod
+    def _read_stderr(process: subprocess.Popen, tail: Deque[str]) -> None:
+        assert process.stderr is not None
+        for raw_line in process.stderr:
+            tail.append(raw_line.decode(errors="replace").rstrip())
+
+    def _watch(
+            self,
+            process: subprocess.Popen,
+            state: dict,
+            start: float,
+            timeout: float,
+            done: threading.Event
+    ) -> None:
+        """Останавливает ffmpeg при превышении общего лимита или лимита зависания."""
+        while not done.wait(self.poll_interval):
+            now = time.time()
+            if timeout and now - start > timeout:
+                state["killed_reason"] = f"timed out after {timeout:.0f}s"
+            elif self._stall_timeout and now - state["last_progress"] > self._stall_timeout:
+                state["killed_reason"] = f"no progress for {self._stall_timeout:.0f}s"
+            else:
+                continue
+            self._kill(process)
+            return
+
+    @staticmethod
+    def _kill(process: subprocess.Popen) -> None:
+        """Останавливает ffmpeg вместе с его группой процессов."""
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    @staticmethod
+    def _feed_stdin(process: subprocess.Popen, chunks: Iterable[bytes]) -> None:
+        """Передает байты в stdin ffmpeg по мере поступления."""
+        assert process.stdin is not None
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            pass  # ffmpeg завершился раньше, код возврата покажет ошибку
+        except BaseException:
+            FFmpegRunner._kill(process)
+            raise
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def run(
+            self,
+            cmd: list,
+            stdin_chunks: Optional[Iterable[bytes]] = None,
+            wall_timeout: bool = True
+    ) -> FFmpegResult:
+        """
+        Выполняет команду ffmpeg.
+
+        :param cmd: (list) Команда, начиная с "ffmpeg".
+        :param stdin_chunks: (Optional[Iterable[bytes]]) Данные для stdin.
+        :param wall_timeout: (bool) Применять ли общий лимит времени. При
+            потоковой конвертации длительность задает загрузка, поэтому
+            проверяется только зависание.
+        :return: (FFmpegResult) Результат со статистикой.
+        """
+        cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+        start = time.time()
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE if stdin_chunks is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            # Своя группа процессов: ffmpeg можно остановить целиком, а Ctrl+C
+            # обрабатывает сама программа
+            start_new_session=True
+        )
+
+        state = {"last_progress": start, "speed": None, "out_time": "", "killed_reason": ""}
+        tail: Deque[str] = deque(maxlen=self.stderr_lines)
+        done = threading.Event()
+        threads = [
+            threading.Thread(target=self._read_progress, args=(process, state), daemon=True),
+            threading.Thread(target=self._read_stderr, args=(process, tail), daemon=True),
+            threading.Thread(target=self._watch, daemon=True, args=(
+                process, state, start, self._timeout if wall_timeout else 0, done))
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            if stdin_chunks is not None:
+                self._feed_stdin(process, stdin_chunks)
+            # wait4 вместо wait, чтобы получить ресурсы именно этого процесса
+            _, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+        finally:
+            done.set()
+            if process.returncode is None:
+                self._kill(process)
+                process.wait()
+            for thread in threads:
+                thread.join()
+            for stream in (process.stdout, process.stderr):
+                if stream is not None:
+                    stream.close()
+
+        return FFmpegResult(
+            returncode=process.returncode,
+            stderr="\n".join(tail),
+            elapsed=time.time() - start,
+            speed=state["speed"],
+            cpu_time=rusage.ru_utime + rusage.ru_stime,
+            peak_rss=rusage.ru_maxrss,
+            killed_reason=state["killed_reason"]
+        )
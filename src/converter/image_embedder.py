@@ -1,7 +1,9 @@
 import os
+import time
 import logging
 from io import BytesIO
-from base64 import b64encode
+from base64 import b64decode, b64encode
+from typing import Optional, Union
 
 from PIL import Image
 from mutagen.oggopus import OggOpus
@@ -12,6 +14,7 @@ from mutagen.id3._frames import APIC
 from mutagen.id3._util import error as ID3Error
 
 from ..config.app_config import get_config
+from .cover_cache import CoverCache
 
 
 class ImageEmbedder:
@@ -20,45 +23,89 @@ class ImageEmbedder:
         self._resize = self._config.download.thumbnail_resize
         self._max_width = self._config.download.thumbnail_max_width
         self._yt_dlp_logger = logging.getLogger('yt-dlp')
+        self._cover_cache = CoverCache()
 
-    def _convert_image(self, image_path: str) -> BytesIO:
-        with Image.open(image_path) as img:
+    def _process_image(self, source: bytes, image_format: str) -> bytes:
+        with Image.open(BytesIO(source)) as img:
             if self._resize:
+                if img.format == 'JPEG':
+                    # JPEG сразу декодируется с уменьшением в 2, 4 или 8 раз (draft),
+                    # но не меньше итогового размера, а не в полном разрешении
+                    ratio = min(self._max_width / img.width,
+                                self._max_width / img.height, 1)
+                    img.draft('RGB', (max(1, int(img.width * ratio)),
+                                      max(1, int(img.height * ratio))))
                 img.thumbnail((self._max_width, self._max_width),
                               Image.Resampling.LANCZOS)
                 self._yt_dlp_logger.debug(
-                    f"[*convertor] Resized image {image_path} to {self._max_width}px")
+                    f"[*convertor] Resized image to {self._max_width}px")
 
+            if image_format == 'JPEG' and img.mode != 'RGB':
+                img = img.convert('RGB')
             img_byte_arr = BytesIO()
-            img.save(img_byte_arr, format='WEBP')
-            img_byte_arr.seek(0)
-            return img_byte_arr
-
-    def _embed_oggopus_cover(self, audio_path: str, img_stream: BytesIO):
+            img.save(img_byte_arr, format=image_format)
+            return img_byte_arr.getvalue()
+
+    def _convert_image(
+            self,
+            image_path: Union[str, BytesIO],
+            image_format: str = 'WEBP'
+    ) -> BytesIO:
+        if isinstance(image_path, BytesIO):
+            source = image_path.getvalue()
+        else:
+            with open(image_path, 'rb') as f:
+                source = f.read()
+
+        variant = f"{image_format}:{self._max_width if self._resize else 0}"
+        key = self._cover_cache.make_key(source, variant)
+        data = self._cover_cache.get(key)
+        if data is None:
+            start = time.time()
+            data = self._process_image(source, image_format)
+            self._cover_cache.put(key, data, time.time() - start)
+        return BytesIO(data)
+
+    def get_jpeg_cover(self, image_path: Union[str, BytesIO]) -> bytes:
+        """
+        Обложка в JPEG для записи при конвертации (режим SINGLE_PASS): ffmpeg
+        встраивает в mp3 и m4a только JPEG и PNG.
+        """
+        return self._convert_image(image_path, 'JPEG').read()
+
+    @staticmethod
+    def read_cover(audio) -> Optional[bytes]:
+        """Достает встроенную обложку из открытого файла mutagen."""
+        if isinstance(audio, OggOpus):
+            pictures = audio.get('metadata_block_picture')
+            return Picture(b64decode(pictures[0])).data if pictures else None
+        if isinstance(audio, MP4):
+            covers = audio.get('covr')
+            return bytes(covers[0]) if covers else None
+        if isinstance(audio, ID3):
+            pictures = audio.getall('APIC')
+            return pictures[0].data if pictures else None
+        return None
+
+    @staticmethod
+    def get_picture_block(cover_data: bytes, mime: str = 'image/jpeg') -> str:
+        """Обложка в виде тега METADATA_BLOCK_PICTURE для Ogg Opus."""
         covart = Picture()
-        covart.data = img_stream.read()
+        covart.data = cover_data
         covart.type = 3  # Cover (front)
-        covart.mime = 'image/png'
+        covart.mime = mime
+        return b64encode(covart.write()).decode('ascii')
 
-        audio = OggOpus(audio_path)
-        audio['METADATA_BLOCK_PICTURE'] = b64encode(covart.write()).decode('ascii')
-        audio.save()
+    def _embed_oggopus_cover(self, audio: OggOpus, img_stream: BytesIO):
+        audio['METADATA_BLOCK_PICTURE'] = self.get_picture_block(
+            img_stream.read(), 'image/png')
 
-    def _embed_mp4_cover(self, audio_path: str, img_stream: BytesIO):
-        audio = MP4(audio_path)
+    def _embed_mp4_cover(self, audio: MP4, img_stream: BytesIO):
         cover_data = img_stream.read()
-
         audio['covr'] = [MP4Cover(cover_data, imageformat=MP4Cover.FORMAT_PNG)]
-        audio.save()
 
-    def _embed_mp3_cover(self, audio_path: str, img_stream: BytesIO):
+    def _embed_mp3_cover(self, audio: ID3, img_stream: BytesIO):
         cover_data = img_stream.read()
-        try:
-            audio = ID3(audio_path)
-        except ID3Error:
-            # Если ID3-тегов еще нет, создадим их
-            audio = ID3()
-
         audio.add(
             APIC(
                 encoding=3,  # UTF-8
@@ -68,22 +115,44 @@ class ImageEmbedder:
                 data=cover_data
             )
         )
-        audio.save(audio_path)
 
-    def embed_image(self, audio_path: str, image_path: str) -> None:
-        img_stream = self._convert_image(image_path)
-        ext = os.path.splitext(audio_path)[1].lower()
+    def add_cover(self, audio, image_path: str) -> bool:
+        """
+        Добавляет обложку в уже открытый файл mutagen, не сохраняя его.
 
+        :return: (bool) True, если формат поддерживается.
+        """
         _metadata_map = {
-            ".opus": self._embed_oggopus_cover,
-            ".m4a": self._embed_mp4_cover,
-            ".mp3": self._embed_mp3_cover
+            OggOpus: self._embed_oggopus_cover,
+            MP4: self._embed_mp4_cover,
+            ID3: self._embed_mp3_cover
         }
 
-        if ext not in _metadata_map:
+        if type(audio) not in _metadata_map:
+            self._yt_dlp_logger.error(
+                f"[*convertor] Unsupported audio format: {type(audio).__name__}")
+            return False
+
+        _metadata_map[type(audio)](audio, self._convert_image(image_path))
+        return True
+
+    def embed_image(self, audio_path: str, image_path: str) -> None:
+        ext = os.path.splitext(audio_path)[1].lower()
+
+        _open_map = {".opus": OggOpus, ".m4a": MP4, ".mp3": self._open_id3}
+        if ext not in _open_map:
             self._yt_dlp_logger.error(f"[*convertor] Unsupported audio format: {ext}")
             return
 
-        metadata_handler = _metadata_map[ext]
-        metadata_handler(audio_path, img_stream)
+        audio = _open_map[ext](audio_path)
+        self.add_cover(audio, image_path)
+        audio.save(audio_path)
         self._yt_dlp_logger.info(f"[*convertor] Thumbnail added successfully")
+
+    @staticmethod
+    def _open_id3(audio_path: str) -> ID3:
+        try:
+            return ID3(audio_path)
+        except ID3Error:
+            # Если ID3-тегов еще нет, создадим их
+            return ID3()
@@ -1,9 +1,11 @@
 import os
 import logging
+from typing import Dict
 from mutagen.oggopus import OggOpus
 from mutagen.mp4 import MP4
 from mutagen.id3 import ID3
 from mutagen.id3._frames import TIT2, TPE1, TDRC, COMM
+from mutagen.id3._util import error as ID3Error
 
 from ..entities import Metadata
 
@@ -14,10 +16,53 @@ class MetadataHandler:
     def __init__(self):
         self._yt_dlp_logger = logging.getLogger('yt-dlp')
 
-    def add_metadata(self, filepath: str, metadata: Metadata) -> None:
+    @staticmethod
+    def open_audio(filepath: str):
+        """Открывает файл тем классом mutagen, который соответствует расширению."""
         _, ext = os.path.splitext(filepath)
-        audio = MetadataHandler._ext_hmap[ext](filepath)
+        try:
+            return MetadataHandler._ext_hmap[ext](filepath)
+        except ID3Error:
+            # Если ID3-тегов еще нет, создадим их
+            return ID3()
+
+    @staticmethod
+    def get_tags(metadata: Metadata) -> Dict[str, str]:
+        """
+        Теги в общем виде, как их принимает ffmpeg (-metadata) и пишет в
+        комментарии Vorbis: ffmpeg сам переводит их в атомы MP4 и кадры ID3.
+        """
+        return {
+            'title': metadata.title,
+            'artist': metadata.artist,
+            'date': metadata.date,
+            'comment': metadata.comment
+        }
+
+    @staticmethod
+    def read_metadata(audio) -> Metadata:
+        """Читает теги из открытого файла mutagen."""
+        def first(key: str) -> str:
+            values = audio.get(key) if audio.tags is not None else None
+            return str(values[0]) if values else ""
 
+        if isinstance(audio, ID3):
+            comments = audio.getall('COMM')
+            return Metadata(
+                title=str(audio['TIT2']) if 'TIT2' in audio else "",
+                artist=str(audio['TPE1']) if 'TPE1' in audio else "",
+                date=str(audio['TDRC']) if 'TDRC' in audio else "",
+                comment=str(comments[0]) if comments else ""
+            )
+        if isinstance(audio, MP4):
+            return Metadata(title=first('\xa9nam'), artist=first('\xa9ART'),
+                            date=first('\xa9day'), comment=first('\xa9cmt'))
+        return Metadata(title=first('title'), artist=first('artist'),
+                        date=first('date'), comment=first('comment'))
+
+    @staticmethod
+    def set_tags(audio, metadata: Metadata) -> None:
+        """Записывает теги в уже открытый файл mutagen, не сохраняя его."""
         if isinstance(audio, OggOpus):
             audio['title'] = metadata.title
             audio['artist'] = metadata.artist
@@ -34,5 +79,9 @@ class MetadataHandler:
             audio.add(TDRC(encoding=3, text=metadata.date))
             audio.add(COMM(encoding=3, text=metadata.comment))
 
+    def add_metadata(self, filepath: str, metadata: Metadata) -> None:
+        _, ext = os.path.splitext(filepath)
+        audio = MetadataHandler._ext_hmap[ext](filepath)
+        self.set_tags(audio, metadata)
         audio.save()
         self._yt_dlp_logger.info("[*convertor] Metadata added successfully")
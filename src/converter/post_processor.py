@@ -0,0 +1,178 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from ..config.app_config import Config, ConfigManager, get_config
+from ..config.logging_config import load_logger_config
+from ..entities import DownloadCallback, JobState, Metadata
+from ..journal import Journal
+from .converter import Converter
+
+
+# Конвертер и журнал дочернего процесса, создаются один раз в initializer пула.
+_process_converter: Optional[Converter] = None
+_process_journal: Optional[Journal] = None
+
+
+def _init_process(config: Config, disabled_loggers: Tuple[str, ...]) -> None:
+    global _process_converter, _process_journal
+    # Процесс запущен через spawn и не унаследовал ни настройки родителя,
+    # ни настройку логирования
+    ConfigManager._instance = config
+    load_logger_config(debug_mode=config.extended.debug_mode)
+    for name in disabled_loggers:
+        logging.getLogger(name).disabled = True
+    _process_converter = Converter()
+    _process_journal = Journal()
+
+
+def _remove_temp_files(callback: DownloadCallback) -> None:
+    if callback.audio_path and os.path.exists(callback.audio_path):
+        os.remove(callback.audio_path)
+    if callback.thumbnail_path and os.path.exists(callback.thumbnail_path):
+        os.remove(callback.thumbnail_path)
+
+
+def process_download(
+        converter: Converter,
+        callback: DownloadCallback,
+        journal: Journal
+) -> None:
+    """
+    Выполняет постобработку скачанного файла (конвертация, обложка, метаданные)
+    и удаляет временные файлы. Каждый завершенный шаг записывается в журнал,
+    а уже выполненная конвертация (callback.converted_path) пропускается.
+    При ошибке временные файлы остаются на диске для повторной попытки.
+
+    :param converter: (Converter) Конвертер, которым обрабатывается файл.
+    :param callback: (DownloadCallback) Результат хука загрузки.
+    :param journal: (Journal) Журнал заданий загрузки.
+    :return: None
+    """
+    yt_dlp_logger = logging.getLogger('yt-dlp')
+    single_pass = get_config().performance.single_pass
+    try:
+        if callback.bitrate_check:
+            assert isinstance(callback.metadata, Metadata)
+            start = time.time()
+            writes = 0
+            converted_audio = callback.converted_path
+            if not converted_audio:
+                if single_pass:
+                    converted_audio = converter.convert_tagged(
+                        callback.audio_path, callback.thumbnail_path,
+                        callback.metadata, callback.bitrate)
+                else:
+                    converted_audio = converter.convert_audio(
+                        callback.audio_path, callback.bitrate)
+                if not os.path.exists(converted_audio):
+                    raise RuntimeError(f"Conversion failed: {callback.audio_path}")
+                writes += 1
+                journal.mark_converted(callback.url, callback.save_path, converted_audio)
+
+            if not single_pass or callback.converted_path:
+                writes += converter.add_tags(
+                    converted_audio, callback.thumbnail_path, callback.metadata)
+            journal.mark(callback.url, callback.save_path, JobState.TAGGED)
+
+            # Каждая запись переписывает файл целиком, отсюда объем записи
+            size = os.path.getsize(converted_audio)
+            yt_dlp_logger.info(
+                f"[*convertor] Post-processed in {time.time() - start:.2f}s, "
+                f"file writes: {writes} ({writes * size / 1024:.0f}KiB): "
+                f"{os.path.basename(converted_audio)}")
+        else:
+            yt_dlp_logger.warning(
+                f"[*downloader] Skipped because the audio bitrate is too low.")
+            journal.mark(callback.url, callback.save_path, JobState.SKIPPED)
+    except Exception as e:
+        journal.set_error(callback.url, callback.save_path, str(e))
+        raise
+
+    _remove_temp_files(callback)
+
+
+def _process_in_pool(callback: DownloadCallback) -> None:
+    assert _process_converter is not None and _process_journal is not None
+    process_download(_process_converter, callback, _process_journal)
+
+
+class PostProcessor:
+    """
+    Стадия постобработки конвейера загрузки. Если CONVERT_WORKERS > 0, файлы
+    обрабатываются пулом процессов, а загрузка следующего файла начинается сразу,
+    как только предыдущий оказался на диске. Очередь ограничена
+    PIPELINE_QUEUE_SIZE: когда она заполнена, submit блокирует поток загрузки,
+    поэтому каталог tmp не разрастается.
+    """
+
+    def __init__(self, converter: Converter, journal: Journal):
+        self._config = get_config()
+        self._converter = converter
+        self._journal = journal
+        self._yt_dlp_logger = logging.getLogger('yt-dlp')
+        self._workers = self._config.performance.convert_workers
+        self._queue_size = self._config.performance.pipeline_queue_size
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+
+    def start(self) -> None:
+        if self._workers <= 0 or self._executor is not None:
+            return
+        # Процессы пула запускаются при первой задаче, когда потоки загрузки
+        # уже работают, а fork скопировал бы захваченные ими блокировки
+        # (логирование, SQLite) в дочерний процесс
+        disabled_loggers = tuple(
+            name for name in ("", "yt-dlp") if logging.getLogger(name).disabled)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process,
+            initargs=(self._config, disabled_loggers)
+        )
+        # Задачи в работе + ожидающие в очереди
+        self._slots = threading.BoundedSemaphore(self._workers + self._queue_size)
+
+    def _on_done(self, future: Future) -> None:
+        assert self._slots is not None
+        self._slots.release()
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self._yt_dlp_logger.error(f"[*convertor] Post-processing failed: {error}")
+
+    def submit(self, callback: DownloadCallback) -> None:
+        """
+        Ставит файл в очередь постобработки. Без пула процессов обрабатывает
+        файл сразу в текущем потоке.
+        """
+        if self._executor is None:
+            process_download(self._converter, callback, self._journal)
+            return
+
+        assert self._slots is not None
+        self._slots.acquire()  # Ждем свободное место в очереди
+        try:
+            future = self._executor.submit(_process_in_pool, callback)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._on_done)
+
+    def close(self, cancel: bool = False) -> None:
+        """
+        Дожидается завершения всех задач постобработки и останавливает пул.
+
+        :param cancel: (bool) Если True, ожидающие в очереди задачи отменяются.
+        """
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=cancel)
+        self._executor = None
+        self._slots = None
@@ -0,0 +1,369 @@
+import io
+import os
+import zlib
+import random
+import tempfile
+import struct
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+
+class WebmError(ValueError):
+    """Файл не является WebM с дорожкой Opus, которую умеет перепаковать ремуксер."""
+
+
+# Идентификаторы элементов EBML/Matroska (вместе с маркером длины)
+_EBML = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_CLUSTER = 0x1F43B675
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_TRACK_NUMBER = 0xD7
+_CODEC_ID = 0x86
+_CODEC_PRIVATE = 0x63A2
+_SIMPLE_BLOCK = 0xA3
+_BLOCK_GROUP = 0xA0
+_BLOCK = 0xA1
+_DISCARD_PADDING = 0x75A2
+
+# Элементы-контейнеры, в которые парсер заходит, не читая их целиком
+_MASTER_IDS = {_SEGMENT, _CLUSTER, _TRACKS, _TRACK_ENTRY}
+
+# Таблица разворота битов в байте: CRC Ogg - "прямой" вариант crc32 из zlib
+_BIT_REVERSE = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+
+def ogg_crc(data: bytes) -> int:
+    """CRC-32 страницы Ogg (полином 0x04C11DB7 без отражения, начальное значение 0)."""
+    crc = zlib.crc32(data.translate(_BIT_REVERSE), 0xFFFFFFFF) ^ 0xFFFFFFFF
+    return int(f"{crc:032b}"[::-1], 2)
+
+
+def opus_packet_samples(packet: bytes) -> int:
+    """Количество сэмплов (48 кГц) в пакете Opus по его TOC байту (RFC 6716, 3.1)."""
+    if not packet:
+        raise WebmError("Empty Opus packet")
+    toc = packet[0]
+    config = toc >> 3
+    if config < 12:  # SILK: 10, 20, 40, 60 мс
+        frame = (480, 960, 1920, 2880)[config & 3]
+    elif config < 16:  # Hybrid: 10, 20 мс
+        frame = (480, 960)[config & 1]
+    else:  # CELT: 2.5, 5, 10, 20 мс
+        frame = (120, 240, 480, 960)[config & 3]
+
+    code = toc & 3
+    if code == 0:
+        count = 1
+    elif code in (1, 2):
+        count = 2
+    else:
+        if len(packet) < 2:
+            raise WebmError("Truncated Opus packet")
+        count = packet[1] & 0x3F
+    return frame * count
+
+
+def read_vint(stream: BinaryIO, keep_marker: bool) -> Optional[Tuple[int, bool]]:
+    """
+    Читает целое переменной длины EBML.
+
+    :return: (Optional[Tuple[int, bool]]) Значение и признак неизвестного
+        размера (все биты значения равны 1) или None в конце файла.
+    """
+    first = stream.read(1)
+    if not first:
+        return None
+    byte = first[0]
+    if byte == 0:
+        raise WebmError("Invalid EBML variable size integer")
+    length = 9 - byte.bit_length()
+    rest = stream.read(length - 1)
+    if len(rest) != length - 1:
+        raise WebmError("Unexpected end of file")
+
+    value = byte if keep_marker else byte & (0xFF >> length)
+    all_ones = value == (0xFF >> length)
+    for b in rest:
+        value = (value << 8) | b
+        all_ones = all_ones and b == 0xFF
+    return value, all_ones and not keep_marker
+
+
+def read_element(stream: BinaryIO) -> Optional[Tuple[int, Optional[int]]]:
+    """Читает заголовок элемента: id и размер (None - размер неизвестен)."""
+    element_id = read_vint(stream, keep_marker=True)
+    if element_id is None:
+        return None
+    size = read_vint(stream, keep_marker=False)
+    if size is None:
+        raise WebmError("Unexpected end of file")
+    return element_id[0], None if size[1] else size[0]
+
+
+def read_payload(stream: BinaryIO, size: Optional[int]) -> bytes:
+    if size is None:
+        raise WebmError("Unknown size of a non-master element")
+    data = stream.read(size)
+    if len(data) != size:
+        raise WebmError("Unexpected end of file")
+    return data
+
+
+def skip_payload(stream: BinaryIO, size: Optional[int]) -> None:
+    if size is None:
+        raise WebmError("Unknown size of a non-master element")
+    if stream.seekable():
+        stream.seek(size, io.SEEK_CUR)
+    else:
+        read_payload(stream, size)
+
+
+class OggOpusWriter:
+    """
+    Пишет пакеты Opus в страницы Ogg (RFC 7845). Страница закрывается, когда в
+    ней набирается около секунды звука или заканчивается таблица сегментов, так
+    что в памяти держится не больше одной страницы.
+    """
+
+    page_duration = 48000
+    vendor = "youtube_audio_downloader"
+
+    def __init__(self, output: BinaryIO, serial: Optional[int] = None):
+        self._output = output
+        self._serial = random.getrandbits(32) if serial is None else serial
+        self._sequence = 0
+        self._granule = 0
+        self._end_trim = 0
+
+        self._packets: List[bytes] = []
+        self._segments = 0
+        self._page_samples = 0
+        self.bytes_written = 0
+
+    def _write_page(self, packets: List[bytes], granule: int, flags: int = 0) -> None:
+        lacing = bytearray()
+        for packet in packets:
+            quot, rem = divmod(len(packet), 255)
+            lacing += b"\xff" * quot + bytes((rem,))
+        page = bytearray(struct.pack("<4sBBqIIIB", b"OggS", 0, flags, granule,
+                                     self._serial, self._sequence, 0, len(lacing)))
+        page += lacing
+        for packet in packets:
+            page += packet
+        page[22:26] = struct.pack("<I", ogg_crc(bytes(page)))
+
+        self._output.write(page)
+        self.bytes_written += len(page)
+        self._sequence += 1
+
+    def _write_long_packet(self, packet: bytes) -> None:
+        """
+        Пишет пакет, который может не поместиться в одну страницу (OpusTags с
+        обложкой): таблица сегментов страницы ограничена 255 значениями, поэтому
+        пакет продолжается на следующих страницах с флагом продолжения.
+        """
+        quot, rem = divmod(len(packet), 255)
+        lacing = b"\xff" * quot + bytes((rem,))
+        offset = 0
+        for i in range(0, len(lacing), 255):
+            page_lacing = lacing[i:i + 255]
+            data_size = sum(page_lacing)
+            page = bytearray(struct.pack("<4sBBqIIIB", b"OggS", 0, 0x01 if i else 0,
+                                         0 if i + 255 >= len(lacing) else -1,
+                                         self._serial, self._sequence, 0,
+                                         len(page_lacing)))
+            page += page_lacing
+            page += packet[offset:offset + data_size]
+            offset += data_size
+            page[22:26] = struct.pack("<I", ogg_crc(bytes(page)))
+
+            self._output.write(page)
+            self.bytes_written += len(page)
+            self._sequence += 1
+
+    def write_headers(
+            self,
+            opus_head: bytes,
+            comments: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        Пишет заголовочные страницы OpusHead и OpusTags.
+
+        :param opus_head: (bytes) Пакет OpusHead из CodecPrivate.
+        :param comments: (Optional[Dict[str, str]]) Теги (комментарии Vorbis),
+            например title или METADATA_BLOCK_PICTURE.
+        """
+        vendor = self.vendor.encode()
+        opus_tags = bytearray(b"OpusTags" + struct.pack("<I", len(vendor)) + vendor)
+        items = [f"{key}={value}".encode() for key, value in (comments or {}).items()]
+        opus_tags += struct.pack("<I", len(items))
+        for item in items:
+            opus_tags += struct.pack("<I", len(item)) + item
+
+        self._write_page([opus_head], 0, flags=0x02)
+        self._write_long_packet(bytes(opus_tags))
+
+    def _flush(self, flags: int = 0) -> None:
+        self._write_page(self._packets, self._granule - self._end_trim, flags)
+        self._packets = []
+        self._segments = 0
+        self._page_samples = 0
+
+    def write_packet(self, packet: bytes, discard_samples: int = 0) -> None:
+        """
+        Добавляет аудиопакет.
+
+        :param packet: (bytes) Пакет Opus.
+        :param discard_samples: (int) Сколько сэмплов в конце пакета не
+            воспроизводить, имеет смысл только для последнего пакета.
+        """
+        segments = len(packet) // 255 + 1
+        if self._packets and (self._segments + segments > 255
+                              or self._page_samples >= self.page_duration):
+            self._flush()
+
+        samples = opus_packet_samples(packet)
+        self._packets.append(packet)
+        self._segments += segments
+        self._page_samples += samples
+        self._granule += samples
+        self._end_trim = min(discard_samples, samples)
+
+    def close(self) -> None:
+        """Пишет последнюю страницу с флагом конца потока."""
+        if not self._packets:
+            raise WebmError("No Opus packets were found")
+        self._flush(flags=0x04)
+
+
+class WebmOpusRemuxer:
+    """
+    Перепаковывает Opus из контейнера WebM (Matroska) в Ogg без ffmpeg и без
+    перекодирования. Файл читается последовательно, блоки сразу записываются
+    в страницы Ogg, поэтому расход памяти не зависит от длины трека.
+    """
+
+    read_size = 1024 * 1024
+
+    def __init__(
+            self,
+            source: BinaryIO,
+            output: BinaryIO,
+            comments: Optional[Dict[str, str]] = None
+    ):
+        self._source = source
+        self._writer = OggOpusWriter(output)
+        self._comments = comments
+        # Дорожки: [номер, CodecID, CodecPrivate]
+        self._tracks: List[list] = []
+        self._opus_track: Optional[int] = None
+
+    @property
+    def bytes_written(self) -> int:
+        return self._writer.bytes_written
+
+    def _select_track(self) -> None:
+        """Выбирает дорожку Opus и пишет заголовки Ogg перед первым блоком."""
+        for number, codec_id, codec_private in self._tracks:
+            if codec_id == "A_OPUS":
+                if not codec_private.startswith(b"OpusHead"):
+                    raise WebmError("Opus track has no OpusHead in CodecPrivate")
+                self._opus_track = number
+                self._writer.write_headers(codec_private, self._comments)
+                return
+        raise WebmError("WebM file has no Opus track")
+
+    def _handle_block(self, block: bytes, discard_padding: int = 0) -> None:
+        if self._opus_track is None:
+            self._select_track()
+
+        stream = io.BytesIO(block)
+        track = read_vint(stream, keep_marker=False)
+        if track is None or track[0] != self._opus_track:
+            return
+        # Смещение времени (2 байта) и флаги
+        header = stream.read(3)
+        if len(header) != 3:
+            raise WebmError("Truncated block header")
+        if header[2] & 0x06:
+            raise WebmError("Laced blocks are not supported")
+
+        # DiscardPadding задан в наносекундах, Ogg считает в сэмплах 48 кГц
+        discard_samples = max(0, discard_padding) * 48000 // 1_000_000_000
+        self._writer.write_packet(block[stream.tell():], discard_samples)
+
+    def _handle_block_group(self, data: bytes) -> None:
+        stream = io.BytesIO(data)
+        block, discard_padding = None, 0
+        while (element := read_element(stream)) is not None:
+            element_id, size = element
+            payload = read_payload(stream, size)
+            if element_id == _BLOCK:
+                block = payload
+            elif element_id == _DISCARD_PADDING:
+                discard_padding = int.from_bytes(payload, "big", signed=True)
+        if block is not None:
+            self._handle_block(block, discard_padding)
+
+    def remux(self) -> None:
+        stream = self._source
+        while (element := read_element(stream)) is not None:
+            element_id, size = element
+            if element_id in _MASTER_IDS:
+                # Заходим внутрь контейнера: дальше идут его дочерние элементы
+                if element_id == _TRACK_ENTRY:
+                    self._tracks.append([None, "", b""])
+                continue
+
+            if element_id == _SIMPLE_BLOCK:
+                self._handle_block(read_payload(stream, size))
+            elif element_id == _BLOCK_GROUP:
+                self._handle_block_group(read_payload(stream, size))
+            elif element_id in (_TRACK_NUMBER, _CODEC_ID, _CODEC_PRIVATE) and self._tracks:
+                payload = read_payload(stream, size)
+                if element_id == _TRACK_NUMBER:
+                    self._tracks[-1][0] = int.from_bytes(payload, "big")
+                elif element_id == _CODEC_ID:
+                    self._tracks[-1][1] = payload.rstrip(b"\x00").decode("ascii", "replace")
+                else:
+                    self._tracks[-1][2] = payload
+            else:
+                skip_payload(stream, size)
+
+        self._writer.close()
+
+
+def remux_webm_to_opus(
+        input_path: str,
+        output_path: str,
+        comments: Optional[Dict[str, str]] = None
+) -> int:
+    """
+    Перепаковывает файл WebM с Opus в Ogg Opus. Результат пишется во временный
+    файл рядом с выходным и переименовывается только после записи последней
+    страницы, поэтому прерванная перепаковка (в том числе SIGKILL) не оставляет
+    обрывок под именем трека.
+
+    :param input_path: (str) Путь к исходному файлу .webm.
+    :param output_path: (str) Путь к выходному файлу .opus.
+    :param comments: (Optional[Dict[str, str]]) Теги, которые сразу
+        записываются в OpusTags.
+    :return: (int) Количество записанных байт.
+    """
+    out_dir, out_name = os.path.split(output_path)
+    fd, tmp_output = tempfile.mkstemp(prefix=".remux-", suffix="-" + out_name,
+                                      dir=out_dir or None)
+    try:
+        os.chmod(tmp_output, 0o644)  # mkstemp создает файл только для владельца
+        with open(input_path, "rb", buffering=WebmOpusRemuxer.read_size) as source, \
+                open(fd, "wb", buffering=WebmOpusRemuxer.read_size) as output:
+            if source.read(4) != struct.pack(">I", _EBML):
+                raise WebmError(f"Not an EBML file: {input_path}")
+            source.seek(0)
+            remuxer = WebmOpusRemuxer(source, output, comments)
+            remuxer.remux()
+        os.replace(tmp_output, output_path)
+        return remuxer.bytes_written
+    finally:
+        if os.path.exists(tmp_output):
+            os.remove(tmp_output)
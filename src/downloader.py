@@ -1,5 +1,11 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+import threading
 import time
+import re
+import copy
 import os
 import shutil
 import logging
@@ -7,21 +13,111 @@ import random
 
 from yt_dlp import YoutubeDL
 
-from .entities import Attempt
+from .entities import Attempt, YoutubeLink
 from .config.app_config import get_config
 from .converter.converter import Converter
-from .entities import DownloadCallback, Metadata
+from .converter.post_processor import PostProcessor
+from .entities import DownloadCallback, JobState, Metadata
+from .info_cache import InfoCache
+from .journal import Journal
+from .pacing import PacingController
+from .proxy_pool import get_proxy_pool
+from .quota import QuotaExceeded
+from .segmented import SegmentedDownloader
+from .streaming import HttpStream
 from .utils import (
     remove_empty_files,
     countdown_timer,
-    read_user_agents
+    read_user_agents,
+    extract_type_and_id
 )
 
 
+class _Worker:
+    """
+    Состояние одного потока загрузки со своими опциями YoutubeDL. Экземпляр
+    YoutubeDL живет столько же, сколько поток, чтобы кэши плеера и подписей
+    yt-dlp оставались прогретыми между видео.
+    """
+
+    def __init__(self, index: int, user_agent: str):
+        self.index = index
+        self.user_agent = user_agent
+        self.hook_callback: Optional[DownloadCallback] = None
+        self.ydl: Optional[YoutubeDL] = None
+        self.proxy = ""  # Прокси, с которым создан текущий экземпляр YoutubeDL
+        # Размер и время последней загрузки для регулятора темпа
+        self.downloaded_bytes: Optional[int] = None
+        self.download_elapsed: Optional[float] = None
+
+
+class _TaskQueue:
+    """
+    Общая очередь ссылок для потоков загрузки. Пока очередь открыта, в нее
+    добавляются ссылки со следующих страниц плейлиста, и потоки ждут их, а не
+    завершаются.
+    """
+
+    def __init__(self, urls: Iterable[str] = (), closed: bool = True):
+        self._items = deque(urls)
+        self._cond = threading.Condition()
+        self._closed = closed
+
+    def put_many(self, urls: Iterable[str]) -> None:
+        with self._cond:
+            self._items.extend(urls)
+            self._cond.notify_all()
+
+    def retry(self, url: str) -> None:
+        """Возвращает ссылку в начало очереди для повторной попытки."""
+        with self._cond:
+            self._items.appendleft(url)
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Новых ссылок больше не будет."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def get(self, stop: threading.Event) -> Optional[str]:
+        """
+        Возвращает следующую ссылку. Если очередь пуста, но еще открыта, ждет
+        новые ссылки. None - очередь закрыта и пуста или выставлен флаг остановки.
+        """
+        with self._cond:
+            while not self._items and not self._closed and not stop.is_set():
+                self._cond.wait(0.5)
+            if stop.is_set() or not self._items:
+                return None
+            return self._items.popleft()
+
+    def has_more(self) -> bool:
+        with self._cond:
+            return bool(self._items) or not self._closed
+
+    def wait_below(self, size: int, stop: threading.Event) -> None:
+        """Ждет, пока в очереди останется меньше size ссылок."""
+        with self._cond:
+            while len(self._items) >= size and not stop.is_set():
+                self._cond.wait(0.5)
+
+
+@dataclass
+class _Progress:
+    """Общие для всех потоков счетчики прогресса загрузки."""
+    total: int
+    counter: int
+    skipped: int = 0
+
+
 class Downloader:
     def __init__(self, convertor: Converter):
         self._config = get_config()
         self._converter = convertor
+        self._journal = Journal()
+        self._info_cache = InfoCache()
+        self._post_processor = PostProcessor(convertor, self._journal)
         self._logger = logging.getLogger()
         self._yt_dlp_logger = logging.getLogger('yt-dlp')
 
@@ -30,122 +126,588 @@ class Downloader:
         self._download_directory = self._config.download.download_directory
         self._filename_format = self._config.download.filename_format
         self._skip_shorts = self._config.download.skip_shorts
-        self._proxy = self._config.extended.proxy
+        self._proxy_pool = get_proxy_pool()
+
+        self._workers = self._config.performance.download_workers
 
-        self._delay_between_downloads = 13
+        self._stream_convert = self._config.performance.stream_convert
+        self._segments = self._config.performance.segmented_download
+        self._segmented_min_size = self._config.performance.segmented_min_size_mb * 1024 * 1024
+        # Форматы аудио YouTube, которые конвертируются (251 - opus, 140 - m4a)
+        self._format_dict = {'251': 'opus', '140': 'm4a'}
+
+        self._pacing = PacingController()
         self._user_agents = read_user_agents()
-        self._hook_callback: Optional[DownloadCallback] = None
+        self._lock = threading.Lock()
+        # Каталог сохранения каждой ссылки, если источников несколько
+        self._save_paths: Dict[str, str] = {}
+        # Бюджет квоты закончился во время чтения страниц плейлиста
+        self._quota_error: Optional[QuotaExceeded] = None
 
-    def _get_ydl_options(self, save_path: str, useragent: str) -> Dict[str, Any]:
+    def _get_ydl_options(self, save_path: str, worker: _Worker) -> Dict[str, Any]:
         """
         Генерирует словарь с опциями для скачивания.
 
         :param save_path: Путь для сохранения скачанных файлов.
+        :param worker: (_Worker) Поток, для которого формируются опции.
         :return: Словарь с опциями.
         """
 
-        # Генерируем случайный лимит от 300 до 600 KB/s
-        random_ratelimit = random.randint(300, 600) * 1024
-
         ydl_opts = {
             'format': "bestaudio/best",
             'outtmpl': os.path.join(save_path, 'tmp', self._filename_format),
-            'progress_hooks': [self._download_complete_hook],  # Хук для обработки
-            'headers': {'User-Agent': useragent},
+            # Хук для обработки, привязанный к своему потоку
+            'progress_hooks': [partial(self._download_complete_hook, worker)],
+            'headers': {'User-Agent': worker.user_agent},
             'writethumbnail': self._write_thumbnail,  # Загружаем миниатюры
             'whritemetadata': self._write_metadata,  # Загружаем метаданные
-            'ratelimit': random_ratelimit
+            # Лимит скорости подбирает регулятор темпа
+            'ratelimit': self._pacing.ratelimit
         }
-        if self._proxy:
-            ydl_opts['proxy'] = self._proxy
+        if worker.proxy:
+            ydl_opts['proxy'] = worker.proxy
 
         return ydl_opts
 
-    def _download_complete_hook(self, d) -> None:
+    def _build_callback(self, info_dict: Dict[str, Any], audio_path: str) -> DownloadCallback:
+        """Формирует результат загрузки по обработанной информации о видео."""
+        callback = DownloadCallback(
+            audio_path="",
+            thumbnail_path="",
+            metadata=Metadata(title="", artist="", date="", comment=""),
+            bitrate_check=True
+        )
+
+        format_id = info_dict['format_id']
+        if format_id not in self._format_dict:
+            callback.bitrate_check = False
+
+        callback.audio_path = audio_path
+        # Битрейт уже известен yt-dlp, конвертеру не нужно его определять
+        callback.bitrate = info_dict.get('abr') or info_dict.get('tbr')
+
+        # Получаем информацию о миниатюре
+        if self._write_thumbnail:
+            thumbnail_info = info_dict.get('thumbnails', [])
+            if thumbnail_info:
+                callback.thumbnail_path = info_dict['thumbnails'][-1].get('filepath')
+
+        if self._write_metadata and callback.metadata:
+            # Формируем словарь с нужными метаданными
+            callback.metadata.title = info_dict.get('title', '')
+            callback.metadata.artist = info_dict.get('uploader', '')
+            callback.metadata.date = info_dict.get('upload_date', '')
+            callback.metadata.comment = info_dict.get('webpage_url', '')
+
+        return callback
+
+    def _download_complete_hook(self, worker: _Worker, d) -> None:
         """
         Хук, который выполняется с какой-то периодичностью во время
         скачивания файла.
         """
         if d['status'] == 'finished':
-            callback = DownloadCallback(
-                audio_path="",
-                thumbnail_path="",
-                metadata=Metadata(title="", artist="", date="", comment=""),
-                bitrate_check=True
-            )
+            worker.downloaded_bytes = d.get('total_bytes') or d.get('downloaded_bytes')
+            worker.download_elapsed = d.get('elapsed')
 
-            format_id = d['info_dict']['format_id']
-            format_dict = {'251': 'opus', '140': 'm4a'}
-            if format_id not in format_dict:
-                callback.bitrate_check = False
+            worker.hook_callback = self._build_callback(d['info_dict'], d['filename'])
 
-            callback.audio_path = d['filename']
+    def _check_shorts(self, info_dict: Dict[str, Any]) -> bool:
+        """Проверяет по уже извлеченной информации, является ли видео коротким."""
+        duration = info_dict.get('duration')
+        if duration is not None and 0 <= duration <= 60:
+            self._yt_dlp_logger.info(
+                f"[*downloader] Skip video format 'shorts': {info_dict.get('title', '')}")
+            return True
+        return False
 
-            # Получаем информацию о миниатюре
-            if self._write_thumbnail:
-                thumbnail_info = d['info_dict'].get('thumbnails', [])
-                if thumbnail_info:
-                    callback.thumbnail_path = d['info_dict']['thumbnails'][-1].get(
-                        'filepath')
+    def _create_worker(self, index: int) -> _Worker:
+        user_agent = random.choice(self._user_agents)
+        return _Worker(index, user_agent)
 
-            if self._write_metadata and callback.metadata:
-                info_dict = d['info_dict']
+    def _get_session(self, worker: _Worker, save_path: str, proxy: str) -> YoutubeDL:
+        """
+        Возвращает долгоживущий экземпляр YoutubeDL потока, создавая его при
+        первом обращении или при смене прокси. Путь сохранения и лимит скорости
+        обновляются на каждую загрузку.
+        """
+        if worker.proxy != proxy:
+            self._close_session(worker)
+            worker.proxy = proxy
+
+        ydl_opts = self._get_ydl_options(save_path, worker)
+        if worker.ydl is None:
+            worker.ydl = YoutubeDL(ydl_opts)
+        else:
+            worker.ydl.params['outtmpl']['default'] = ydl_opts['outtmpl']
+            worker.ydl.params['ratelimit'] = ydl_opts['ratelimit']
+        return worker.ydl
+
+    @staticmethod
+    def _close_session(worker: _Worker) -> None:
+        if worker.ydl is not None:
+            worker.ydl.close()
+            worker.ydl = None
+
+    @staticmethod
+    def _get_video_id(url: str) -> str:
+        """Id видео для кэша; для ссылок не с YouTube ключом служит сама ссылка."""
+        link_type, video_id = extract_type_and_id(url)
+        return video_id if link_type == YoutubeLink.VIDEO else url
+
+    def _extract_info(
+            self,
+            ydl: YoutubeDL,
+            url: str,
+            proxy: str
+    ) -> Tuple[Dict[str, Any], Optional[float]]:
+        """
+        Извлекает информацию о видео без обработки форматов, используя дисковый
+        кэш, если в нем есть действующая запись для этого прокси.
 
-                # Формируем словарь с нужными метаданными
-                callback.metadata.title = info_dict.get('title', '')
-                callback.metadata.artist = info_dict.get('uploader', '')
-                callback.metadata.date = info_dict.get('upload_date', '')
-                callback.metadata.comment = info_dict.get('webpage_url', '')
+        :return: Информация о видео и время извлечения, с. Для записи из кэша
+            время - None: обращения к YouTube не было, и регулятору темпа
+            учитывать нечего.
+        """
+        video_id = self._get_video_id(url)
+        info_dict = self._info_cache.get(video_id, proxy)
+        if info_dict is not None:
+            return info_dict, None
+        start = time.time()
+        info_dict = ydl.extract_info(url, download=False, process=False)
+        latency = time.time() - start
+        self._info_cache.put(video_id, info_dict, proxy)
+        return info_dict, latency
+
+    def _stream_download(
+            self,
+            worker: _Worker,
+            ydl: YoutubeDL,
+            info_dict: Dict[str, Any],
+            proxy: str
+    ) -> Optional[DownloadCallback]:
+        """
+        Потоковый режим (STREAM_CONVERT): байты аудио передаются в ffmpeg по мере
+        загрузки, промежуточный файл на диск не пишется. yt-dlp при этом только
+        выбирает формат и сохраняет миниатюру.
 
-            self._hook_callback = callback
+        :return: (Optional[DownloadCallback]) Результат со сконвертированным
+            файлом или None, если формат не подходит и нужна обычная загрузка.
+        """
+        ydl.params['skip_download'] = True
+        try:
+            processed = ydl.process_ie_result(copy.deepcopy(info_dict), download=True)
+        finally:
+            ydl.params['skip_download'] = False
+
+        if not processed or processed.get('format_id') not in self._format_dict \
+                or not processed.get('url'):
+            return None
+
+        audio_path = processed.get('filepath') or ydl.prepare_filename(processed)
+        stream = HttpStream(
+            processed['url'],
+            headers=processed.get('http_headers'),
+            proxy=proxy,
+            ratelimit=self._pacing.ratelimit,
+            chunk_size=(processed.get('downloader_options') or {}).get('http_chunk_size')
+        )
+        converted_path = self._converter.convert_stream(
+            stream, audio_path, processed.get('abr') or processed.get('tbr'))
+        worker.downloaded_bytes = stream.downloaded_bytes
+        worker.download_elapsed = stream.elapsed
+
+        callback = self._build_callback(processed, "")
+        callback.converted_path = converted_path
+        return callback
+
+    def _segmented_download(
+            self,
+            worker: _Worker,
+            ydl: YoutubeDL,
+            info_dict: Dict[str, Any],
+            proxy: str
+    ) -> bool:
+        """
+        Сегментированный режим (SEGMENTED_DOWNLOAD): большой файл скачивается
+        несколькими диапазонами параллельно прямо по пути, который использует
+        yt-dlp. Последующий process_ie_result находит готовый файл, вызывает хук
+        завершения и сохраняет миниатюру как обычно.
 
-    def _check_shorts(self, ydl: YoutubeDL, url: str) -> bool:
-        """Проверяет, является ли видео коротким или нет."""
-        # Извлекаем информацию о видео без загрузки
-        info_dict = ydl.extract_info(url, download=False)
+        :return: (bool) True, если файл скачан, False - если формат не подходит.
+        """
+        processed = ydl.process_ie_result(copy.deepcopy(info_dict), download=False)
+        if not processed or processed.get('requested_formats') \
+                or processed.get('protocol') not in ('http', 'https') \
+                or not processed.get('url'):
+            return False
+
+        filesize = processed.get('filesize')
+        if not filesize or filesize < self._segmented_min_size:
+            return False
+
+        audio_path = ydl.prepare_filename(processed)
+        if os.path.exists(audio_path):
+            return False
+
+        segmented = SegmentedDownloader(
+            self._segments,
+            headers=processed.get('http_headers'),
+            proxy=proxy,
+            ratelimit=self._pacing.ratelimit
+        )
+        try:
+            worker.downloaded_bytes, worker.download_elapsed = segmented.download(
+                processed['url'], filesize, audio_path)
+        finally:
+            segmented.close()
+        return True
 
-        duration = info_dict.get('duration', 0)
-        if 0 <= duration <= 60:
+    def _download_attempt(
+            self,
+            worker: _Worker,
+            url: str,
+            save_path: str,
+            proxy: str
+    ) -> Attempt:
+        worker.hook_callback = None
+        worker.downloaded_bytes = worker.download_elapsed = None
+
+        # Файл уже скачан в прошлый раз, осталось закончить постобработку
+        restored = self._journal.restore_callback(url, save_path)
+        if restored is not None:
             self._yt_dlp_logger.info(
-                f"[*downloader] Skip video format 'shorts': {info_dict.get('title', '')}")
-            return True
-        return False
-
-    def _download_attempt(self, url: str, save_path: str) -> Attempt:
-        user_agent = random.choice(self._user_agents)
-        ydl_opts = self._get_ydl_options(save_path, user_agent)
+                f"[*downloader] Resuming post-processing: {restored.audio_path}")
+            return self._submit(restored)
 
+        self._journal.mark_downloading(url, save_path)
         try:
-            with YoutubeDL(ydl_opts) as ydl:
-                if self._skip_shorts and self._check_shorts(ydl, url):
-                    return Attempt.SHORTS
-                # Если видео не является shorts, загружаем его
-                ydl.download([url])
+            ydl = self._get_session(worker, save_path, proxy)
+            # Извлекаем информацию один раз: она же используется для проверки
+            # shorts и для загрузки.
+            info_dict, extract_latency = self._extract_info(ydl, url, proxy)
+            if self._skip_shorts and self._check_shorts(info_dict):
+                self._journal.mark(url, save_path, JobState.SKIPPED)
+                self._pacing.on_shorts(extract_latency)
+                return Attempt.SHORTS
+            # Если видео не является shorts, загружаем его
+            callback = None
+            if self._stream_convert:
+                callback = self._stream_download(worker, ydl, info_dict, proxy)
+            if callback is None:
+                segmented = self._segments > 1 and \
+                    self._segmented_download(worker, ydl, info_dict, proxy)
+                elapsed = worker.download_elapsed
+                ydl.process_ie_result(info_dict, download=True)
+                callback = worker.hook_callback
+                if segmented:
+                    # Хук видит уже готовый файл и не знает времени загрузки
+                    worker.download_elapsed = elapsed
 
-            callback = self._hook_callback
             if callback is None:
                 self._yt_dlp_logger.warning(f"[*downloader] Callback did not return.")
+                self._journal.mark(url, save_path, JobState.FAILED, "Callback did not return")
+                self._pacing.on_error("Callback did not return")
                 return Attempt.ERROR
 
-            if callback.bitrate_check:
-                assert isinstance(callback.metadata, Metadata)
-                self._converter.convert(
-                    callback.audio_path,
-                    callback.thumbnail_path,
-                    callback.metadata
-                )
-            else:
-                self._yt_dlp_logger.warning(
-                    f"[*downloader] Skipped because the audio bitrate is too low.")
+        except Exception as e:
+            # После ошибки начинаем с чистой сессии (cookies, соединения)
+            self._close_session(worker)
+            self._journal.mark(url, save_path, JobState.FAILED, str(e))
+            self._pacing.on_error(str(e))
+            if re.search(r"HTTP Error (403|410)", str(e)):
+                # Ссылки на форматы в кэше, вероятно, уже недействительны
+                self._info_cache.invalidate(self._get_video_id(url))
+            return Attempt.ERROR
 
-            if callback.audio_path:
-                os.remove(callback.audio_path)
-            if callback.thumbnail_path:
-                os.remove(callback.thumbnail_path)
-            return Attempt.SUCCESS
+        self._pacing.on_success(
+            worker.downloaded_bytes, worker.download_elapsed, extract_latency)
 
+        callback.url = url
+        callback.save_path = save_path
+        self._journal.mark_downloaded(callback)
+        if callback.converted_path:
+            self._journal.mark_converted(url, save_path, callback.converted_path)
+        return self._submit(callback)
+
+    def _submit(self, callback: DownloadCallback) -> Attempt:
+        """Передает файл на стадию постобработки и сразу освобождает поток."""
+        try:
+            self._post_processor.submit(callback)
         except Exception:
+            # Состояние в журнале остается DOWNLOADED/CONVERTED, следующая
+            # попытка продолжит постобработку без повторной загрузки.
             return Attempt.ERROR
+        return Attempt.SUCCESS
+
+    def _log_progress(self, progress: _Progress) -> None:
+        cnt_text = f"Loading... \033[32m[{progress.counter}/{progress.total}]\033[0m"
+        cnt_text += f", Skipped shorts: {progress.skipped}" if progress.skipped else ""
+        self._logger.info(cnt_text)
+
+    def _stop_bot_block(self, stop: threading.Event) -> None:
+        """Останавливает все потоки, когда все прокси пула заблокированы."""
+        with self._lock:
+            if not stop.is_set():
+                print()
+                if len(self._proxy_pool) > 1:
+                    self._logger.error(
+                        "All proxies in the pool are in the bot block, try later or "
+                        "add cleaner proxies")
+                else:
+                    self._logger.error(
+                        "Your IP is in the bot block, try later or use a "
+                        "cleaner VPN or proxy")
+            stop.set()
+
+    def _wait_next(self, delay: float, stop: threading.Event) -> None:
+        """Пауза между загрузками: таймер в консоли для одного потока."""
+        if self._workers == 1:
+            countdown_timer(delay)
+        else:
+            stop.wait(delay)
+
+    def _worker_loop(
+            self,
+            worker: _Worker,
+            urls: _TaskQueue,
+            save_path: str,
+            progress: _Progress,
+            stop: threading.Event
+    ) -> None:
+        """
+        Забирает ссылки из общей очереди и скачивает их, пока очередь не опустеет
+        или не будет выставлен флаг остановки.
+        """
+        try:
+            self._process_queue(worker, urls, save_path, progress, stop)
+        finally:
+            self._close_session(worker)
+
+    def _process_queue(
+            self,
+            worker: _Worker,
+            urls: _TaskQueue,
+            save_path: str,
+            progress: _Progress,
+            stop: threading.Event
+    ) -> None:
+        while not stop.is_set():
+            start = time.time()
+            # Прокси берется только под уже полученную ссылку: пока поток ждет
+            # следующую страницу плейлиста, прокси свободен для других потоков
+            url = urls.get(stop)
+            if url is None:
+                return
+
+            proxy = self._proxy_pool.acquire()
+            if proxy is None:
+                self._stop_bot_block(stop)
+                return
+
+            with self._lock:
+                progress.counter += 1
+                print()  # Отступ для читаемости лога
+                self._log_progress(progress)
+
+            try:
+                download_result = self._download_attempt(
+                    worker, url, self._save_paths.get(url, save_path), proxy)
+            finally:
+                self._proxy_pool.release(proxy)
+
+            if download_result == Attempt.ERROR:
+                # Счетчик ошибок подряд ведется для каждого прокси отдельно
+                self._proxy_pool.report_failure(proxy)
+            else:
+                throughput = None
+                if worker.downloaded_bytes and worker.download_elapsed:
+                    throughput = worker.downloaded_bytes / worker.download_elapsed
+                self._proxy_pool.report_success(proxy, throughput)
+
+            with self._lock:
+                if download_result == Attempt.ERROR:
+                    progress.counter -= 1
+                elif download_result == Attempt.SHORTS:
+                    progress.skipped += 1
+                    progress.counter -= 1
+            if download_result == Attempt.ERROR:
+                urls.retry(url)  # Повторим попытку для этой ссылки
+
+            if self._proxy_pool.is_exhausted():
+                self._stop_bot_block(stop)  # Прерывание загрузки после блокировки бота
+                return
+
+            delay = self._pacing.next_delay() - (time.time() - start)
+            if urls.has_more() and delay > 0:
+                self._wait_next(delay, stop)
+
+    def _run_workers(
+            self,
+            urls: _TaskQueue,
+            save_path: str,
+            progress: _Progress,
+            stop: threading.Event,
+            workers_count: int
+    ) -> None:
+        """Запускает пул потоков загрузки над общей очередью ссылок."""
+        if workers_count == 1:
+            self._worker_loop(self._create_worker(0), urls, save_path, progress, stop)
+            return
+
+        threads = [
+            threading.Thread(
+                target=self._worker_loop,
+                args=(self._create_worker(i), urls, save_path, progress, stop),
+                name=f"download-worker-{i}",
+                daemon=True
+            )
+            for i in range(workers_count)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                # join с таймаутом, чтобы Ctrl+C доходил до главного потока
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            raise
+
+    def _resume_from_journal(self, urls: List[str], save_path: str) -> List[str]:
+        """
+        Добавляет в журнал новые ссылки и возвращает задания, скачанные в прошлый
+        раз, но не прошедшие постобработку. Их итоговый файл может уже лежать
+        в каталоге, поэтому фильтр уже скачанных их не вернет.
+        """
+        self._journal.enqueue(urls, save_path)
+        known_urls = set(urls)
+        resumed = [url for url in self._journal.resumable_urls(save_path)
+                   if url not in known_urls]
+        if resumed:
+            self._logger.info(f"Resuming {len(resumed)} unfinished item(s) from the journal.")
+        return resumed
+
+    def _feed_pages(
+            self,
+            pages: Iterable[Tuple[List[str], int, str]],
+            urls: _TaskQueue,
+            progress: _Progress,
+            stop: threading.Event,
+            seen: set,
+            resumed_paths: set,
+            backlog: Optional[int] = None
+    ) -> None:
+        """
+        Поток, который перекладывает страницы плейлистов в очередь загрузки.
+
+        :param pages: (Iterable[Tuple[List[str], int, str]]) Ссылки страницы,
+            количество ее элементов до фильтра уже скачанных и каталог сохранения.
+        :param seen: (set) Ссылки, которые уже стоят в очереди (например,
+            восстановленные из журнала), чтобы не скачать их дважды.
+        :param resumed_paths: (set) Каталоги, незавершенные задания которых уже
+            восстановлены из журнала.
+        :param backlog: (Optional[int]) Если задан, следующая страница берется
+            только когда в очереди загрузки осталось меньше backlog ссылок, и
+            источник страниц ждет, пока загрузка их догонит.
+        """
+        try:
+            for page_urls, page_length, save_path in pages:
+                if stop.is_set():
+                    break
+                if save_path not in resumed_paths:
+                    # Первый раз видим каталог: подбираем его задания из журнала
+                    resumed_paths.add(save_path)
+                    resumed = [url for url in self._resume_from_journal([], save_path)
+                               if url not in seen]
+                    seen.update(resumed)
+                    self._save_paths.update(dict.fromkeys(resumed, save_path))
+                    with self._lock:
+                        progress.total += len(resumed)
+                    urls.put_many(resumed)
+
+                new_urls = [url for url in page_urls if url not in seen]
+                seen.update(new_urls)
+                page_length -= len(page_urls) - len(new_urls)
+
+                self._journal.enqueue(new_urls, save_path)
+                self._save_paths.update(dict.fromkeys(new_urls, save_path))
+                with self._lock:
+                    # Уже скачанные элементы страницы сразу засчитываем в прогресс
+                    progress.total += page_length
+                    progress.counter += page_length - len(new_urls)
+                urls.put_many(new_urls)
+                if backlog is not None:
+                    urls.wait_below(backlog, stop)
+        except QuotaExceeded as e:
+            # Уже поставленные в очередь ссылки докачиваются, а ошибка
+            # передается вызывающему коду после завершения потоков загрузки
+            self._quota_error = e
+        except Exception as e:
+            self._logger.error(f"Failed to fetch the next playlist page: {e}")
+        finally:
+            urls.close()
+
+    def _download(
+            self,
+            urls: _TaskQueue,
+            save_path: str,
+            progress: _Progress,
+            pages: Optional[Iterable[Tuple[List[str], int, str]]] = None,
+            seen: Optional[set] = None,
+            workers_count: Optional[int] = None,
+            resumed_paths: Optional[set] = None,
+            backlog: Optional[int] = None
+    ) -> None:
+        stop = threading.Event()
+        completed = False
+        self._save_paths = {}
+        self._quota_error = None
+        try:
+            self._post_processor.start()
+            if pages is not None:
+                threading.Thread(
+                    target=self._feed_pages,
+                    args=(pages, urls, progress, stop, seen or set(),
+                          {save_path} if resumed_paths is None else resumed_paths,
+                          backlog),
+                    name="playlist-pages",
+                    daemon=True
+                ).start()
+            self._run_workers(urls, save_path, progress, stop,
+                              workers_count or self._workers)
+            completed = True
+
+        finally:
+            stop.set()  # Останавливаем чтение страниц, если оно еще идет
+            # Дожидаемся постобработки, прежде чем чистить каталог tmp
+            self._post_processor.close(cancel=not completed)
+            for path in {save_path, *self._save_paths.values()}:
+                self._clean_save_path(path)
+
+        if self._quota_error is not None:
+            raise self._quota_error
+
+    def _clean_save_path(self, save_path: str) -> None:
+        """Удаляет каталог tmp, если в нем не осталось незавершенных заданий."""
+        if not os.path.isdir(save_path):
+            return
+        tmp_path = os.path.join(save_path, "tmp")
+        unfinished = self._journal.unfinished_count(save_path)
+        if unfinished:
+            # Сохраняем .part и скачанные файлы, чтобы продолжить с них
+            self._logger.info(
+                f"{unfinished} unfinished item(s) kept in {tmp_path} for resume.")
+        elif os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        remove_empty_files(save_path)
+
+    def _get_save_path(self, playlist_name: Optional[str]) -> str:
+        save_path = self._download_directory
+        if playlist_name:
+            save_path = os.path.join(save_path, playlist_name)
+        return save_path
 
     def download_links(
             self,
@@ -155,6 +717,8 @@ class Downloader:
     ) -> None:
         """
         Скачивает аудио по списку из urls и сохраняет в каталоге save_path.
+        Если в настройках DOWNLOAD_WORKERS > 1, ссылки разбираются пулом потоков
+        из общей очереди.
 
         :param urls: (List[str]) Список ссылок для скачивания аудио.
         :param playlist_name: (Optional[str]) Название плейлиста, если скачивается
@@ -163,52 +727,62 @@ class Downloader:
             после фильтра), параметр нужен для логирования.
         :return: None
         """
-        download_counter = playlist_length - len(urls)
-        skipped_counter = 0
-        save_path = self._download_directory
-        if playlist_name:
-            save_path = os.path.join(save_path, playlist_name)
-
-        try:
-            _bot_block_cnt = 0
-            while urls:
-                print()  # Отступ для читаемости лога
-                start = time.time()
+        save_path = self._get_save_path(playlist_name)
+        resumed = self._resume_from_journal(urls, save_path)
+        urls = resumed + urls
+        playlist_length += len(resumed)
 
-                url = next(iter(urls))
-                download_counter += 1
-                cnt_text = f"Loading... {"\033[32m"}[{download_counter}/{playlist_length}]{"\033[0m"}"
-                cnt_text += f", Skipped shorts: {skipped_counter}" if skipped_counter else ""
-                self._logger.info(cnt_text)
+        progress = _Progress(total=playlist_length, counter=playlist_length - len(urls))
+        self._download(_TaskQueue(urls), save_path, progress,
+                       workers_count=max(1, min(self._workers, len(urls))))
 
-                download_result = self._download_attempt(url, save_path)
-                if download_result == Attempt.ERROR:
-                    _bot_block_cnt += 1
-                    download_counter -= 1
-                else:
-                    if download_result == Attempt.SHORTS:
-                        skipped_counter += 1
-                        download_counter -= 1
-                    _bot_block_cnt = 0
-                    urls.remove(url)
-
-                if _bot_block_cnt == 3:
-                    print()
-                    self._logger.error(
-                        "Your IP is in the bot block, try later or use a "
-                        "cleaner VPN or proxy")
-                    break  # Прерывание загрузки после блокировки бота
+    def download_stream(
+            self,
+            pages: Iterable[Tuple[List[str], int]],
+            playlist_name: Optional[str] = None
+    ) -> None:
+        """
+        Скачивает аудио по мере поступления страниц плейлиста: загрузка начинается
+        сразу после первой страницы, а общее количество в прогрессе растет с
+        каждой новой страницей.
+
+        :param pages: (Iterable[Tuple[List[str], int]]) Отфильтрованные страницы:
+            ссылки для скачивания и количество элементов страницы до фильтра уже
+            скачанных (см. Filter.iter_filters).
+        :param playlist_name: (Optional[str]) Название плейлиста.
+        :return: None
+        """
+        save_path = self._get_save_path(playlist_name)
+        resumed = self._resume_from_journal([], save_path)
 
-                rand = round(random.uniform(0, 3), 1)
-                delay = self._delay_between_downloads + rand - (time.time() - start)
-                if urls and delay > 0:
-                    countdown_timer(delay)
+        progress = _Progress(total=len(resumed), counter=0)
+        self._download(_TaskQueue(resumed, closed=False), save_path, progress,
+                       ((page_urls, page_length, save_path)
+                        for page_urls, page_length in pages),
+                       seen=set(resumed))
 
-        finally:
-            tmp_path = os.path.join(save_path, "tmp")
-            if os.path.exists(tmp_path):
-                shutil.rmtree(tmp_path)
-            remove_empty_files(save_path)
+    def download_batch(
+            self,
+            pages: Iterable[Tuple[List[str], int, Optional[str]]]
+    ) -> None:
+        """
+        Скачивает аудио из нескольких источников (видео, плейлистов, каналов)
+        одной общей очередью. Страницы разных источников приходят вперемешку,
+        ссылка, которая встречается в нескольких источниках, скачивается один
+        раз - в каталог первого из них. Следующая страница берется, только когда
+        загрузка почти разобрала очередь, поэтому источники не читают страницы
+        (и не тратят квоту) далеко впереди загрузки.
+
+        :param pages: (Iterable[Tuple[List[str], int, Optional[str]]])
+            Отфильтрованные ссылки страницы, количество ее элементов до фильтра
+            уже скачанных и название плейлиста (None - корневой каталог).
+        :return: None
+        """
+        progress = _Progress(total=0, counter=0)
+        self._download(_TaskQueue(closed=False), self._download_directory, progress,
+                       ((page_urls, page_length, self._get_save_path(playlist_name))
+                        for page_urls, page_length, playlist_name in pages),
+                       seen=set(), resumed_paths=set(), backlog=self._workers * 2)
 
     def list_available_formats(self, video_url: str) -> None:
         """
@@ -220,4 +794,5 @@ class Downloader:
         ydl_opts = {'listformats': True}
 
         with YoutubeDL(ydl_opts) as ydl:
-            ydl.extract_info(video_url, download=False)
+            info_dict, _ = self._extract_info(ydl, video_url, "")
+            ydl.process_ie_result(info_dict, download=False)
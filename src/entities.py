@@ -1,5 +1,6 @@
 from enum import StrEnum
 from dataclasses import dataclass
+from typing import Optional
 
 
 class YoutubeLink(StrEnum):
@@ -21,6 +22,7 @@ class Snippet:
     title: str
     url: str
     published: str
+    video_id: str = ""
 
 
 @dataclass
@@ -37,9 +39,23 @@ class DownloadCallback:
     thumbnail_path: str
     metadata: Metadata
     bitrate_check: bool
+    url: str = ""
+    converted_path: str = ""
+    bitrate: Optional[float] = None  # abr/tbr из информации yt-dlp, кбит/с
+    save_path: str = ""  # Каталог сохранения, вместе с url - ключ задания в журнале
 
 
 class Attempt(StrEnum):
     SUCCESS = "SUCCESS"
     ERROR = "ERROR"
     SHORTS = "SHORTS"
+
+
+class JobState(StrEnum):
+    QUEUED = "QUEUED"
+    DOWNLOADING = "DOWNLOADING"
+    DOWNLOADED = "DOWNLOADED"
+    CONVERTED = "CONVERTED"
+    TAGGED = "TAGGED"
+    SKIPPED = "SKIPPED"
+    FAILED = "FAILED"
@@ -1,4 +1,4 @@
-from typing import Optional, List, Dict, Tuple
+from typing import Iterable, Iterator, Optional, List, Dict, Set, Tuple
 import re
 import os
 import logging
@@ -6,23 +6,64 @@ from datetime import datetime
 
 from .config.app_config import get_config
 from .entities import Snippet
-from .utils import normalize_string
+from .quota import QuotaExceeded
+from .utils import normalize_string, parse_iso8601_duration
+
+
+# Первый год, в котором на YouTube могли появиться видео
+FIRST_VIDEO_YEAR = 2005
+
+
+def get_year_bounds(
+        filter_date: str,
+        last_year: Optional[int] = None
+) -> Optional[Tuple[int, int]]:
+    """
+    Находит самый ранний и самый поздний год публикации, которые проходят
+    фильтр FILTER_DATE. Выражение проверяется для каждого возможного года, так
+    что подходит любое допустимое выражение, а не только простые сравнения.
+
+    :param filter_date: (str) Выражение фильтра, например "[x] >= 2024".
+    :param last_year: (Optional[int]) Последний проверяемый год, по умолчанию
+        следующий за текущим.
+    :return: (Optional[Tuple[int, int]]) Границы (включительно) или None, если
+        фильтр не проходит ни один год. Если выражение не удалось вычислить,
+        возвращается весь диапазон, то есть без ограничений.
+    """
+    expression = re.sub(r"[\[\]\s]", "", filter_date).lower()
+    if last_year is None:
+        last_year = datetime.now().year + 1
+
+    try:
+        years = [year for year in range(FIRST_VIDEO_YEAR, last_year + 1)
+                 if eval(expression.replace("x", str(year)))]
+    except (ValueError, SyntaxError, TypeError, NameError):
+        return FIRST_VIDEO_YEAR, last_year
+    return (years[0], years[-1]) if years else None
 
 
 class Filter:
-    def __init__(self):
+    def __init__(self, query=None):
+        """
+        :param query: (Optional[ApiQuery]) Клиент API для предварительной проверки
+            видео через videos.list. Без него проверка не выполняется.
+        """
         self._config = get_config()
         self._logger = logging.getLogger()
         self._filter_date = self._config.extended.filter_date
         self._download_directory = self._config.download.download_directory
         self._filter_recursive = self._config.extended.filter_downloaded_recursive
+        self._skip_shorts = self._config.download.skip_shorts
+        self._region_code = self._config.extended.region_code
+        self._query = query if self._config.performance.preflight_check else None
 
     @staticmethod
     def _convert_dict_to_obj(video_snippets: List[Dict[str, str]]) -> List[Snippet]:
         return [Snippet(
             title=item["title"],
             url=item["url"],
-            published=item["published"]
+            published=item["published"],
+            video_id=item.get("video_id", "")
         )
             for item in video_snippets
         ]
@@ -31,15 +72,14 @@ class Filter:
     def _convert_obj_to_list_urls(snippets_objs: List[Snippet]) -> List[str]:
         return [snippet.url for snippet in snippets_objs]
 
-    def _filter_already_downloaded(self, snipped_objs: List[Snippet], directory: str):
+    def _get_downloaded_names(self, directory: str) -> Set[str]:
         """
-        Фильтрует уже загруженные видео, проверяя файлы в указанной директории.
-        Если filter_downloaded_recursive=True в конфигурации, будет рекурсивно обходить
+        Собирает нормализованные имена уже загруженных файлов. Если
+        filter_downloaded_recursive=True в конфигурации, будет рекурсивно обходить
         все подкаталоги.
 
-        :param snipped_objs: (List[Snippet]) Список объектов Snippet для фильтрации.
         :param directory: (str) Директория для проверки.
-        :return: (List[Snippet]) Отфильтрованный список объектов Snippet.
+        :return: (Set[str]) Множество имен файлов без расширения.
         """
         downloaded_names = set()
 
@@ -53,35 +93,212 @@ class Filter:
             downloaded_names = {normalize_string(os.path.splitext(f)[0])
                                 for f in os.listdir(directory)
                                 if os.path.isfile(os.path.join(directory, f))}
+        return downloaded_names
+
+    def _filter_already_downloaded(
+            self,
+            snipped_objs: List[Snippet],
+            directory: str,
+            downloaded_names: Optional[Set[str]] = None
+    ) -> List[Snippet]:
+        """
+        Фильтрует уже загруженные видео, проверяя файлы в указанной директории.
+
+        :param snipped_objs: (List[Snippet]) Список объектов Snippet для фильтрации.
+        :param directory: (str) Директория для проверки.
+        :param downloaded_names: (Optional[Set[str]]) Заранее собранные имена
+            файлов, чтобы не обходить директорию для каждой страницы плейлиста.
+        :return: (List[Snippet]) Отфильтрованный список объектов Snippet.
+        """
+        if downloaded_names is None:
+            downloaded_names = self._get_downloaded_names(directory)
 
         return [sn for sn in snipped_objs
                 if normalize_string(sn.title) not in downloaded_names]
 
-    def _filter_by_download_date(self, snippet_objs: List[Snippet]) -> List[Snippet]:
-        assert self._filter_date is not None  # check for pyright
+    def is_date_allowed(self, published: str) -> bool:
+        """
+        Проверяет дату публикации по FILTER_DATE.
+
+        :param published: (str) Дата в формате API, например "2024-05-01T00:00:00Z".
+        :return: (bool) True, если фильтр не задан или год проходит фильтр.
+        """
+        if not self._filter_date:
+            return True
         filter_date = re.sub(r"[\[\]\s]", "", self._filter_date).lower()
+        try:
+            # Преобразуем дату публикации в год
+            publication_year = datetime.strptime(published, "%Y-%m-%dT%H:%M:%SZ").year
+            # Формируем условие фильтрации и оцениваем его
+            return eval(filter_date.replace("x", str(publication_year)))
+        except (ValueError, SyntaxError) as e:
+            self._logger.debug(
+                f"An error occurred when trying to apply a date filter "
+                f"to an expression:\n {e}"
+                f"\n published: {published}"
+            )
+            return False
 
-        def filter_func(snippet: Snippet) -> bool:
-            try:
-                # Преобразуем дату публикации в год
-                publication_year = datetime.strptime(snippet.published,
-                                                     "%Y-%m-%dT%H:%M:%SZ").year
-                # Формируем условие фильтрации и оцениваем его
-                return eval(filter_date.replace("x", str(publication_year)))
-            except (ValueError, SyntaxError) as e:
-                self._logger.debug(
-                    f"An error occurred when trying to apply a date filter "
-                    f"to an expression:\n {e}"
-                    f"\n title: {snippet.title}"
-                    f"\n published: {snippet.published}"
-                )
-                return False
-
-        return [sn for sn in snippet_objs if filter_func(sn)]
+    def _filter_by_download_date(self, snippet_objs: List[Snippet]) -> List[Snippet]:
+        assert self._filter_date is not None  # check for pyright
+        return [sn for sn in snippet_objs if self.is_date_allowed(sn.published)]
 
     def _filter_private_video(self, snippet_objs: List[Snippet]) -> List[Snippet]:
         return [sn for sn in snippet_objs if sn.title != "Private video"]
 
+    def get_min_published(self) -> Optional[str]:
+        """
+        Самая ранняя дата публикации, которую может пропустить FILTER_DATE, в
+        формате API. Для плейлиста загрузок канала (от новых к старым) чтение
+        страниц можно прекратить на первом видео старше этой даты.
+
+        :return: (Optional[str]) Дата ISO 8601 или None, если фильтр не
+            ограничивает год снизу.
+        """
+        if not self._filter_date:
+            return None
+        bounds = get_year_bounds(self._filter_date)
+        if bounds is None:
+            # Фильтр не проходит ни одно видео, хватит первой страницы
+            return "9999-01-01T00:00:00Z"
+        if bounds[0] <= FIRST_VIDEO_YEAR:
+            return None
+        return f"{bounds[0]}-01-01T00:00:00Z"
+
+    def _get_skip_reason(self, item: Optional[Dict]) -> Optional[str]:
+        """
+        Причина, по которой видео не нужно отдавать загрузчику, по ответу
+        videos.list, или None, если видео можно скачивать.
+        """
+        if item is None:
+            return "deleted or private"
+
+        status = item.get('status', {})
+        if status.get('privacyStatus') == 'private':
+            return "private"
+        if status.get('uploadStatus') not in (None, 'processed'):
+            # Трансляция, премьера или видео, которое еще обрабатывается
+            return f"upload status '{status['uploadStatus']}'"
+
+        details = item.get('contentDetails', {})
+        restriction = details.get('regionRestriction', {})
+        if self._region_code and (
+                self._region_code in restriction.get('blocked', []) or
+                ('allowed' in restriction and
+                 self._region_code not in restriction['allowed'])):
+            return f"blocked in region {self._region_code}"
+
+        duration = parse_iso8601_duration(details.get('duration', ''))
+        # P0D у трансляций означает, что длительность неизвестна
+        if self._skip_shorts and duration is not None and 0 < duration <= 60:
+            return "shorts"
+        return None
+
+    def _filter_unavailable(self, snippet_objs: List[Snippet]) -> List[Snippet]:
+        """
+        Предварительная проверка через videos.list: отбрасывает shorts по
+        длительности, а также удаленные, недоступные и заблокированные в регионе
+        REGION_CODE видео, чтобы они не доходили до загрузчика.
+        """
+        video_ids = [sn.video_id for sn in snippet_objs if sn.video_id]
+        if self._query is None or not video_ids:
+            return snippet_objs
+
+        try:
+            statuses = self._query.get_videos_status(video_ids)
+        except QuotaExceeded as e:
+            # Страница уже получена, ее видео проверит загрузчик
+            self._logger.warning(f"Preflight check skipped: {e}")
+            statuses = None
+        if statuses is None:
+            self._logger.warning("Preflight check failed, videos are passed as is.")
+            return snippet_objs
+
+        result = []
+        for sn in snippet_objs:
+            reason = self._get_skip_reason(statuses.get(sn.video_id)) \
+                if sn.video_id else None
+            if reason is None:
+                result.append(sn)
+            else:
+                self._logger.info(f"Skip video ({reason}): {sn.title}")
+        return result
+
+    def _get_directory(self, playlist_name: Optional[str]) -> str:
+        directory = self._download_directory
+        if playlist_name:
+            directory = os.path.join(directory, playlist_name)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def _filter_page(
+            self,
+            video_snippets: List[Dict[str, str]],
+            directory: str,
+            downloaded_names: Optional[Set[str]],
+            filter_date: bool
+    ) -> Tuple[List[Snippet], int]:
+        """
+        Применяет фильтры приватных видео, даты и уже загруженных к одной
+        порции видео, а затем предварительную проверку оставшихся через API.
+
+        :return: (Tuple[List[Snippet], int]) Отфильтрованные объекты и количество
+            видео до фильтра уже загруженных файлов.
+        """
+        snippet_objs = self._convert_dict_to_obj(video_snippets)
+        snippet_objs = self._filter_private_video(snippet_objs)
+
+        if filter_date and self._filter_date:
+            snippet_objs = self._filter_by_download_date(snippet_objs)
+        len_snippets = len(snippet_objs)
+
+        if downloaded_names is not None:
+            snippet_objs = self._filter_already_downloaded(
+                snippet_objs, directory, downloaded_names)
+        # Проверяем только то, что действительно пойдет в загрузку. Отброшенные
+        # видео не входят и в общее количество
+        checked = self._filter_unavailable(snippet_objs)
+        len_snippets -= len(snippet_objs) - len(checked)
+        return checked, len_snippets
+
+    def iter_filters(
+            self,
+            pages: Iterable[List[Dict[str, str]]],
+            playlist_name: Optional[str] = None,
+            filter_downloaded: bool = True,
+            filter_date: bool = True
+    ) -> Iterator[Tuple[List[str], int]]:
+        """
+        Потоковый вариант apply_filters: фильтрует страницы плейлиста по мере
+        их поступления.
+
+        :param pages: (Iterable[List[Dict[str, str]]]) Страницы со словарями
+            с информацией о видео.
+        :param playlist_name: (Optional[str]) Имя плейлиста для определения
+            директории загрузки.
+        :param filter_downloaded: (bool) Если True, фильтрует уже загруженные видео.
+        :param filter_date: (bool) Если True, применяет фильтр по дате публикации.
+        :return: (Iterator[Tuple[List[str], int]]) Для каждой страницы кортеж из
+            отфильтрованных URL и количества видео до фильтра уже загруженных.
+        """
+        directory = self._get_directory(playlist_name)
+        # Каталог сканируем один раз, а не для каждой страницы
+        downloaded_names = (self._get_downloaded_names(directory)
+                            if filter_downloaded else None)
+
+        total, remaining = 0, 0
+        for page in pages:
+            snippet_objs, len_snippets = self._filter_page(
+                page, directory, downloaded_names, filter_date)
+            total += len_snippets
+            remaining += len(snippet_objs)
+            yield self._convert_obj_to_list_urls(snippet_objs), len_snippets
+
+        if filter_downloaded:
+            self._logger.info(
+                f"[{total - remaining} from {total}] already downloaded."
+            )
+
     def apply_filters(
             self,
             video_snippets: List[Dict[str, str]],
@@ -102,21 +319,13 @@ class Filter:
             URL и количество видео до применения фильтра уже загруженных файлов.
         """
 
-        directory = self._download_directory
-        if playlist_name:
-            directory = os.path.join(directory, playlist_name)
-        os.makedirs(directory, exist_ok=True)
-
-        snippet_objs = self._convert_dict_to_obj(video_snippets)
-        snippet_objs = self._filter_private_video(snippet_objs)
-        len_snippets = len(snippet_objs)
-
-        if filter_date and self._filter_date:
-            snippet_objs = self._filter_by_download_date(snippet_objs)
-            len_snippets = len(snippet_objs)
+        directory = self._get_directory(playlist_name)
+        downloaded_names = (self._get_downloaded_names(directory)
+                            if filter_downloaded else None)
+        snippet_objs, len_snippets = self._filter_page(
+            video_snippets, directory, downloaded_names, filter_date)
 
         if filter_downloaded:
-            snippet_objs = self._filter_already_downloaded(snippet_objs, directory)
             self._logger.info(
                 f"[{len_snippets - len(snippet_objs)} from {len_snippets}] "
                 f"already downloaded."
@@ -0,0 +1,72 @@
+import time
+import threading
+import sqlite3
+from typing import Dict, Optional
+
+from .storage import open_database
+
+
+class HandleCache:
+    """
+    Постоянный кэш хэндлов каналов: хэндл -> ID канала, плейлист загрузок,
+    название и дата создания. ID канала и плейлиста загрузок не меняются,
+    поэтому повторные запуски для тех же каналов обходятся без запроса к API.
+    """
+
+    _filename = "handles.sqlite3"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = open_database(self._filename)
+            with self._connection:
+                self._connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS handles (
+                        handle TEXT PRIMARY KEY,
+                        channel_id TEXT NOT NULL,
+                        uploads TEXT NOT NULL,
+                        title TEXT NOT NULL,
+                        published TEXT NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                    """
+                )
+        return self._connection
+
+    @staticmethod
+    def normalize(handle: str) -> str:
+        """Хэндлы YouTube не зависят от регистра: "@808Nation" == "@808nation"."""
+        return "@" + handle.lstrip("@").lower()
+
+    def get(self, handle: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT channel_id, uploads, title, published FROM handles "
+                "WHERE handle = ?", (self.normalize(handle),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'title': row["title"],
+            'publishedAt': row["published"],
+            'channelId': row["channel_id"],
+            'uploads': row["uploads"]
+        }
+
+    def put(self, handle: str, info: Dict[str, str]) -> None:
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO handles "
+                "(handle, channel_id, uploads, title, published, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.normalize(handle), info['channelId'], info['uploads'],
+                 info['title'], info['publishedAt'], time.time())
+            )
+
+    def invalidate(self, handle: str) -> None:
+        with self._lock, self._db() as db:
+            db.execute("DELETE FROM handles WHERE handle = ?", (self.normalize(handle),))
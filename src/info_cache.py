@@ -0,0 +1,136 @@
+import re
+import json
+import time
+import logging
+import threading
+import sqlite3
+from typing import Any, Dict, Optional
+
+from yt_dlp import YoutubeDL
+
+from .config.app_config import get_config
+from .storage import open_database
+
+
+class InfoCache:
+    """
+    Дисковый кэш результатов извлечения yt-dlp (extract_info с process=False),
+    по ключу id видео. Запись живет не дольше INFO_CACHE_TTL и не дольше, чем
+    действительны ссылки на форматы (параметр expire в URL). При превышении
+    INFO_CACHE_SIZE_MB вытесняются давно не использованные записи (LRU).
+
+    Ссылки на форматы YouTube привязаны к IP, поэтому запись выдается только
+    для того же прокси, через который она была получена.
+    """
+
+    _filename = "info_cache.sqlite3"
+    # Запас до истечения ссылок, чтобы загрузка успела начаться
+    _expire_margin = 10 * 60
+    _expire_pattern = re.compile(r"(?:[?&]expire=|/expire/)(\d+)")
+    # Тяжелые поля, которые не нужны ни для выбора формата, ни для тегов
+    _dropped_keys = {"automatic_captions", "subtitles", "heatmap", "comments"}
+
+    def __init__(self):
+        self._config = get_config()
+        self._logger = logging.getLogger()
+        self._ttl = self._config.performance.info_cache_ttl
+        self._max_size = self._config.performance.info_cache_size_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0 and self._max_size > 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = open_database(self._filename)
+            with self._connection:
+                self._connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS info (
+                        video_id TEXT PRIMARY KEY,
+                        proxy TEXT NOT NULL,
+                        info TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                    """
+                )
+        return self._connection
+
+    def _get_expires_at(self, info: Dict[str, Any], now: float) -> float:
+        """Срок годности записи: TTL или самая ранняя ссылка формата."""
+        expires_at = now + self._ttl
+        for fmt in info.get("formats") or []:
+            for key in ("url", "manifest_url"):
+                match = self._expire_pattern.search(fmt.get(key) or "")
+                if match:
+                    expires_at = min(expires_at, int(match.group(1)) - self._expire_margin)
+        return expires_at
+
+    def get(self, video_id: str, proxy: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Возвращает сохраненную информацию о видео или None, если записи нет,
+        она устарела или получена через другой прокси.
+        """
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock, self._db() as db:
+            row = db.execute(
+                "SELECT proxy, info, expires_at FROM info WHERE video_id = ?",
+                (video_id,)
+            ).fetchone()
+            if row is None or row["proxy"] != proxy:
+                return None
+            if row["expires_at"] <= now:
+                db.execute("DELETE FROM info WHERE video_id = ?", (video_id,))
+                return None
+            db.execute("UPDATE info SET last_access = ? WHERE video_id = ?",
+                       (now, video_id))
+
+        self._logger.debug(f"[*cache] Extraction info taken from cache: {video_id}")
+        return json.loads(row["info"])
+
+    def put(self, video_id: str, info: Dict[str, Any], proxy: str = "") -> None:
+        if not self.enabled:
+            return
+
+        now = time.time()
+        expires_at = self._get_expires_at(info, now)
+        if expires_at <= now:
+            return
+
+        trimmed = {k: v for k, v in info.items() if k not in self._dropped_keys}
+        data = json.dumps(YoutubeDL.sanitize_info(trimmed))
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO info "
+                "(video_id, proxy, info, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (video_id, proxy, data, len(data), expires_at, now)
+            )
+            self._evict(db, now)
+
+    def invalidate(self, video_id: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock, self._db() as db:
+            db.execute("DELETE FROM info WHERE video_id = ?", (video_id,))
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        """Удаляет устаревшие записи и самые давние по доступу сверх лимита размера."""
+        db.execute("DELETE FROM info WHERE expires_at <= ?", (now,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM info").fetchone()[0]
+        if total <= self._max_size:
+            return
+
+        for row in db.execute(
+                "SELECT video_id, size FROM info ORDER BY last_access").fetchall():
+            db.execute("DELETE FROM info WHERE video_id = ?", (row["video_id"],))
+            total -= row["size"]
+            if total <= self._max_size:
+                break
@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import threading
+import sqlite3
+from typing import Iterable, List, Optional
+
+from .entities import DownloadCallback, JobState, Metadata
+from .storage import open_database
+
+
+class Journal:
+    """
+    Журнал заданий загрузки в SQLite. Хранит состояние каждого видео, чтобы
+    после падения или блокировки бота продолжить с того места, где остановились:
+    недокачанные .part файлы докачиваются, а уже выполненные шаги постобработки
+    пропускаются.
+    """
+
+    _filename = "journal.sqlite3"
+    # Состояния, для которых загрузка уже выполнена, но постобработка - нет.
+    _resumable = (JobState.DOWNLOADED, JobState.CONVERTED)
+    _finished = (JobState.TAGGED, JobState.SKIPPED)
+    # После стольких неудачных попыток загрузки задание больше не держит
+    # каталог tmp: его .part файл удаляется, следующая попытка начнется заново
+    max_attempts = 5
+    # Одно видео может скачиваться в несколько каталогов (плейлистов), поэтому
+    # задание определяется парой (url, save_path)
+    _schema = """
+        CREATE TABLE IF NOT EXISTS {table} (
+            url TEXT NOT NULL,
+            save_path TEXT NOT NULL,
+            state TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT NOT NULL DEFAULT '',
+            audio_path TEXT NOT NULL DEFAULT '',
+            thumbnail_path TEXT NOT NULL DEFAULT '',
+            converted_path TEXT NOT NULL DEFAULT '',
+            metadata TEXT NOT NULL DEFAULT '',
+            bitrate_check INTEGER NOT NULL DEFAULT 1,
+            bitrate REAL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (url, save_path)
+        )
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # После fork соединение родителя использовать нельзя, открываем свое
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = open_database(self._filename)
+            self._pid = os.getpid()
+            with self._connection:
+                self._connection.execute(self._schema.format(table="jobs"))
+                columns = {row["name"]: row["pk"] for row in
+                           self._connection.execute("PRAGMA table_info(jobs)")}
+                # Журнал, созданный прошлой версией, дополняем новыми колонками
+                if "bitrate" not in columns:
+                    self._connection.execute("ALTER TABLE jobs ADD COLUMN bitrate REAL")
+                # В прошлых версиях ключом была одна ссылка: переносим записи
+                # в таблицу с ключом (url, save_path)
+                if not columns["save_path"]:
+                    self._connection.execute(self._schema.format(table="jobs_new"))
+                    names = ", ".join(columns)
+                    self._connection.execute(
+                        f"INSERT INTO jobs_new ({names}) SELECT {names} FROM jobs")
+                    self._connection.execute("DROP TABLE jobs")
+                    self._connection.execute("ALTER TABLE jobs_new RENAME TO jobs")
+        return self._connection
+
+    def enqueue(self, urls: Iterable[str], save_path: str) -> None:
+        """Добавляет ссылки в журнал в состоянии QUEUED, если их там еще нет."""
+        now = time.time()
+        with self._lock, self._db() as db:
+            db.executemany(
+                "INSERT OR IGNORE INTO jobs (url, save_path, state, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(url, save_path, JobState.QUEUED, now) for url in urls]
+            )
+
+    def mark(self, url: str, save_path: str, state: JobState, error: str = "") -> None:
+        with self._lock, self._db() as db:
+            db.execute(
+                "UPDATE jobs SET state = ?, last_error = ?, updated_at = ? "
+                "WHERE url = ? AND save_path = ?",
+                (state, error, time.time(), url, save_path)
+            )
+
+    def mark_downloading(self, url: str, save_path: str) -> None:
+        with self._lock, self._db() as db:
+            db.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE url = ? AND save_path = ?",
+                (JobState.DOWNLOADING, time.time(), url, save_path)
+            )
+
+    def mark_downloaded(self, callback: DownloadCallback) -> None:
+        with self._lock, self._db() as db:
+            db.execute(
+                "UPDATE jobs SET state = ?, audio_path = ?, thumbnail_path = ?, "
+                "metadata = ?, bitrate_check = ?, bitrate = ?, last_error = '', "
+                "updated_at = ? WHERE url = ? AND save_path = ?",
+                (JobState.DOWNLOADED, callback.audio_path, callback.thumbnail_path or "",
+                 json.dumps(callback.metadata.__dict__), int(callback.bitrate_check),
+                 callback.bitrate, time.time(), callback.url, callback.save_path)
+            )
+
+    def mark_converted(self, url: str, save_path: str, converted_path: str) -> None:
+        with self._lock, self._db() as db:
+            db.execute(
+                "UPDATE jobs SET state = ?, converted_path = ?, updated_at = ? "
+                "WHERE url = ? AND save_path = ?",
+                (JobState.CONVERTED, converted_path, time.time(), url, save_path)
+            )
+
+    def set_error(self, url: str, save_path: str, error: str) -> None:
+        """Запоминает ошибку, не меняя состояние задания."""
+        with self._lock, self._db() as db:
+            db.execute(
+                "UPDATE jobs SET last_error = ?, updated_at = ? "
+                "WHERE url = ? AND save_path = ?",
+                (error, time.time(), url, save_path)
+            )
+
+    def get_state(self, url: str, save_path: str) -> Optional[JobState]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT state FROM jobs WHERE url = ? AND save_path = ?",
+                (url, save_path)
+            ).fetchone()
+        return JobState(row["state"]) if row else None
+
+    def restore_callback(self, url: str, save_path: str) -> Optional[DownloadCallback]:
+        """
+        Восстанавливает результат загрузки для задания, у которого файл уже
+        скачан, но постобработка не завершена. Если файлов на диске больше нет,
+        возвращает None.
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT * FROM jobs WHERE url = ? AND save_path = ?",
+                (url, save_path)
+            ).fetchone()
+        if row is None or row["state"] not in self._resumable:
+            return None
+
+        converted_path = row["converted_path"]
+        if row["state"] == JobState.CONVERTED and os.path.exists(converted_path):
+            audio_path = row["audio_path"]
+        elif os.path.exists(row["audio_path"]):
+            audio_path, converted_path = row["audio_path"], ""
+        else:
+            return None
+
+        thumbnail_path = row["thumbnail_path"]
+        if thumbnail_path and not os.path.exists(thumbnail_path):
+            thumbnail_path = ""
+
+        return DownloadCallback(
+            audio_path=audio_path,
+            thumbnail_path=thumbnail_path,
+            metadata=Metadata(**json.loads(row["metadata"])),
+            bitrate_check=bool(row["bitrate_check"]),
+            url=url,
+            converted_path=converted_path,
+            bitrate=row["bitrate"],
+            save_path=save_path
+        )
+
+    def resumable_urls(self, save_path: str) -> List[str]:
+        """Ссылки, у которых загрузка завершена, а постобработка - нет."""
+        with self._lock:
+            rows = self._db().execute(
+                f"SELECT url FROM jobs WHERE save_path = ? AND state IN "
+                f"({', '.join('?' * len(self._resumable))}) ORDER BY updated_at",
+                (save_path, *self._resumable)
+            ).fetchall()
+        return [row["url"] for row in rows]
+
+    def unfinished_count(self, save_path: str) -> int:
+        """
+        Количество начатых, но не завершенных заданий в каталоге. Задания,
+        загрузка которых не удалась max_attempts раз, не учитываются, чтобы
+        каталог tmp не оставался на диске навсегда.
+        """
+        with self._lock:
+            row = self._db().execute(
+                f"SELECT COUNT(*) AS cnt FROM jobs WHERE save_path = ? AND state NOT IN "
+                f"({', '.join('?' * (len(self._finished) + 1))}) "
+                f"AND NOT (state = ? AND attempts >= ?)",
+                (save_path, *self._finished, JobState.QUEUED,
+                 JobState.FAILED, self.max_attempts)
+            ).fetchone()
+        return row["cnt"]
+
+    def all_finished(self, urls: Iterable[str]) -> bool:
+        """
+        True, если все задания из списка завершены (теги записаны или пропущены).
+        Если ссылка есть в нескольких каталогах, проверяется задание, которое
+        обновлялось последним.
+        """
+        urls = list(dict.fromkeys(urls))
+        latest = {}
+        with self._lock:
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                rows = self._db().execute(
+                    f"SELECT url, state FROM jobs WHERE url IN "
+                    f"({', '.join('?' * len(chunk))}) ORDER BY updated_at",
+                    chunk
+                ).fetchall()
+                latest.update((row["url"], row["state"]) for row in rows)
+        return all(latest.get(url) in self._finished for url in urls)
@@ -0,0 +1,182 @@
+import os
+import time
+import logging
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from .config.app_config import Config, ConfigManager, get_config
+from .config.logging_config import load_logger_config
+from .entities import AudioExt
+from .converter.audio_converter import AudioConverter
+from .converter.image_embedder import ImageEmbedder
+from .converter.metadata_handler import MetadataHandler
+
+
+# Конвертер и обработчики дочернего процесса, создаются в initializer пула.
+_process_converter: Optional[AudioConverter] = None
+_process_embedder: Optional[ImageEmbedder] = None
+
+_TEMP_PREFIX = ".migrate_"
+
+
+def _init_process(config: Config, disabled_loggers: Tuple[str, ...]) -> None:
+    global _process_converter, _process_embedder
+    # Процесс запущен через spawn и не унаследовал ни настройки родителя,
+    # ни настройку логирования
+    ConfigManager._instance = config
+    load_logger_config(debug_mode=config.extended.debug_mode)
+    for name in disabled_loggers:
+        logging.getLogger(name).disabled = True
+    _process_converter = AudioConverter()
+    _process_embedder = ImageEmbedder()
+
+
+def _migrate_file(audio_path: str, target_path: str) -> int:
+    """
+    Перекодирует один файл в дочернем процессе, перенося теги и обложку.
+    Результат пишется во временный файл и переименовывается только после
+    успешной конвертации, исходный файл после этого удаляется.
+
+    :return: (int) Размер нового файла в байтах.
+    """
+    assert _process_converter is not None and _process_embedder is not None
+    audio = MetadataHandler.open_audio(audio_path)
+    tags = MetadataHandler.get_tags(MetadataHandler.read_metadata(audio))
+    cover = ImageEmbedder.read_cover(audio)
+    if cover:
+        # Обложка могла быть сохранена в WEBP, ffmpeg встраивает только JPEG
+        cover = _process_embedder.get_jpeg_cover(BytesIO(cover))
+
+    # Имя исходного файла в имени временного делает его уникальным для задачи
+    tmp_path = os.path.join(
+        os.path.dirname(target_path),
+        f"{_TEMP_PREFIX}{os.path.basename(audio_path)}{os.path.splitext(target_path)[1]}")
+    try:
+        _process_converter.transcode(audio_path, tmp_path, tags, cover)
+        os.replace(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    os.remove(audio_path)
+    return os.path.getsize(target_path)
+
+
+class LibraryMigrator:
+    """
+    Перекодирует уже скачанную библиотеку в формат AUDIO_EXT (например, из opus
+    в mp3 для магнитолы) без повторной загрузки. Файлы обрабатываются пулом
+    процессов по числу ядер. Уже перекодированные файлы пропускаются, поэтому
+    прерванную миграцию можно просто запустить снова.
+    """
+
+    _source_exts = {AudioExt.OPUS, AudioExt.M4A, AudioExt.MP3}
+
+    def __init__(self):
+        self._config = get_config()
+        self._logger = logging.getLogger()
+        self._target_ext = self._config.download.audio_ext
+        self._workers = os.cpu_count() or 1
+
+    def _find_files(self, directory: str) -> Tuple[List[Tuple[str, str]], int]:
+        """
+        Ищет файлы, которые нужно перекодировать.
+
+        Файлы с одинаковым именем и разными расширениями (a.opus и a.m4a)
+        получили бы один и тот же новый файл, поэтому они пропускаются целиком.
+
+        :return: Пары (исходный файл, новый файл) и количество пропущенных файлов,
+            для которых новый файл уже есть.
+        """
+        tasks, skipped = [], 0
+        for root, dirs, files in os.walk(directory):
+            # Временные каталоги загрузчика не трогаем
+            dirs[:] = [d for d in dirs if d != "tmp" and not d.startswith(".")]
+            targets: Dict[str, List[str]] = {}
+            for file_name in sorted(files):
+                file_path = os.path.join(root, file_name)
+                if file_name.startswith(_TEMP_PREFIX):
+                    # Остаток прерванной миграции
+                    os.remove(file_path)
+                    continue
+
+                name, ext = os.path.splitext(file_name)
+                ext = ext.lstrip(".").lower()
+                if ext not in self._source_exts or ext == self._target_ext:
+                    continue
+                target_path = os.path.join(root, f"{name}.{self._target_ext}")
+                if os.path.exists(target_path):
+                    skipped += 1
+                    continue
+                targets.setdefault(target_path, []).append(file_path)
+
+            for target_path, sources in targets.items():
+                if len(sources) > 1:
+                    self._logger.warning(
+                        f"Skipped, the files would be converted to the same "
+                        f"{os.path.basename(target_path)}: "
+                        f"{', '.join(os.path.basename(path) for path in sources)}")
+                    continue
+                tasks.append((sources[0], target_path))
+        return tasks, skipped
+
+    def migrate(self, directory: str) -> None:
+        if not self._target_ext:
+            self._logger.error(
+                "\n AUDIO_EXT is empty, there is nothing to migrate to."
+                "\n TIP: Set AUDIO_EXT=[opus|m4a|mp3] in settings")
+            return
+        if not os.path.isdir(directory):
+            self._logger.error(f"Directory not found: {directory}")
+            return
+
+        tasks, skipped = self._find_files(directory)
+        self._logger.info(
+            f"Migrating to {self._target_ext}: {len(tasks)} file(s), "
+            f"already converted: {skipped}, processes: {self._workers}")
+        if not tasks:
+            return
+
+        start, cpu_start = time.time(), os.times()
+        done = failed = written = 0
+        # Как и у постобработки, процессы запускаются через spawn: fork копирует
+        # блокировки потоков и открытые соединения SQLite кэшей
+        disabled_loggers = tuple(
+            name for name in ("", "yt-dlp") if logging.getLogger(name).disabled)
+        executor = ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process,
+            initargs=(self._config, disabled_loggers)
+        )
+        try:
+            futures = {executor.submit(_migrate_file, *task): task for task in tasks}
+            for future in as_completed(futures):
+                audio_path = futures[future][0]
+                try:
+                    written += future.result()
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    self._logger.error(f"Failed to migrate {audio_path}: {e}")
+                self._logger.info(
+                    f"Migrating... [{done + failed}/{len(tasks)}] "
+                    f"{os.path.basename(audio_path)}")
+        except KeyboardInterrupt:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._logger.info("Migration was interrupted by the user, run it again to resume.")
+            return
+        executor.shutdown(wait=True)
+
+        # Время дочерних процессов (и их ffmpeg) учитывается после их завершения
+        elapsed = max(time.time() - start, 1e-6)
+        cpu_end = os.times()
+        cpu_time = sum(getattr(cpu_end, key) - getattr(cpu_start, key) for key in
+                       ("user", "system", "children_user", "children_system"))
+        self._logger.info(
+            f"Migration finished: {done} converted, {failed} failed, "
+            f"{written / 1024 / 1024:.1f} MiB written in {elapsed:.1f}s "
+            f"({done / elapsed:.2f} files/s), "
+            f"CPU utilisation {cpu_time / (elapsed * self._workers) * 100:.0f}% "
+            f"of {self._workers} cores")
@@ -0,0 +1,140 @@
+import re
+import random
+import logging
+import threading
+from typing import Optional
+
+
+class PacingController:
+    """
+    Адаптивный регулятор паузы между загрузками и лимита скорости (AIMD).
+    Пока загрузки проходят без проблем, пауза уменьшается, а лимит скорости
+    растет на фиксированный шаг. При ошибках, ответах 403/429, падении скорости
+    или росте времени извлечения информации пауза умножается, а лимит делится.
+    Один экземпляр разделяется всеми потоками загрузки.
+    """
+
+    min_delay = 3.0
+    max_delay = 180.0
+    start_delay = 13.0
+    delay_step = 1.0  # Аддитивное уменьшение паузы, с
+
+    min_ratelimit = 150 * 1024
+    max_ratelimit = 4 * 1024 * 1024
+    start_ratelimit = 450 * 1024
+    ratelimit_step = 64 * 1024  # Аддитивное увеличение лимита, байт/с
+
+    # Доля от лимита, ниже которой скорость считается обвалившейся
+    throughput_collapse = 0.3
+    # Во сколько раз извлечение должно стать медленнее обычного, чтобы
+    # считать это признаком троттлинга
+    latency_factor = 3.0
+    # Маленькие файлы не показательны для оценки скорости
+    min_sample_bytes = 512 * 1024
+
+    _blocked_pattern = re.compile(r"\b(403|429)\b|Too Many Requests|Forbidden|"
+                                  r"Sign in to confirm")
+
+    def __init__(self):
+        self._logger = logging.getLogger()
+        self._lock = threading.Lock()
+        self._delay = self.start_delay
+        self._ratelimit = float(self.start_ratelimit)
+        self._latency_avg: Optional[float] = None
+
+    @property
+    def delay(self) -> float:
+        return self._delay
+
+    @property
+    def ratelimit(self) -> int:
+        """Текущий лимит скорости одной загрузки в байтах/с."""
+        return int(self._ratelimit)
+
+    def next_delay(self) -> float:
+        """Пауза перед следующей загрузкой с небольшим случайным разбросом."""
+        return self._delay + round(random.uniform(0, 3), 1)
+
+    def _backoff(self, delay_factor: float, ratelimit_factor: float) -> None:
+        self._delay = min(self.max_delay, self._delay * delay_factor)
+        self._ratelimit = max(self.min_ratelimit, self._ratelimit * ratelimit_factor)
+
+    def _increase(self) -> None:
+        self._delay = max(self.min_delay, self._delay - self.delay_step)
+        self._ratelimit = min(self.max_ratelimit, self._ratelimit + self.ratelimit_step)
+
+    def _update_latency(self, extract_latency: Optional[float]) -> bool:
+        """
+        Обновляет среднее время извлечения, True - если оно резко выросло.
+        None (информация взята из кэша) среднее не меняет.
+        """
+        if extract_latency is None:
+            return False
+        if self._latency_avg is None:
+            self._latency_avg = extract_latency
+            return False
+        is_slow = extract_latency > self._latency_avg * self.latency_factor
+        self._latency_avg = 0.8 * self._latency_avg + 0.2 * extract_latency
+        return is_slow
+
+    def on_success(
+            self,
+            downloaded_bytes: Optional[int],
+            elapsed: Optional[float],
+            extract_latency: Optional[float]
+    ) -> None:
+        """
+        Учитывает успешную загрузку.
+
+        :param downloaded_bytes: (Optional[int]) Размер скачанного файла.
+        :param elapsed: (Optional[float]) Время загрузки файла, с.
+        :param extract_latency: (Optional[float]) Время извлечения информации
+            о видео, с, None - информация взята из кэша.
+        """
+        with self._lock:
+            throughput = None
+            if downloaded_bytes and elapsed and downloaded_bytes >= self.min_sample_bytes:
+                throughput = downloaded_bytes / elapsed
+
+            if throughput is not None and \
+                    throughput < self._ratelimit * self.throughput_collapse:
+                reason = "throughput collapse"
+                self._backoff(1.5, 0.7)
+            elif self._update_latency(extract_latency):
+                reason = "slow extraction"
+                self._backoff(1.5, 1.0)
+            else:
+                reason = "healthy"
+                self._increase()
+            self._log_state(reason, throughput)
+
+    def on_shorts(self, extract_latency: Optional[float]) -> None:
+        """Пропуск shorts: загрузки не было, учитываем только извлечение."""
+        with self._lock:
+            if self._update_latency(extract_latency):
+                self._backoff(1.5, 1.0)
+                self._log_state("slow extraction")
+
+    def on_error(self, error: str) -> None:
+        """
+        Учитывает неудачную попытку. Ответы 403/429 и проверка на бота снижают
+        темп сильнее, чем прочие ошибки.
+        """
+        with self._lock:
+            if self._blocked_pattern.search(error):
+                reason = "blocked by server"
+                self._backoff(2.0, 0.5)
+            else:
+                reason = "error"
+                self._backoff(1.5, 0.8)
+            self._log_state(reason)
+
+    def _log_state(self, reason: str, throughput: Optional[float] = None) -> None:
+        text = (f"[*pacing] {reason}: delay={self._delay:.1f}s, "
+                f"ratelimit={self._ratelimit / 1024:.0f}KB/s")
+        if throughput is not None:
+            text += f", throughput={throughput / 1024:.0f}KB/s"
+        if reason == "healthy":
+            self._logger.debug(text)
+        else:
+            self._logger.info(text)
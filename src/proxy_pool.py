@@ -0,0 +1,160 @@
+import re
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .config.app_config import get_config
+
+
+@dataclass
+class ProxyHealth:
+    """Статистика одного прокси. Пустой url означает прямое подключение."""
+    url: str
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    blocks: int = 0
+    throughput: float = 0.0  # Скользящее среднее скорости, байт/с
+    cooldown_until: float = 0.0
+    in_use: int = 0
+
+    @property
+    def success_rate(self) -> float:
+        # Сглаживание Лапласа: у нового прокси рейтинг 0.5, а не 0 или 1
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    @property
+    def score(self) -> float:
+        speed_bonus = 1 + min(self.throughput / (1024 * 1024), 4)
+        return self.success_rate * speed_bonus / (1 + self.in_use)
+
+    def is_available(self, now: float) -> bool:
+        return self.cooldown_until <= now
+
+
+class ProxyPool:
+    """
+    Пул прокси с оценкой здоровья. Потоки берут самый здоровый доступный прокси,
+    после нескольких ошибок подряд прокси уходит на охлаждение (бот-блок), и
+    загрузка прерывается только когда охлаждаются все прокси пула.
+    """
+
+    block_threshold = 3  # Ошибок подряд до отправки прокси на охлаждение
+    base_cooldown = 15 * 60  # Первое охлаждение, с
+    max_cooldown = 2 * 60 * 60
+
+    def __init__(self, proxies: List[str]):
+        self._logger = logging.getLogger()
+        self._lock = threading.Lock()
+        # Без настроенных прокси пул состоит из прямого подключения
+        self._proxies = {url: ProxyHealth(url) for url in proxies or [""]}
+
+    @property
+    def urls(self) -> List[str]:
+        return list(self._proxies)
+
+    def __len__(self) -> int:
+        return len(self._proxies)
+
+    def acquire(self) -> Optional[str]:
+        """
+        Возвращает самый здоровый доступный прокси и отмечает его как занятый.
+        Если все прокси на охлаждении, возвращает None.
+        """
+        now = time.time()
+        with self._lock:
+            available = [p for p in self._proxies.values() if p.is_available(now)]
+            if not available:
+                return None
+            best_score = max(p.score for p in available)
+            proxy = random.choice([p for p in available if p.score == best_score])
+            proxy.in_use += 1
+            return proxy.url
+
+    def release(self, url: str) -> None:
+        with self._lock:
+            proxy = self._proxies[url]
+            proxy.in_use = max(0, proxy.in_use - 1)
+
+    def report_success(self, url: str, throughput: Optional[float] = None) -> None:
+        with self._lock:
+            proxy = self._proxies[url]
+            proxy.successes += 1
+            proxy.consecutive_failures = 0
+            if throughput:
+                proxy.throughput = (throughput if not proxy.throughput
+                                    else 0.7 * proxy.throughput + 0.3 * throughput)
+
+    def report_failure(self, url: str) -> bool:
+        """
+        Учитывает ошибку прокси.
+
+        :return: (bool) True, если прокси ушел на охлаждение.
+        """
+        with self._lock:
+            proxy = self._proxies[url]
+            proxy.failures += 1
+            proxy.consecutive_failures += 1
+            if proxy.consecutive_failures < self.block_threshold:
+                return False
+
+            proxy.blocks += 1
+            proxy.consecutive_failures = 0
+            cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (proxy.blocks - 1))
+            proxy.cooldown_until = time.time() + cooldown
+            available = sum(p.is_available(time.time()) for p in self._proxies.values())
+
+        self._logger.warning(
+            f"Proxy {self.display_name(url)} is in the bot block, cooldown "
+            f"{cooldown // 60} min. Available proxies: {available}/{len(self)}")
+        return True
+
+    def is_exhausted(self) -> bool:
+        """True, если все прокси пула на охлаждении."""
+        now = time.time()
+        with self._lock:
+            return not any(p.is_available(now) for p in self._proxies.values())
+
+    @staticmethod
+    def display_name(url: str) -> str:
+        """Имя прокси для лога без логина и пароля."""
+        if not url:
+            return "direct connection"
+        return re.sub(r"//[^@/]+@", "//", url)
+
+
+def parse_proxy_list(proxy: str, proxy_file: str) -> List[str]:
+    """
+    Собирает список прокси из параметра PROXY (через запятую или пробел) и
+    файла PROXY_FILE (по одному на строку, # - комментарий).
+    """
+    proxies = [p for p in re.split(r"[,\s]+", proxy) if p]
+    if proxy_file:
+        with open(proxy_file, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    proxies.append(line)
+    # Убираем дубликаты, сохраняя порядок
+    return list(dict.fromkeys(proxies))
+
+
+_pool: Optional[ProxyPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_proxy_pool() -> ProxyPool:
+    """
+    Возвращает общий для загрузчика и ApiQuery пул прокси, созданный по
+    настройкам PROXY и PROXY_FILE (singleton).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            config = get_config()
+            _pool = ProxyPool(parse_proxy_list(
+                config.extended.proxy, config.extended.proxy_file))
+        return _pool
@@ -0,0 +1,186 @@
+import time
+import logging
+import threading
+import sqlite3
+from datetime import datetime
+from typing import List, Optional
+from zoneinfo import ZoneInfo
+
+from .config.app_config import get_config
+from .storage import open_database
+
+
+class QuotaExceeded(Exception):
+    """Запрос превысил бы бюджет квоты API на запуск или суточный лимит."""
+
+
+def quota_day(timestamp: float) -> str:
+    """
+    Сутки квоты YouTube Data API: счетчик сбрасывается в полночь по
+    тихоокеанскому времени, а не по UTC и не по местному времени.
+
+    :param timestamp: (float) Время в секундах Unix.
+    :return: (str) Дата в формате YYYY-MM-DD.
+    """
+    return datetime.fromtimestamp(timestamp, ZoneInfo("America/Los_Angeles")).strftime(
+        "%Y-%m-%d")
+
+
+class QuotaLedger:
+    """
+    Журнал расхода квоты API. Каждый запрос записывается с эндпоинтом,
+    стоимостью в единицах квоты, временем ответа, размером ответа и тем, был
+    ли он взят из кэша (304). Перед запросом проверяется бюджет запуска
+    (QUOTA_BUDGET) и суточный лимит ключа, чтобы задание остановилось до
+    превышения, а не получило ошибку 403 посреди плейлиста.
+    """
+
+    _filename = "quota.sqlite3"
+    daily_limit = 10000
+    # Стоимость list-запросов - 1 единица, поиска - 100
+    _costs = {"search": 100}
+
+    def __init__(self, budget: int = 0, job: str = "default"):
+        """
+        :param budget: (int) Сколько единиц может потратить один запуск, 0 - без
+            ограничения (кроме суточного лимита).
+        :param job: (str) Название задания для отчета.
+        """
+        self._logger = logging.getLogger()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self.budget = budget
+        self.job = job
+        self.run_used = 0  # Потрачено текущим запуском
+        self._pending = 0  # Зарезервировано запросами, которые еще выполняются
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = open_database(self._filename)
+            with self._connection:
+                self._connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS calls (
+                        day TEXT NOT NULL,
+                        ts REAL NOT NULL,
+                        job TEXT NOT NULL,
+                        endpoint TEXT NOT NULL,
+                        cost INTEGER NOT NULL,
+                        latency REAL NOT NULL,
+                        size INTEGER NOT NULL,
+                        cache_hit INTEGER NOT NULL,
+                        status INTEGER NOT NULL
+                    )
+                    """
+                )
+                self._connection.execute(
+                    "CREATE INDEX IF NOT EXISTS calls_day ON calls (day)")
+        return self._connection
+
+    @classmethod
+    def get_cost(cls, endpoint: str) -> int:
+        return cls._costs.get(endpoint, 1)
+
+    def _day_used(self, day: str) -> int:
+        row = self._db().execute(
+            "SELECT COALESCE(SUM(cost), 0) AS used FROM calls WHERE day = ?", (day,)
+        ).fetchone()
+        return row["used"]
+
+    def day_used(self, day: Optional[str] = None) -> int:
+        """Сколько единиц потрачено за сутки квоты всеми заданиями."""
+        with self._lock:
+            return self._day_used(day or quota_day(time.time()))
+
+    def reserve(self, endpoint: str) -> None:
+        """
+        Резервирует стоимость запроса к эндпоинту перед его выполнением. Резерв
+        учитывает запросы, которые параллельно выполняются другими потоками.
+
+        :raises QuotaExceeded: Если запрос превысил бы бюджет запуска или
+            суточный лимит.
+        """
+        cost = self.get_cost(endpoint)
+        with self._lock:
+            if self.budget and self.run_used + cost > self.budget:
+                raise QuotaExceeded(
+                    f"Run budget of {self.budget} quota units is spent "
+                    f"({self.run_used} used), the rest is deferred to the next run.")
+            day_used = self._day_used(quota_day(time.time())) + self._pending
+            if day_used + cost > self.daily_limit:
+                raise QuotaExceeded(
+                    f"Daily quota of {self.daily_limit} units is spent "
+                    f"({day_used} used), it resets at midnight Pacific time.")
+            self.run_used += cost
+            self._pending += cost
+
+    def record(
+            self,
+            endpoint: str,
+            latency: float,
+            size: int,
+            cache_hit: bool,
+            status: int
+    ) -> None:
+        """Записывает выполненный запрос, зарезервированный через reserve."""
+        now = time.time()
+        cost = self.get_cost(endpoint)
+        with self._lock, self._db() as db:
+            self._pending -= cost
+            db.execute(
+                "INSERT INTO calls (day, ts, job, endpoint, cost, latency, size, "
+                "cache_hit, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (quota_day(now), now, self.job, endpoint, cost, latency, size,
+                 int(cache_hit), status)
+            )
+        self._logger.debug(
+            f"[*quota] {endpoint}: {cost} unit(s), {latency:.2f}s, {size} bytes, "
+            f"{'cache hit' if cache_hit else 'cache miss'}, run total {self.run_used}")
+
+    def report(self, day: Optional[str] = None) -> str:
+        """
+        Отчет о расходе квоты за сутки по заданиям и эндпоинтам.
+
+        :param day: (Optional[str]) Сутки квоты YYYY-MM-DD, по умолчанию текущие.
+        :return: (str) Таблица для вывода в консоль.
+        """
+        day = day or quota_day(time.time())
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT job, endpoint, COUNT(*) AS calls, SUM(cost) AS units, "
+                "SUM(cache_hit) AS hits, AVG(latency) AS latency, SUM(size) AS size "
+                "FROM calls WHERE day = ? GROUP BY job, endpoint "
+                "ORDER BY units DESC, job, endpoint",
+                (day,)
+            ).fetchall()
+
+        lines: List[str] = [
+            f"API quota usage for {day} (Pacific time)",
+            f"{'JOB':<20} {'ENDPOINT':<14} {'CALLS':>6} {'UNITS':>6} "
+            f"{'HITS':>5} {'AVG MS':>7} {'KIB':>8}"
+        ]
+        total = 0
+        for row in rows:
+            total += row["units"]
+            lines.append(
+                f"{row['job'][:20]:<20} {row['endpoint'][:14]:<14} {row['calls']:>6} "
+                f"{row['units']:>6} {row['hits']:>5} {row['latency'] * 1000:>7.0f} "
+                f"{row['size'] / 1024:>8.1f}")
+        lines.append(f"Total: {total} of {self.daily_limit} units")
+        return "\n".join(lines)
+
+
+_ledger: Optional[QuotaLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_quota_ledger() -> QuotaLedger:
+    """
+    Возвращает общий для всех экземпляров ApiQuery журнал квоты с бюджетом
+    QUOTA_BUDGET из настроек (singleton).
+    """
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = QuotaLedger(get_config().api.quota_budget)
+        return _ledger
@@ -0,0 +1,139 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+import sqlite3
+from typing import Any, Dict, Optional, Tuple
+
+from .config.app_config import get_config
+from .storage import open_database
+
+
+class ResponseCache:
+    """
+    Дисковый кэш ответов YouTube API для условных запросов. Для каждого запроса
+    (эндпоинт и параметры) хранится ETag и тело ответа. Повторный запрос
+    отправляется с If-None-Match, и если данные не изменились, сервер отвечает
+    304 без тела, а ответ берется из кэша. Записи старше API_CACHE_TTL
+    удаляются, при превышении API_CACHE_SIZE_MB вытесняются давно не
+    использованные (LRU).
+    """
+
+    _filename = "api_cache.sqlite3"
+    # Параметры, которые не влияют на ответ и не должны попадать в ключ
+    _ignored_params = {"key"}
+
+    def __init__(self):
+        self._config = get_config()
+        self._logger = logging.getLogger()
+        self._ttl = self._config.performance.api_cache_ttl
+        self._max_size = self._config.performance.api_cache_size_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+        self.hits = 0  # Ответы 304, взятые из кэша
+        self.saved_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0 and self._max_size > 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = open_database(self._filename)
+            with self._connection:
+                self._connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        etag TEXT NOT NULL,
+                        body TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        stored_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                    """
+                )
+        return self._connection
+
+    @classmethod
+    def make_key(cls, url: str, params: Dict[str, Any]) -> str:
+        """Ключ записи: эндпоинт и параметры запроса без API ключа."""
+        items = sorted((k, str(v)) for k, v in params.items()
+                       if k not in cls._ignored_params)
+        return hashlib.sha256(json.dumps([url, items]).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        """
+        :return: (Optional[Tuple[str, str]]) ETag и тело сохраненного ответа или
+            None, если записи нет или она устарела.
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock, self._db() as db:
+            row = db.execute(
+                "SELECT etag, body, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row["stored_at"] + self._ttl <= time.time():
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+        return row["etag"], row["body"]
+
+    def touch(self, key: str) -> Optional[Dict]:
+        """
+        Отмечает, что сохраненный ответ еще актуален (сервер вернул 304), и
+        возвращает его.
+        """
+        now = time.time()
+        with self._lock, self._db() as db:
+            row = db.execute(
+                "SELECT body, size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            # Подтвержденный ответ снова свежий
+            db.execute(
+                "UPDATE responses SET stored_at = ?, last_access = ? WHERE key = ?",
+                (now, now, key)
+            )
+            self.hits += 1
+            self.saved_bytes += row["size"]
+
+        self._logger.debug(
+            f"[*cache] API response not modified, taken from cache "
+            f"(hits: {self.hits}, saved {self.saved_bytes / 1024:.0f}KiB)")
+        return json.loads(row["body"])
+
+    def put(self, key: str, etag: str, data: Dict) -> None:
+        if not self.enabled or not etag:
+            return
+
+        body = json.dumps(data)
+        if len(body) > self._max_size:
+            return
+        now = time.time()
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, etag, body, size, stored_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, etag, body, len(body), now, now)
+            )
+            self._evict(db, now)
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        """Удаляет устаревшие записи и самые давние по доступу сверх лимита размера."""
+        db.execute("DELETE FROM responses WHERE stored_at <= ?", (now - self._ttl,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self._max_size:
+            return
+
+        for row in db.execute(
+                "SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            db.execute("DELETE FROM responses WHERE key = ?", (row["key"],))
+            total -= row["size"]
+            if total <= self._max_size:
+                break
@@ -1,17 +1,84 @@
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
 
 from .entities import YoutubeLink
 from .api_query import ApiQuery
 from .converter.converter import Converter
 from .downloader import Downloader
+from .config.app_config import get_config
 from .filter import Filter
-from .utils import extract_type_and_id
+from .journal import Journal
+from .migrate import LibraryMigrator
+from .quota import QuotaExceeded, get_quota_ledger
+from .sync_state import IncrementalSync, SyncState
+from .utils import extract_type_and_id, read_links_file
 from .validator import validate_settings
 
 
 logger = logging.getLogger()
 
 
+def _log_quota_usage() -> None:
+    ledger = get_quota_ledger()
+    if ledger.run_used:
+        logger.info(f"API quota used by this run: {ledger.run_used} unit(s), "
+                    f"today in total: {ledger.day_used()}.")
+
+
+def _playlist_pages(
+        query: ApiQuery,
+        _filter: Filter,
+        playlist_id: str,
+        playlist_name: str
+) -> Tuple[Iterator[Tuple[List[str], int]], Optional[IncrementalSync]]:
+    """
+    Отфильтрованные страницы плейлиста, которые запрашиваются по мере чтения.
+    Плейлист загрузок канала (UU...) отсортирован от новых к старым, поэтому
+    при INCREMENTAL_SYNC страницы читаются только до последнего уже
+    синхронизированного видео.
+
+    :return: Страницы и синхронизация, которую нужно завершить (commit) после
+        загрузки, или None.
+    """
+    sync = None
+    if playlist_id.startswith("UU") and get_config().performance.incremental_sync:
+        sync = IncrementalSync(playlist_id, SyncState(), Journal(),
+                               date_filter=_filter.is_date_allowed)
+
+    # Плейлист загрузок идет от новых к старым, поэтому нижняя граница
+    # FILTER_DATE позволяет не читать страницы со старыми видео
+    newest_first = playlist_id.startswith("UU")
+    pages = query.iter_playlist_snippets(
+        playlist_id,
+        stop_at=sync.stop_at if sync else None,
+        min_published=_filter.get_min_published() if newest_first else None,
+        paging=sync.paging if sync else None
+    )
+    if sync:
+        pages = sync.track_snippets(pages)
+    filtered = _filter.iter_filters(pages, playlist_name=playlist_name)
+    if sync:
+        filtered = sync.track_urls(filtered)
+    return filtered, sync
+
+
+def _download_playlist(
+        query: ApiQuery,
+        _filter: Filter,
+        DL: Downloader,
+        playlist_id: str,
+        playlist_name: str
+) -> None:
+    """Скачивает плейлист по мере получения страниц."""
+    pages, sync = _playlist_pages(query, _filter, playlist_id, playlist_name)
+    DL.download_stream(pages, playlist_name=playlist_name)
+    if sync:
+        sync.commit()
+
+
 def download_audio(link: str):
     """
     Скачивает аудио или все аудио из плейлиста, в соответствии с
@@ -27,7 +94,7 @@ def download_audio(link: str):
         link, link_id = extract_type_and_id(link)
 
         query = ApiQuery()
-        _filter = Filter()
+        _filter = Filter(query)
         convertor = Converter()
         DL = Downloader(convertor=convertor)
 
@@ -47,17 +114,8 @@ def download_audio(link: str):
                 return
             playlist_name = pl_info["title"]
 
-            snippets = query.get_playlist_snippets(link_id)
-            filtered_snippets, len_snippets = _filter.apply_filters(
-                snippets,
-                playlist_name=playlist_name
-            )
-
-            DL.download_links(
-                urls=filtered_snippets,
-                playlist_name=playlist_name,
-                playlist_length=len_snippets
-            )
+            # Страницы плейлиста фильтруются и скачиваются по мере получения
+            _download_playlist(query, _filter, DL, link_id, playlist_name)
 
         elif link == YoutubeLink.CHANNEL:
             pl_info = query.get_channel_info(link_id)
@@ -67,20 +125,172 @@ def download_audio(link: str):
             playlist_name = pl_info["title"]
             link_id = pl_info["uploads"]
 
-            snippets = query.get_playlist_snippets(link_id)
-            filtered_snippets, len_snippets = _filter.apply_filters(
-                snippets,
-                playlist_name=playlist_name
-            )
-
-            DL.download_links(
-                urls=filtered_snippets,
-                playlist_name=playlist_name,
-                playlist_length=len_snippets
-            )
+            _download_playlist(query, _filter, DL, link_id, playlist_name)
 
         else:
             logger.warning(f"Bad link: {link}")
 
     except KeyboardInterrupt:
         logger.info("Download was interrupted by the user.")
+    except QuotaExceeded as e:
+        logger.error(f"API quota: {e}")
+    finally:
+        _log_quota_usage()
+
+
+def _put_page(pages_queue: queue.Queue, page: Tuple, stop: threading.Event) -> bool:
+    """
+    Кладет страницу в ограниченную очередь, ожидая, пока загрузка ее разберет.
+
+    :return: (bool) False, если загрузка прервана и страница не нужна.
+    """
+    while not stop.is_set():
+        try:
+            pages_queue.put(page, timeout=0.2)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _resolve_link(
+        query: ApiQuery,
+        _filter: Filter,
+        link: str,
+        pages_queue: queue.Queue,
+        stop: threading.Event
+) -> Optional[IncrementalSync]:
+    """
+    Получает из API информацию об источнике и все его отфильтрованные страницы
+    и складывает их в общую очередь как (ссылки, количество, название плейлиста).
+    Выполняется в пуле потоков, по одному заданию на ссылку.
+    """
+    link_type, link_id = extract_type_and_id(link)
+    if link_type == YoutubeLink.VIDEO:
+        snippets = query.get_video_snippet(link_id)
+        urls, len_snippets = _filter.apply_filters(snippets, filter_date=False)
+        _put_page(pages_queue, (urls, len_snippets, None), stop)
+        return None
+
+    if link_type == YoutubeLink.PLAYLIST:
+        info = query.get_playlist_info(link_id)
+        playlist_id = link_id
+    elif link_type == YoutubeLink.CHANNEL:
+        info = query.get_channel_info(link_id)
+        playlist_id = info["uploads"] if info else ""
+    else:
+        logger.warning(f"Bad link: {link}")
+        return None
+    if info is None:
+        return None
+
+    playlist_name = info["title"]
+    pages, sync = _playlist_pages(query, _filter, playlist_id, playlist_name)
+    for urls, len_snippets in pages:
+        if not _put_page(pages_queue, (urls, len_snippets, playlist_name), stop):
+            break  # Загрузка прервана, остальные страницы не нужны
+    return sync
+
+
+def download_batch(links: List[str]):
+    """
+    Скачивает аудио из нескольких ссылок на видео, плейлисты и каналы.
+    Запросы к API для разных ссылок выполняются параллельно (не больше
+    RESOLVE_WORKERS одновременно), а найденные видео попадают в одну общую
+    очередь загрузки без повторов.
+
+    :param links: Ссылки на видео, плейлисты или каналы.
+    :return: None
+    """
+    try:
+        if not validate_settings():
+            return
+
+        links = list(dict.fromkeys(links))
+        query = ApiQuery()
+        _filter = Filter(query)
+        DL = Downloader(convertor=Converter())
+
+        # Очередь ограничена: потоки API ждут, пока загрузка догонит их
+        pages_queue: queue.Queue = queue.Queue(
+            maxsize=get_config().performance.download_workers)
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(get_config().performance.resolve_workers, len(links))),
+            thread_name_prefix="resolve"
+        )
+        futures = [executor.submit(_resolve_link, query, _filter, link, pages_queue, stop)
+                   for link in links]
+        logger.info(f"Resolving {len(links)} link(s)...")
+
+        def iter_pages():
+            # Отдаем страницы по мере готовности, пока работает хотя бы одно задание
+            while True:
+                try:
+                    yield pages_queue.get(timeout=0.2)
+                except queue.Empty:
+                    if all(future.done() for future in futures) and pages_queue.empty():
+                        return
+
+        try:
+            DL.download_batch(iter_pages())
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        for link, future in zip(links, futures):
+            if future.cancelled():
+                continue
+            if isinstance(future.exception(), QuotaExceeded):
+                logger.error(f"API quota, {link}: {future.exception()}")
+            elif future.exception() is not None:
+                logger.error(f"Failed to resolve {link}: {future.exception()}")
+            elif future.result() is not None:
+                future.result().commit()
+
+    except KeyboardInterrupt:
+        logger.info("Download was interrupted by the user.")
+    except QuotaExceeded as e:
+        logger.error(f"API quota: {e}")
+    finally:
+        _log_quota_usage()
+
+
+def download_links_file(filepath: str, links: Optional[List[str]] = None):
+    """
+    Скачивает аудио по ссылкам из файла (по одной на строку) вместе с
+    дополнительными ссылками из командной строки.
+
+    :param filepath: Путь к файлу со ссылками.
+    :param links: Дополнительные ссылки.
+    :return: None
+    """
+    try:
+        file_links = read_links_file(filepath)
+    except OSError as e:
+        logger.error(f"Failed to read the links file: {e}")
+        return
+    download_batch([*(links or []), *file_links])
+
+
+def print_quota_report(day: Optional[str] = None):
+    """
+    Выводит расход квоты API за сутки (по тихоокеанскому времени) по заданиям
+    и эндпоинтам.
+
+    :param day: Сутки в формате YYYY-MM-DD, по умолчанию текущие.
+    :return: None
+    """
+    print(get_quota_ledger().report(day))
+
+
+def migrate_library(directory: str):
+    """
+    Перекодирует уже скачанные файлы каталога в формат AUDIO_EXT из настроек.
+
+    :param directory: Каталог с загрузками.
+    :return: None
+    """
+    if not validate_settings():
+        return
+    LibraryMigrator().migrate(directory)
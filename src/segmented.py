@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    """Общий для всех сегментов файла лимит скорости, байт/с."""
+
+    def __init__(self, rate: Optional[int]):
+        self._rate = rate
+        self._lock = threading.Lock()
+        self._allowance = float(rate or 0)
+        self._last = time.monotonic()
+
+    def consume(self, amount: int) -> None:
+        if not self._rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(float(self._rate),
+                                  self._allowance + (now - self._last) * self._rate)
+            self._last = now
+            self._allowance -= amount
+            wait = -self._allowance / self._rate if self._allowance < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class SegmentedDownloader:
+    """
+    Загрузка одного файла несколькими диапазонами (HTTP Range) параллельно через
+    общий пул соединений. Сегменты пишутся по своим смещениям в заранее
+    выделенный .part файл, поэтому собираются в исходном порядке, а общий лимит
+    скорости делится между ними. Докачанные позиции сегментов сохраняются рядом
+    в файле .segments: после ошибки .part остается на диске, и следующая попытка
+    продолжает каждый сегмент с того места, где он остановился.
+    """
+
+    read_size = 64 * 1024
+    retries = 3
+    # Как часто каждый сегмент сохраняет свою позицию, чтобы после жесткого
+    # завершения процесса не качать уже записанное заново
+    save_interval = 4 * 1024 * 1024
+
+    def __init__(
+            self,
+            segments: int,
+            headers: Optional[Dict[str, str]] = None,
+            proxy: str = "",
+            ratelimit: Optional[int] = None,
+            timeout: float = 30
+    ):
+        self._segments = segments
+        self._headers = dict(headers or {})
+        self._proxies = {"http": proxy, "https": proxy} if proxy else None
+        self._bucket = TokenBucket(ratelimit)
+        self._timeout = timeout
+        self._yt_dlp_logger = logging.getLogger('yt-dlp')
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=segments)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    @staticmethod
+    def split_ranges(filesize: int, segments: int) -> List[Tuple[int, int]]:
+        """Делит файл на диапазоны [start, end] включительно."""
+        segments = max(1, min(segments, filesize))
+        size = filesize // segments
+        ranges = []
+        for i in range(segments):
+            start = i * size
+            end = filesize - 1 if i == segments - 1 else start + size - 1
+            ranges.append((start, end))
+        return ranges
+
+    def _download_segment(
+            self,
+            url: str,
+            fd: int,
+            index: int,
+            end: int,
+            positions: List[int],
+            save: Callable[[], None]
+    ) -> int:
+        """
+        Докачивает сегмент с позиции positions[index] до end включительно.
+        Достигнутая позиция остается в positions и при ошибке, а каждые
+        save_interval байт сохраняется вызовом save.
+
+        :return: (int) Количество байт, скачанных этим вызовом.
+        """
+        position = first = saved = positions[index]
+        begin = time.time()
+        try:
+            for attempt in range(1, self.retries + 1):
+                if position > end:
+                    break
+                try:
+                    headers = {**self._headers, "Range": f"bytes={position}-{end}"}
+                    with self._session.get(url, headers=headers, proxies=self._proxies,
+                                           stream=True, timeout=self._timeout) as response:
+                        if response.status_code != 206:
+                            raise requests.HTTPError(
+                                f"Range request returned status {response.status_code}",
+                                response=response)
+                        for chunk in response.iter_content(self.read_size):
+                            chunk = chunk[:end + 1 - position]
+                            self._bucket.consume(len(chunk))
+                            os.pwrite(fd, chunk, position)
+                            position += len(chunk)
+                            if position > end:
+                                break
+                            if position - saved >= self.save_interval:
+                                positions[index] = saved = position
+                                save()
+                except requests.RequestException as e:
+                    if attempt == self.retries:
+                        raise
+                    self._yt_dlp_logger.debug(
+                        f"[*segmented] Segment {index} retry {attempt} from {position}: {e}")
+        finally:
+            positions[index] = position
+
+        if position <= end:
+            raise IOError(f"Segment {index} is incomplete: {position - first} of "
+                          f"{end - first + 1} bytes")
+
+        elapsed = max(time.time() - begin, 1e-6)
+        self._yt_dlp_logger.debug(
+            f"[*segmented] Segment {index}: {(position - first) / 1024:.0f}KiB "
+            f"in {elapsed:.1f}s, {(position - first) / 1024 / elapsed:.0f}KiB/s")
+        return position - first
+
+    @staticmethod
+    def _load_positions(
+            state_path: str,
+            part_path: str,
+            filesize: int,
+            ranges: List[Tuple[int, int]]
+    ) -> Optional[List[int]]:
+        """Позиции сегментов прошлой попытки, если она качала тот же файл."""
+        if not os.path.exists(part_path) or os.path.getsize(part_path) != filesize:
+            return None
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict):
+            return None
+        positions = state.get("positions")
+        if state.get("filesize") != filesize or not isinstance(positions, list) \
+                or len(positions) != len(ranges) \
+                or not all(isinstance(position, int) and start <= position <= end + 1
+                           for position, (start, end) in zip(positions, ranges)):
+            return None
+        return positions
+
+    @staticmethod
+    def _save_positions(state_path: str, filesize: int, positions: List[int]) -> None:
+        """Записывает позиции через временный файл, чтобы состояние не было порвано."""
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"filesize": filesize, "positions": positions}, f)
+        os.replace(tmp_path, state_path)
+
+    def download(self, url: str, filesize: int, output_path: str) -> Tuple[int, float]:
+        """
+        Скачивает файл в output_path. Если прошлая попытка оставила .part того
+        же размера, уже скачанные части сегментов не запрашиваются повторно.
+
+        :param url: (str) Прямая ссылка на файл.
+        :param filesize: (int) Размер файла в байтах.
+        :param output_path: (str) Итоговый путь файла.
+        :return: (Tuple[int, float]) Количество байт, скачанных этим вызовом,
+            и время загрузки, с.
+        """
+        ranges = self.split_ranges(filesize, self._segments)
+        part_path = output_path + ".part"
+        state_path = output_path + ".segments"
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+        positions = self._load_positions(state_path, part_path, filesize, ranges)
+        if positions is not None:
+            done = sum(position - start for position, (start, _) in zip(positions, ranges))
+            self._yt_dlp_logger.info(
+                f"[*segmented] Resuming {part_path}: {done / 1024:.0f}KiB already downloaded")
+        else:
+            positions = [start for start, _ in ranges]
+
+        save_lock = threading.Lock()
+
+        def save() -> None:
+            with save_lock:
+                self._save_positions(state_path, filesize, list(positions))
+
+        begin = time.time()
+        fd = os.open(part_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, filesize)
+            save()
+            with ThreadPoolExecutor(max_workers=len(ranges),
+                                    thread_name_prefix="segment") as executor:
+                futures = [executor.submit(self._download_segment, url, fd, i, end,
+                                           positions, save)
+                           for i, (_, end) in enumerate(ranges)]
+                downloaded = sum(future.result() for future in futures)
+        except BaseException:
+            # .part и позиции сегментов остаются для следующей попытки
+            os.close(fd)
+            save()
+            raise
+        os.close(fd)
+        os.replace(part_path, output_path)
+        os.remove(state_path)
+
+        elapsed = time.time() - begin
+        self._yt_dlp_logger.info(
+            f"[*segmented] Downloaded {downloaded / 1024:.0f}KiB in {len(ranges)} "
+            f"segments, {elapsed:.1f}s")
+        return downloaded, elapsed
+
+    def close(self) -> None:
+        self._session.close()
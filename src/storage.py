@@ -0,0 +1,27 @@
+import os
+import sqlite3
+
+from .config.app_config import get_config
+
+
+def open_database(filename: str) -> sqlite3.Connection:
+    """
+    Открывает (и при необходимости создает) базу SQLite в каталоге состояния
+    программы (STATE_DIRECTORY).
+
+    :param filename: (str) Имя файла базы, например "journal.sqlite3".
+    :return: (sqlite3.Connection) Соединение, которое можно использовать из
+        разных потоков при внешней синхронизации.
+    """
+    state_directory = get_config().extended.state_directory
+    os.makedirs(state_directory, exist_ok=True)
+
+    connection = sqlite3.connect(
+        os.path.join(state_directory, filename),
+        timeout=30,
+        check_same_thread=False
+    )
+    connection.row_factory = sqlite3.Row
+    # WAL позволяет читать базу, пока другой процесс в нее пишет
+    connection.execute("PRAGMA journal_mode=WAL")
+    return connection
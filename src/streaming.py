@@ -0,0 +1,80 @@
+import re
+import time
+import logging
+from typing import Dict, Iterator, Optional
+
+import requests
+
+
+class HttpStream:
+    """
+    Итератор по байтам аудиопотока по HTTP. Файл запрашивается кусками через
+    заголовок Range (как это делает yt-dlp для YouTube), а скорость ограничивается
+    лимитом ratelimit. После чтения доступны размер и время загрузки.
+    """
+
+    read_size = 64 * 1024
+    default_chunk_size = 10 * 1024 * 1024
+
+    def __init__(
+            self,
+            url: str,
+            headers: Optional[Dict[str, str]] = None,
+            proxy: str = "",
+            ratelimit: Optional[int] = None,
+            chunk_size: Optional[int] = None,
+            timeout: float = 30
+    ):
+        self._url = url
+        self._headers = dict(headers or {})
+        self._proxies = {"http": proxy, "https": proxy} if proxy else None
+        self._ratelimit = ratelimit
+        self._chunk_size = chunk_size or self.default_chunk_size
+        self._timeout = timeout
+        self._yt_dlp_logger = logging.getLogger('yt-dlp')
+
+        self.downloaded_bytes = 0
+        self.elapsed = 0.0
+
+    def _throttle(self, start: float) -> None:
+        """Спит, если скачали больше, чем позволяет лимит скорости."""
+        if not self._ratelimit:
+            return
+        expected = self.downloaded_bytes / self._ratelimit
+        elapsed = time.time() - start
+        if expected > elapsed:
+            time.sleep(expected - elapsed)
+
+    def __iter__(self) -> Iterator[bytes]:
+        start = time.time()
+        total: Optional[int] = None
+
+        with requests.Session() as session:
+            while total is None or self.downloaded_bytes < total:
+                end = self.downloaded_bytes + self._chunk_size - 1
+                headers = {**self._headers, "Range": f"bytes={self.downloaded_bytes}-{end}"}
+                with session.get(self._url, headers=headers, proxies=self._proxies,
+                                 stream=True, timeout=self._timeout) as response:
+                    response.raise_for_status()
+                    if response.status_code == 206:
+                        match = re.search(r"/(\d+)$",
+                                          response.headers.get("Content-Range", ""))
+                        total = int(match.group(1)) if match else None
+                    else:
+                        # Сервер проигнорировал Range и отдает файл целиком
+                        total = None
+
+                    received = 0
+                    for chunk in response.iter_content(self.read_size):
+                        received += len(chunk)
+                        self.downloaded_bytes += len(chunk)
+                        yield chunk
+                        self._throttle(start)
+
+                if response.status_code != 206 or total is None or received == 0:
+                    break
+
+        self.elapsed = time.time() - start
+        self._yt_dlp_logger.info(
+            f"[*downloader] Streamed {self.downloaded_bytes / 1024:.0f}KiB "
+            f"in {self.elapsed:.1f}s")
@@ -0,0 +1,142 @@
+import time
+import logging
+import threading
+import sqlite3
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .journal import Journal
+from .storage import open_database
+
+
+class SyncState:
+    """
+    Отметки инкрементальной синхронизации: для каждого плейлиста загрузок
+    канала хранится самое новое видео (ID и дата публикации), которое уже
+    было полностью обработано. Плейлист загрузок отсортирован от новых к
+    старым, поэтому при следующем запуске страницы читаются только до этой
+    отметки.
+    """
+
+    _filename = "sync_state.sqlite3"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = open_database(self._filename)
+            with self._connection:
+                self._connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS marks (
+                        playlist_id TEXT PRIMARY KEY,
+                        video_id TEXT NOT NULL,
+                        published TEXT NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                    """
+                )
+        return self._connection
+
+    def get_mark(self, playlist_id: str) -> Optional[Tuple[str, str]]:
+        """
+        :return: (Optional[Tuple[str, str]]) ID и дата публикации самого нового
+            обработанного видео или None, если плейлист еще не синхронизировался.
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT video_id, published FROM marks WHERE playlist_id = ?",
+                (playlist_id,)
+            ).fetchone()
+        return (row["video_id"], row["published"]) if row else None
+
+    def set_mark(self, playlist_id: str, video_id: str, published: str) -> None:
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO marks (playlist_id, video_id, published, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (playlist_id, video_id, published, time.time())
+            )
+
+
+class IncrementalSync:
+    """
+    Одна инкрементальная синхронизация плейлиста загрузок. Запоминает самое
+    новое видео из ответа API и ссылки, отданные загрузчику, и сдвигает отметку
+    только если все страницы были прочитаны, а все ссылки обработаны. Иначе
+    следующий запуск снова дойдет до старой отметки и подберет пропущенное.
+    """
+
+    def __init__(
+            self,
+            playlist_id: str,
+            state: SyncState,
+            journal: Journal,
+            date_filter: Optional[Callable[[str], bool]] = None
+    ):
+        """
+        :param date_filter: (Optional[Callable[[str], bool]]) Проверка даты
+            публикации по FILTER_DATE. Если фильтр отбросил хотя бы одно видео,
+            отметка не сдвигается: при другом фильтре эти видео понадобятся.
+        """
+        self._playlist_id = playlist_id
+        self._state = state
+        self._journal = journal
+        self._date_filter = date_filter
+        self._logger = logging.getLogger()
+        self.stop_at = state.get_mark(playlist_id)
+        # Заполняет ApiQuery.iter_playlist_snippets: 'complete' - все страницы
+        # получены, а не закончились из-за ошибки запроса, 'trimmed' - чтение
+        # остановлено нижней границей FILTER_DATE
+        self.paging: Dict[str, bool] = {}
+
+        self._newest: Optional[Dict[str, str]] = None
+        self._urls: List[str] = []
+        self._exhausted = False
+
+    def track_snippets(
+            self,
+            pages: Iterable[List[Dict[str, str]]]
+    ) -> Iterator[List[Dict[str, str]]]:
+        """Пропускает страницы API, запоминая первое (самое новое) видео."""
+        for page in pages:
+            if self._newest is None and page:
+                self._newest = page[0]
+            if self._date_filter is not None and not all(
+                    self._date_filter(item['published']) for item in page):
+                self.paging['trimmed'] = True
+            yield page
+
+    def track_urls(
+            self,
+            pages: Iterable[Tuple[List[str], int]]
+    ) -> Iterator[Tuple[List[str], int]]:
+        """
+        Пропускает отфильтрованные страницы, запоминая ссылки для загрузки.
+        Синхронизация считается полной, только если страницы закончились
+        ответом API без следующей страницы.
+        """
+        for page_urls, page_length in pages:
+            self._urls.extend(page_urls)
+            yield page_urls, page_length
+        self._exhausted = self.paging.get('complete', False)
+
+    def commit(self) -> None:
+        """Сдвигает отметку, если синхронизация прошла полностью."""
+        if self._newest is None or not self._newest.get('video_id'):
+            return
+        if self.paging.get('trimmed'):
+            self._logger.info(
+                "FILTER_DATE skipped part of the videos, the sync mark is kept so "
+                "that they are checked again if the filter changes.")
+            return
+        if not self._exhausted or not self._journal.all_finished(self._urls):
+            self._logger.info(
+                "Sync is incomplete, the next run will check the same videos again.")
+            return
+        self._state.set_mark(self._playlist_id, self._newest['video_id'],
+                             self._newest['published'])
+        self._logger.debug(
+            f"Sync mark for {self._playlist_id} moved to {self._newest['video_id']} "
+            f"({self._newest['published']})")
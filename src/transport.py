@@ -0,0 +1,108 @@
+import time
+import random
+import logging
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpTransport:
+    """
+    HTTP-транспорт для запросов к API. Одна сессия с пулом соединений
+    (keep-alive, TLS-рукопожатие выполняется один раз на соединение), явные
+    таймауты подключения и чтения, повтор временных ошибок (обрыв соединения,
+    таймаут, 429 и 5xx) с экспоненциальной паузой и случайным разбросом, а
+    также сжатие ответов gzip.
+    """
+
+    retry_statuses = {429, 500, 502, 503, 504}
+    connect_timeout = 5.0
+    backoff_base = 0.5  # Пауза перед первым повтором, с
+    backoff_max = 30.0
+
+    def __init__(self, read_timeout: float = 20, retries: int = 4, pool_size: int = 8):
+        """
+        :param read_timeout: (float) Таймаут чтения ответа, с.
+        :param retries: (int) Сколько раз повторять временные ошибки.
+        :param pool_size: (int) Число соединений с одним хостом в пуле.
+        """
+        self._timeout = (self.connect_timeout, read_timeout)
+        self._retries = retries
+        self._logger = logging.getLogger()
+
+        self._session = requests.Session()
+        # API Google отдает сжатые ответы только если "gzip" есть и в User-Agent
+        self._session.headers.update({
+            "Accept-Encoding": "gzip",
+            "User-Agent": "youtube_audio_downloader (gzip)"
+        })
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def _get_backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        """Пауза перед повтором: Retry-After сервера или экспонента с разбросом."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(
+            self,
+            url: str,
+            params: Optional[Dict] = None,
+            proxies: Optional[Dict[str, str]] = None,
+            headers: Optional[Dict[str, str]] = None,
+            before_attempt: Optional[Callable[[], None]] = None,
+            after_attempt: Optional[
+                Callable[[Optional[requests.Response], float], None]] = None
+    ) -> requests.Response:
+        """
+        Выполняет GET-запрос с повторами временных ошибок.
+
+        :param before_attempt: Вызывается перед каждой попыткой, в том числе
+            перед повтором. Исключение из него прерывает запрос.
+        :param after_attempt: Вызывается после каждой попытки с ее ответом (None,
+            если ответа не было) и временем в секундах.
+
+        :return: (requests.Response) Последний полученный ответ, в том числе
+            с ошибочным статусом, если повторы исчерпаны.
+        :raises requests.RequestException: Если ответа так и не было получено.
+        """
+        attempt = 0
+        while True:
+            if before_attempt is not None:
+                before_attempt()
+            start = time.time()
+            response = None
+            try:
+                response = self._session.get(url, params=params, proxies=proxies,
+                                             headers=headers, timeout=self._timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self._retries:
+                    raise
+                reason = type(e).__name__
+            else:
+                self._logger.debug(
+                    f"GET {url} -> {response.status_code} in {time.time() - start:.2f}s, "
+                    f"{response.headers.get('Content-Length', len(response.content))} bytes "
+                    f"({response.headers.get('Content-Encoding', 'identity')})")
+                if response.status_code not in self.retry_statuses \
+                        or attempt >= self._retries:
+                    return response
+                reason = f"status {response.status_code}"
+            finally:
+                if after_attempt is not None:
+                    after_attempt(response, time.time() - start)
+
+            delay = self._get_backoff(attempt, response)
+            attempt += 1
+            self._logger.warning(
+                f"API request failed ({reason}), retry {attempt}/{self._retries} "
+                f"in {delay:.1f}s")
+            time.sleep(delay)
+
+    def close(self) -> None:
+        self._session.close()
@@ -3,7 +3,7 @@ import sys
 import time
 import re
 import subprocess
-from typing import Tuple
+from typing import List, Optional, Tuple
 
 from .entities import YoutubeLink
 
@@ -80,6 +80,23 @@ def read_user_agents(filepath="user_agents.txt"):
         return []
 
 
+def read_links_file(filepath: str) -> List[str]:
+    """
+    Читает ссылки из файла: по одной на строку, пустые строки и строки,
+    начинающиеся с #, пропускаются.
+
+    :param filepath: (str) Путь к файлу со ссылками.
+    :return: (List[str]) Ссылки в порядке следования в файле.
+    """
+    links = []
+    with open(filepath, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                links.append(line)
+    return links
+
+
 def open_settings():
     # Определяем редактор из переменных окружения или используем nano по умолчанию
     editor = os.getenv('VISUAL') or os.getenv('EDITOR') or 'nano'
@@ -104,3 +121,22 @@ def normalize_string(s: str) -> str:
     # Заменяем несколько пробелов на один
     s = re.sub(r'\s+', ' ', s)
     return s.strip()
+
+
+def parse_iso8601_duration(duration: str) -> Optional[int]:
+    """
+    Переводит длительность ISO 8601 из YouTube API (например, "PT1H2M3S",
+    "P1DT2H") в секунды.
+
+    :param duration: (str) Длительность в формате ISO 8601.
+    :return: (Optional[int]) Количество секунд или None, если строка не разобрана.
+    """
+    match = re.fullmatch(
+        r"P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?)?",
+        duration or ""
+    )
+    if not match or duration in ("P", "PT") or duration.endswith("T"):
+        return None
+    weeks, days, hours, minutes, seconds = match.groups()
+    return (int(weeks or 0) * 604800 + int(days or 0) * 86400 + int(hours or 0) * 3600
+            + int(minutes or 0) * 60 + int(float(seconds or 0)))
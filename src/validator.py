@@ -72,6 +72,126 @@ def validate_date_filter(filter_expression: str | None) -> bool:
         return False
 
 
+def validate_workers(workers: int) -> bool:
+    """
+    Проверяет количество потоков загрузки (DOWNLOAD_WORKERS) из настроек.
+
+    :param workers: (int) Количество потоков.
+    :return: (bool) True, если значение допустимо, иначе False.
+    """
+    if not 1 <= workers <= 16:
+        logger.error(
+            f"\n Invalid number of download workers: {workers}"
+            f"\n TIP: Use DOWNLOAD_WORKERS in the range from 1 to 16 in settings")
+        return False
+    return True
+
+
+def validate_pipeline(convert_workers: int, queue_size: int) -> bool:
+    """
+    Проверяет настройки конвейера постобработки (CONVERT_WORKERS,
+    PIPELINE_QUEUE_SIZE).
+
+    :param convert_workers: (int) Количество процессов конвертации.
+    :param queue_size: (int) Размер очереди между загрузкой и постобработкой.
+    :return: (bool) True, если значения допустимы, иначе False.
+    """
+    if convert_workers < 0 or queue_size < 1:
+        logger.error(
+            f"\n Invalid pipeline settings: CONVERT_WORKERS={convert_workers}, "
+            f"PIPELINE_QUEUE_SIZE={queue_size}"
+            f"\n TIP: CONVERT_WORKERS must be >= 0, PIPELINE_QUEUE_SIZE must be >= 1")
+        return False
+    return True
+
+
+def validate_segmented(segments: int, min_size_mb: int) -> bool:
+    """
+    Проверяет настройки сегментированной загрузки (SEGMENTED_DOWNLOAD,
+    SEGMENTED_MIN_SIZE_MB).
+
+    :param segments: (int) Количество параллельных диапазонов, 0 - выключено.
+    :param min_size_mb: (int) Минимальный размер файла в мегабайтах.
+    :return: (bool) True, если значения допустимы, иначе False.
+    """
+    if not 0 <= segments <= 16 or min_size_mb < 0:
+        logger.error(
+            f"\n Invalid segmented download settings: SEGMENTED_DOWNLOAD={segments}, "
+            f"SEGMENTED_MIN_SIZE_MB={min_size_mb}"
+            f"\n TIP: SEGMENTED_DOWNLOAD must be from 0 to 16, "
+            f"SEGMENTED_MIN_SIZE_MB must be >= 0")
+        return False
+    return True
+
+
+def validate_ffmpeg_timeouts(timeout: int, stall_timeout: int) -> bool:
+    """
+    Проверяет лимиты времени ffmpeg (FFMPEG_TIMEOUT, FFMPEG_STALL_TIMEOUT).
+
+    :param timeout: (int) Максимальное время конвертации, с, 0 - без лимита.
+    :param stall_timeout: (int) Время без продвижения, с, 0 - без проверки.
+    :return: (bool) True, если значения допустимы, иначе False.
+    """
+    if timeout < 0 or stall_timeout < 0:
+        logger.error(
+            f"\n Invalid ffmpeg timeouts: FFMPEG_TIMEOUT={timeout}, "
+            f"FFMPEG_STALL_TIMEOUT={stall_timeout}"
+            f"\n TIP: Both must be >= 0, 0 disables the limit")
+        return False
+    return True
+
+
+def validate_caches(**sizes: int) -> bool:
+    """
+    Проверяет время жизни и размеры кэшей (INFO_CACHE_TTL, INFO_CACHE_SIZE_MB,
+    API_CACHE_TTL, API_CACHE_SIZE_MB, COVER_CACHE_SIZE_MB).
+
+    :param sizes: (int) Значения по именам настроек.
+    :return: (bool) True, если значения допустимы, иначе False.
+    """
+    invalid = [f"{name}={value}" for name, value in sizes.items() if value < 0]
+    if invalid:
+        logger.error(
+            f"\n Invalid cache settings: {', '.join(invalid)}"
+            f"\n TIP: Cache TTL and size must be >= 0, 0 disables the cache")
+        return False
+    return True
+
+
+def validate_api(timeout: int, retries: int, quota_budget: int) -> bool:
+    """
+    Проверяет настройки запросов к API (API_TIMEOUT, API_RETRIES, QUOTA_BUDGET).
+
+    :param timeout: (int) Таймаут чтения ответа, с.
+    :param retries: (int) Количество повторов при временной ошибке.
+    :param quota_budget: (int) Бюджет квоты на запуск, 0 - без ограничения.
+    :return: (bool) True, если значения допустимы, иначе False.
+    """
+    if timeout < 1 or not 0 <= retries <= 10 or quota_budget < 0:
+        logger.error(
+            f"\n Invalid API settings: API_TIMEOUT={timeout}, API_RETRIES={retries}, "
+            f"QUOTA_BUDGET={quota_budget}"
+            f"\n TIP: API_TIMEOUT must be >= 1, API_RETRIES must be from 0 to 10, "
+            f"QUOTA_BUDGET must be >= 0")
+        return False
+    return True
+
+
+def validate_resolve_workers(workers: int) -> bool:
+    """
+    Проверяет количество потоков обработки ссылок (RESOLVE_WORKERS).
+
+    :param workers: (int) Количество потоков.
+    :return: (bool) True, если значение допустимо, иначе False.
+    """
+    if not 1 <= workers <= 32:
+        logger.error(
+            f"\n Invalid number of resolve workers: {workers}"
+            f"\n TIP: Use RESOLVE_WORKERS in the range from 1 to 32 in settings")
+        return False
+    return True
+
+
 def validate_settings() -> bool:
     """
     Проверяет корректны ли некоторые настройки.
@@ -85,4 +205,34 @@ def validate_settings() -> bool:
     if not validate_date_filter(config.extended.filter_date):
         return False
 
+    if not validate_workers(config.performance.download_workers):
+        return False
+
+    if not validate_pipeline(config.performance.convert_workers,
+                             config.performance.pipeline_queue_size):
+        return False
+
+    if not validate_segmented(config.performance.segmented_download,
+                              config.performance.segmented_min_size_mb):
+        return False
+
+    if not validate_ffmpeg_timeouts(config.performance.ffmpeg_timeout,
+                                    config.performance.ffmpeg_stall_timeout):
+        return False
+
+    if not validate_caches(INFO_CACHE_TTL=config.performance.info_cache_ttl,
+                           INFO_CACHE_SIZE_MB=config.performance.info_cache_size_mb,
+                           API_CACHE_TTL=config.performance.api_cache_ttl,
+                           API_CACHE_SIZE_MB=config.performance.api_cache_size_mb,
+                           COVER_CACHE_SIZE_MB=config.performance.cover_cache_size_mb):
+        return False
+
+    if not validate_api(config.performance.api_timeout,
+                        config.performance.api_retries,
+                        config.api.quota_budget):
+        return False
+
+    if not validate_resolve_workers(config.performance.resolve_workers):
+        return False
+
     return True
@@ -0,0 +1,476 @@
+"""
+Локальная замена YouTube для офлайн-тестов и бенчмарков конвейера
+ApiQuery -> Filter -> Downloader -> Converter.
+
+Сервер отдает ответы YouTube Data API (playlists, playlistItems, videos,
+channels, search) по синтетическим данным, а для каждого видео - страницу
+/watch, DASH-манифест с форматом 251 (Opus в WebM), сам аудиофайл и миниатюру.
+Страницу разбирает общий (generic) экстрактор yt-dlp, поэтому загрузчик
+работает без изменений, нужно только подменить ссылку на видео
+(src.api_query.VIDEO_URL) и ENDPOINT.
+
+Можно добавить задержку ответов, ограничить скорость отдачи файлов и
+вернуть заданный статус (403, 429, ...) на несколько запросов подряд.
+"""
+import os
+import re
+import html
+import json
+import time
+import random
+import hashlib
+import threading
+from io import BytesIO
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image
+
+import src.api_query
+import src.proxy_pool
+import src.quota
+from src.config.app_config import Config, ConfigManager
+from src.pacing import PacingController
+from test.test_webm_remuxer import make_webm
+
+_ENV_EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            ".env.example")
+
+
+@dataclass
+class FakeVideo:
+    video_id: str
+    title: str
+    published: str  # ISO 8601 UTC, как в ответах API
+    duration: str = "PT3M30S"
+    privacy: str = "public"  # public, private или deleted
+    upload_status: str = "processed"
+    blocked: List[str] = field(default_factory=list)  # Коды стран
+
+
+def make_videos(
+        count: int,
+        newest: datetime = datetime(2024, 6, 1, tzinfo=timezone.utc),
+        interval: timedelta = timedelta(days=7),
+        prefix: str = "Track"
+) -> List[FakeVideo]:
+    """Синтетические видео от новых к старым, как в плейлисте загрузок канала."""
+    return [
+        FakeVideo(
+            video_id=hashlib.sha1(f"{prefix}{i}".encode()).hexdigest()[:11],
+            title=f"{prefix} {i + 1:03d}",
+            published=(newest - interval * i).strftime("%Y-%m-%dT%H:%M:%SZ")
+        )
+        for i in range(count)
+    ]
+
+
+@dataclass
+class _Fault:
+    prefix: str
+    status: int
+    remaining: int
+    retry_after: Optional[int]
+    skip: int = 0
+
+
+class FakeYoutube:
+    """
+    Локальный HTTP-сервер, который изображает YouTube Data API и страницы видео.
+
+    :param audio_seconds: (int) Длительность сгенерированного аудио. Один и тот
+        же файл отдается для всех видео.
+    :param latency: (float) Задержка перед каждым ответом, с.
+    :param throughput: (Optional[int]) Скорость отдачи аудио, байт/с.
+    :param page_size: (int) Максимум элементов на странице playlistItems.
+    """
+
+    api_path = "/youtube/v3"
+
+    def __init__(
+            self,
+            audio_seconds: int = 5,
+            latency: float = 0.0,
+            throughput: Optional[int] = None,
+            page_size: int = 50
+    ):
+        self.audio_seconds = audio_seconds
+        self.latency = latency
+        self.throughput = throughput
+        self.page_size = page_size
+
+        self.videos: Dict[str, FakeVideo] = {}
+        self.playlists: Dict[str, Tuple[str, List[str]]] = {}
+        self.channels: Dict[str, Tuple[str, str]] = {}  # handle -> ID, название
+        self.hits: Counter = Counter()  # Запросы по эндпоинтам
+        self.bytes_sent = 0
+
+        self._faults: List[_Fault] = []
+        self._lock = threading.Lock()
+
+        # 20 мс на пакет, как у YouTube
+        rnd = random.Random(0)
+        self.audio = make_webm([bytes((31 << 3,)) + rnd.randbytes(400)
+                                for _ in range(audio_seconds * 50)])
+        cover = BytesIO()
+        Image.new("RGB", (480, 360), (200, 40, 40)).save(cover, "JPEG")
+        self.thumbnail = cover.getvalue()
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self  # type: ignore[attr-defined]
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def endpoint(self) -> str:
+        """Значение ENDPOINT для настроек."""
+        return self.base_url + self.api_path
+
+    @property
+    def video_url(self) -> str:
+        """Шаблон ссылки на видео для src.api_query.VIDEO_URL."""
+        return self.base_url + "/watch?v={}"
+
+    def start(self) -> "FakeYoutube":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeYoutube":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def add_playlist(self, title: str, videos: List[FakeVideo]) -> str:
+        """:return: (str) ID плейлиста."""
+        playlist_id = "PL" + hashlib.sha1(title.encode()).hexdigest()[:32]
+        self._add_videos(playlist_id, title, videos)
+        return playlist_id
+
+    def add_channel(self, handle: str, title: str, videos: List[FakeVideo]) -> str:
+        """:return: (str) ID плейлиста загрузок канала."""
+        channel_id = "UC" + hashlib.sha1(handle.encode()).hexdigest()[:22]
+        self.channels[handle.lstrip("@").lower()] = (channel_id, title)
+        uploads = "UU" + channel_id[2:]
+        self._add_videos(uploads, title, videos)
+        return uploads
+
+    def _add_videos(self, playlist_id: str, title: str, videos: List[FakeVideo]) -> None:
+        self.playlists[playlist_id] = (title, [video.video_id for video in videos])
+        for video in videos:
+            self.videos[video.video_id] = video
+
+    def fail(
+            self,
+            prefix: str,
+            status: int,
+            times: int = 1,
+            retry_after: Optional[int] = None,
+            skip: int = 0
+    ) -> None:
+        """
+        Следующие times запросов, путь которых начинается с prefix, получат
+        ответ со статусом status. Первые skip таких запросов проходят как обычно.
+
+        Пример: fail("/youtube/v3/playlistItems", 429, retry_after=0),
+            fail("/media/", 403)
+        """
+        with self._lock:
+            self._faults.append(_Fault(prefix, status, times, retry_after, skip))
+
+    def _take_fault(self, path: str) -> Optional[_Fault]:
+        with self._lock:
+            for fault in self._faults:
+                if fault.remaining > 0 and path.startswith(fault.prefix):
+                    if fault.skip > 0:
+                        fault.skip -= 1
+                        continue
+                    fault.remaining -= 1
+                    return fault
+        return None
+
+    def _count(self, name: str, size: int) -> None:
+        with self._lock:
+            self.hits[name] += 1
+            self.bytes_sent += size
+
+    # Ответы API
+
+    def _playlists(self, query: Dict[str, str]) -> Dict:
+        items = []
+        for playlist_id in query.get("id", "").split(","):
+            if playlist_id in self.playlists:
+                title, video_ids = self.playlists[playlist_id]
+                first = min((self.videos[v].published for v in video_ids),
+                            default="2020-01-01T00:00:00Z")
+                items.append({"snippet": {"title": title, "publishedAt": first,
+                                          "channelId": "UC" + playlist_id[2:24]}})
+        return {"items": items}
+
+    def _playlist_items(self, query: Dict[str, str]) -> Dict:
+        _, video_ids = self.playlists.get(query.get("playlistId", ""), ("", []))
+        size = min(int(query.get("maxResults", 5)), self.page_size)
+        start = int(query.get("pageToken", "p0")[1:])
+
+        items = []
+        for video_id in video_ids[start:start + size]:
+            video = self.videos[video_id]
+            title = {"private": "Private video", "deleted": "Deleted video"}.get(
+                video.privacy, video.title)
+            items.append({"snippet": {"title": title, "publishedAt": video.published,
+                                      "resourceId": {"videoId": video_id}}})
+
+        data: Dict = {"items": items}
+        if start + size < len(video_ids):
+            data["nextPageToken"] = f"p{start + size}"
+        return data
+
+    def _videos(self, query: Dict[str, str]) -> Dict:
+        parts = query.get("part", "snippet").split(",")
+        items = []
+        for video_id in query.get("id", "").split(","):
+            video = self.videos.get(video_id)
+            # Удаленные и приватные видео API не возвращает
+            if video is None or video.privacy != "public":
+                continue
+            item: Dict = {"id": video_id}
+            if "snippet" in parts:
+                item["snippet"] = {"title": video.title, "publishedAt": video.published}
+            if "contentDetails" in parts:
+                item["contentDetails"] = {"duration": video.duration}
+                if video.blocked:
+                    item["contentDetails"]["regionRestriction"] = {"blocked": video.blocked}
+            if "status" in parts:
+                item["status"] = {"uploadStatus": video.upload_status,
+                                  "privacyStatus": video.privacy}
+            items.append(item)
+        return {"items": items}
+
+    def _channel_item(self, handle: str) -> Dict:
+        channel_id, title = self.channels[handle]
+        return {
+            "id": channel_id,
+            "snippet": {"title": title, "publishedAt": "2015-01-01T00:00:00Z"},
+            "contentDetails": {"relatedPlaylists": {"uploads": "UU" + channel_id[2:]}}
+        }
+
+    def _channels(self, query: Dict[str, str]) -> Dict:
+        handle = query.get("forHandle", "").lstrip("@").lower()
+        if handle in self.channels:
+            return {"items": [self._channel_item(handle)]}
+        return {"items": [self._channel_item(h) for h, (channel_id, _) in
+                          self.channels.items() if channel_id == query.get("id")]}
+
+    def _search(self, query: Dict[str, str]) -> Dict:
+        text = query.get("q", "").lstrip("@").lower()
+        items = []
+        for handle, (channel_id, title) in self.channels.items():
+            if text and (text in handle or text in title.lower()):
+                items.append({
+                    "id": {"kind": "youtube#channel", "channelId": channel_id},
+                    "snippet": {"title": title, "channelId": channel_id,
+                                "publishedAt": "2015-01-01T00:00:00Z"}
+                })
+        return {"items": items}
+
+    def api_response(self, endpoint: str, query: Dict[str, str]) -> Optional[Dict]:
+        handlers = {
+            "playlists": self._playlists,
+            "playlistItems": self._playlist_items,
+            "videos": self._videos,
+            "channels": self._channels,
+            "search": self._search
+        }
+        handler = handlers.get(endpoint)
+        return handler(query) if handler else None
+
+    # Страница видео для экстрактора yt-dlp
+
+    def watch_page(self, video_id: str) -> bytes:
+        video = self.videos.get(video_id)
+        title = html.escape(video.title if video else video_id)
+        return (
+            f'<html><head><title>{title}</title>'
+            f'<meta property="og:title" content="{title}">'
+            f'<meta property="og:image" content="{self.base_url}/thumb/{video_id}.jpg">'
+            f'</head><body><div id="player"></div><script>'
+            f'jwplayer("player").setup({{"file": "{self.base_url}/manifest/{video_id}.mpd"}});'
+            f'</script></body></html>'
+        ).encode()
+
+    def manifest(self, video_id: str) -> bytes:
+        return (
+            f'<?xml version="1.0"?>'
+            f'<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" '
+            f'mediaPresentationDuration="PT{self.audio_seconds}S" '
+            f'profiles="urn:mpeg:dash:profile:isoff-on-demand:2011"><Period>'
+            f'<AdaptationSet mimeType="audio/webm">'
+            f'<Representation id="251" codecs="opus" audioSamplingRate="48000" '
+            f'bandwidth="160000"><BaseURL>{self.base_url}/media/{video_id}.webm</BaseURL>'
+            f'</Representation></AdaptationSet></Period></MPD>'
+        ).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def fake(self) -> FakeYoutube:
+        return self.server.fake  # type: ignore[attr-defined]
+
+    def log_message(self, *args):
+        pass
+
+    def _send(
+            self,
+            status: int,
+            body: bytes = b"",
+            content_type: str = "application/json",
+            headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_media(self, name: str, body: bytes, content_type: str) -> None:
+        """Отдает файл с поддержкой Range и ограничением скорости."""
+        start, end = 0, len(body) - 1
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        status = 200
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or end), end)
+            status = 206
+        self.fake._count(name, end - start + 1)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+
+        chunk_size = 64 * 1024
+        for offset in range(start, end + 1, chunk_size):
+            chunk = body[offset:min(offset + chunk_size, end + 1)]
+            self.wfile.write(chunk)
+            if self.fake.throughput:
+                time.sleep(len(chunk) / self.fake.throughput)
+
+    def do_GET(self):
+        fake = self.fake
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if fake.latency:
+            time.sleep(fake.latency)
+
+        fault = fake._take_fault(url.path)
+        if fault is not None:
+            fake._count("fault", 0)
+            headers = {}
+            if fault.retry_after is not None:
+                headers["Retry-After"] = str(fault.retry_after)
+            body = json.dumps({"error": {"code": fault.status}}).encode()
+            self._send(fault.status, body, headers=headers)
+            return
+
+        if url.path.startswith(fake.api_path + "/"):
+            endpoint = url.path[len(fake.api_path) + 1:]
+            data = fake.api_response(endpoint, query)
+            if data is None:
+                self._send(404, b"{}")
+                return
+            body = json.dumps(data).encode()
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            fake._count(endpoint, len(body))
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, headers={"ETag": etag})
+            else:
+                self._send(200, body, headers={"ETag": etag})
+            return
+
+        video_id = os.path.splitext(os.path.basename(url.path))[0]
+        if url.path == "/watch":
+            fake._count("watch", 0)
+            self._send(200, fake.watch_page(query.get("v", "")), "text/html")
+        elif url.path.startswith("/manifest/"):
+            fake._count("manifest", 0)
+            self._send(200, fake.manifest(video_id), "application/dash+xml")
+        elif url.path.startswith("/media/"):
+            self._send_media("media", fake.audio, "audio/webm")
+        elif url.path.startswith("/thumb/"):
+            self._send_media("thumb", fake.thumbnail, "image/jpeg")
+        else:
+            self._send(404)
+
+    do_HEAD = do_GET
+
+
+@contextmanager
+def offline_environment(
+        fake: FakeYoutube,
+        work_dir: str,
+        pacing: bool = False,
+        **settings: str
+) -> Iterator[Config]:
+    """
+    Настройки приложения для работы с FakeYoutube: ENDPOINT и ссылки на видео
+    указывают на локальный сервер, загрузки и состояние - в work_dir. Общие
+    объекты (настройки, пул прокси, журнал квоты) создаются заново и
+    сбрасываются на выходе.
+
+    :param pacing: (bool) Если False, паузы регулятора темпа между загрузками
+        отключены.
+    :param settings: Переменные окружения, как в .env, например
+        DOWNLOAD_WORKERS="4".
+    """
+    values = {
+        "API_KEY_YOUTUBE": "offline",
+        "ENDPOINT": fake.endpoint,
+        "DOWNLOAD_DIRECTORY": os.path.join(work_dir, "downloads"),
+        "STATE_DIRECTORY": os.path.join(work_dir, "state"),
+        **settings
+    }
+    saved = ConfigManager._instance
+    with patch.dict(os.environ, values):
+        ConfigManager._instance = None
+        # Остальные настройки - значения по умолчанию из .env.example
+        config = ConfigManager.load_config(_ENV_EXAMPLE)
+    src.quota._ledger = None
+    src.proxy_pool._pool = None
+
+    patches = [patch("src.api_query.VIDEO_URL", fake.video_url)]
+    if not pacing:
+        patches.append(patch.object(PacingController, "next_delay", return_value=0.0))
+    for patcher in patches:
+        patcher.start()
+    try:
+        yield config
+    finally:
+        for patcher in patches:
+            patcher.stop()
+        ConfigManager._instance = saved
+        src.quota._ledger = None
+        src.proxy_pool._pool = None
@@ -0,0 +1,85 @@
+import os
+import stat
+import logging
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.converter.audio_converter import AudioConverter
+from src.converter.webm_remuxer import WebmError, WebmOpusRemuxer
+
+logger = logging.getLogger('yt-dlp')
+logger.disabled = True
+
+# ffmpeg, который успевает записать часть файла и зависает
+HANGING_FFMPEG = """#!/bin/sh
+for out; do :; done
+printf 'partial' > "$out"
+exec sleep 30
+"""
+
+
+class TestAudioConverter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        bin_dir = os.path.join(self.tmp_dir.name, "bin")
+        os.makedirs(bin_dir)
+        ffmpeg = os.path.join(bin_dir, "ffmpeg")
+        with open(ffmpeg, "w") as f:
+            f.write(HANGING_FFMPEG)
+        os.chmod(ffmpeg, os.stat(ffmpeg).st_mode | stat.S_IEXEC)
+
+        config = SimpleNamespace(
+            download=SimpleNamespace(audio_ext=""),
+            performance=SimpleNamespace(native_remux=False, ffmpeg_timeout=0,
+                                        ffmpeg_stall_timeout=1)
+        )
+        self.patchers = [
+            patch('src.converter.audio_converter.get_config', return_value=config),
+            patch.dict(os.environ, {"PATH": bin_dir + os.pathsep + os.environ["PATH"]})
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+        download_dir = self.tmp_dir.name
+        os.makedirs(os.path.join(download_dir, "tmp"))
+        self.audio_path = os.path.join(download_dir, "tmp", "track.m4a")
+        with open(self.audio_path, "wb") as f:
+            f.write(b"source")
+        self.output_path = os.path.join(download_dir, "track.m4a")
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def test_killed_ffmpeg_leaves_no_output(self):
+        converter = AudioConverter()
+        with self.assertRaises(RuntimeError):
+            converter.convert_audio(self.audio_path)
+
+        # Ни выходного, ни временного файла: постобработка не примет обрывок
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["bin", "tmp"])
+        self.assertTrue(os.path.exists(self.audio_path))
+
+    def test_failed_remux_leaves_no_output(self):
+        webm_path = os.path.join(self.tmp_dir.name, "tmp", "track.webm")
+        with open(webm_path, "wb") as f:
+            f.write(b"\x1a\x45\xdf\xa3" + b"\x00" * 64)
+        opus_path = os.path.join(self.tmp_dir.name, "track.opus")
+
+        def remux(remuxer):
+            # Пока перепаковка идет, под именем трека файла еще нет
+            self.assertFalse(os.path.exists(opus_path))
+            remuxer._writer._output.write(b"OggS partial")
+            raise WebmError("Truncated cluster")
+
+        with patch.object(WebmOpusRemuxer, "remux", remux):
+            self.assertFalse(AudioConverter()._remux_native(webm_path, opus_path))
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["bin", "tmp"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import logging
+import tempfile
+import unittest
+
+from src.converter.bitrate_probe import BitrateProbe, probe_webm
+from test.test_webm_remuxer import make_webm
+
+logger = logging.getLogger('yt-dlp')
+logger.disabled = True
+
+
+class TestBitrateProbe(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.webm_path = os.path.join(self.tmp_dir.name, "track.webm")
+        # 500 пакетов по 20 мс и 400 байт = 10 секунд, 160 кбит/с
+        packets = [bytes((31 << 3,)) + os.urandom(399) for _ in range(500)]
+        with open(self.webm_path, "wb") as f:
+            f.write(make_webm(packets))
+        self.probe = BitrateProbe()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_probe_webm_ignores_container_overhead(self):
+        seconds, payload_size = probe_webm(self.webm_path)
+        self.assertAlmostEqual(seconds, 10.0)
+        # Служебные байты BlockGroup последнего пакета - единицы байт
+        self.assertLess(abs(payload_size - 500 * 400), 32)
+        self.assertLess(payload_size, os.path.getsize(self.webm_path))
+
+    def test_probe_from_headers(self):
+        self.assertEqual(self.probe.probe(self.webm_path), 161)
+
+    def test_known_bitrate_skips_file(self):
+        self.assertEqual(self.probe.probe("missing.webm", 129.476), 130)
+
+    def test_not_audio_raises_value_error(self):
+        path = os.path.join(self.tmp_dir.name, "track.m4a")
+        with open(path, "wb") as f:
+            f.write(b"not an audio file")
+        with self.assertRaises(ValueError):
+            self.probe.probe(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+from io import BytesIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from PIL import Image
+
+from src.converter.cover_cache import CoverCache
+from src.converter.image_embedder import ImageEmbedder
+
+
+class TestCoverCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = SimpleNamespace(
+            download=SimpleNamespace(thumbnail_resize=True, thumbnail_max_width=320),
+            extended=SimpleNamespace(state_directory=self.tmp_dir.name),
+            performance=SimpleNamespace(cover_cache_size_mb=1)
+        )
+        self.patchers = [
+            patch('src.storage.get_config', return_value=self.config),
+            patch('src.converter.cover_cache.get_config', return_value=self.config),
+            patch('src.converter.image_embedder.get_config', return_value=self.config)
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+        self.cache = CoverCache()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def test_hit_and_miss_statistics(self):
+        key = CoverCache.make_key(b"source", "WEBP:320")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, b"processed", 0.5)
+        self.assertEqual(self.cache.get(key), b"processed")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertAlmostEqual(self.cache.saved_time, 0.5)
+        self.assertAlmostEqual(self.cache.hit_rate, 0.5)
+
+    def test_key_depends_on_variant(self):
+        self.assertNotEqual(CoverCache.make_key(b"source", "WEBP:320"),
+                            CoverCache.make_key(b"source", "JPEG:320"))
+
+    def test_evicts_least_recently_used(self):
+        data = b"x" * (400 * 1024)
+        self.cache.put("old", data, 0.1)
+        self.cache.put("recent", data, 0.1)
+        self.cache.get("old")  # "old" становится недавно использованным
+        self.cache.put("new", data, 0.1)
+        self.assertIsNotNone(self.cache.get("old"))
+        self.assertIsNone(self.cache.get("recent"))
+        self.assertIsNotNone(self.cache.get("new"))
+
+    def test_embedder_reuses_processed_jpeg(self):
+        source = BytesIO()
+        Image.new("RGB", (1280, 720), (200, 10, 10)).save(source, format="JPEG")
+        embedder = ImageEmbedder()
+
+        first = embedder.get_jpeg_cover(BytesIO(source.getvalue()))
+        second = embedder.get_jpeg_cover(BytesIO(source.getvalue()))
+
+        self.assertEqual(first, second)
+        self.assertEqual(embedder._cover_cache.hits, 1)
+        with Image.open(BytesIO(first)) as img:
+            self.assertEqual(img.size, (320, 180))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.handle_cache import HandleCache
+
+
+class TestHandleCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        config = SimpleNamespace(extended=SimpleNamespace(state_directory=self.tmp_dir.name))
+        self.patcher = patch('src.storage.get_config', return_value=config)
+        self.patcher.start()
+        self.cache = HandleCache()
+        self.info = {
+            'title': '808 Nation',
+            'publishedAt': '2015-01-01T00:00:00Z',
+            'channelId': 'UCabcdefghijklmnopqrstuv',
+            'uploads': 'UUabcdefghijklmnopqrstuv'
+        }
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def test_handle_is_case_insensitive(self):
+        self.assertIsNone(self.cache.get('@808nation'))
+        self.cache.put('@808Nation', self.info)
+        self.assertEqual(self.cache.get('@808nation'), self.info)
+        self.assertEqual(self.cache.get('808NATION'), self.info)
+
+    def test_invalidate(self):
+        self.cache.put('@808nation', self.info)
+        self.cache.invalidate('@808nation')
+        self.assertIsNone(self.cache.get('@808nation'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import time
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.info_cache import InfoCache
+
+
+class TestInfoCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = SimpleNamespace(
+            extended=SimpleNamespace(state_directory=self.tmp_dir.name),
+            performance=SimpleNamespace(info_cache_ttl=3600, info_cache_size_mb=1)
+        )
+        self.patchers = [patch('src.storage.get_config', return_value=self.config),
+                         patch('src.info_cache.get_config', return_value=self.config)]
+        for patcher in self.patchers:
+            patcher.start()
+        self.cache = InfoCache()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def _info(expire: float, title: str = "title"):
+        return {
+            'id': 'YYwmlS8wkW0',
+            'title': title,
+            'duration': 200,
+            'automatic_captions': {'en': [{'url': 'x'}]},
+            'formats': [{'format_id': '251',
+                         'url': f"https://rr.googlevideo.com/videoplayback?expire={int(expire)}"}],
+        }
+
+    def test_roundtrip_trims_heavy_keys(self):
+        self.cache.put('YYwmlS8wkW0', self._info(time.time() + 6 * 3600))
+        info = self.cache.get('YYwmlS8wkW0')
+        assert info is not None
+        self.assertEqual(info['title'], 'title')
+        self.assertNotIn('automatic_captions', info)
+
+    def test_respects_format_url_expiry(self):
+        # Ссылки истекают раньше, чем запас до истечения
+        self.cache.put('YYwmlS8wkW0', self._info(time.time() + 60))
+        self.assertIsNone(self.cache.get('YYwmlS8wkW0'))
+
+    def test_other_proxy_misses(self):
+        self.cache.put('YYwmlS8wkW0', self._info(time.time() + 6 * 3600), proxy="http://a:1")
+        self.assertIsNone(self.cache.get('YYwmlS8wkW0'))
+        self.assertIsNotNone(self.cache.get('YYwmlS8wkW0', proxy="http://a:1"))
+
+    def test_invalidate(self):
+        self.cache.put('YYwmlS8wkW0', self._info(time.time() + 6 * 3600))
+        self.cache.invalidate('YYwmlS8wkW0')
+        self.assertIsNone(self.cache.get('YYwmlS8wkW0'))
+
+    def test_lru_eviction(self):
+        expire = time.time() + 6 * 3600
+        big_title = "x" * 400 * 1024
+        self.cache.put('a', self._info(expire, big_title))
+        self.cache.put('b', self._info(expire, big_title))
+        self.cache.get('a')  # 'a' теперь использовался позже, чем 'b'
+        self.cache.put('c', self._info(expire, big_title))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('c'))
+
+    def test_disabled(self):
+        self.config.performance.info_cache_ttl = 0
+        cache = InfoCache()
+        cache.put('YYwmlS8wkW0', self._info(time.time() + 6 * 3600))
+        self.assertIsNone(cache.get('YYwmlS8wkW0'))
+
+
+if __name__ == '__main__':
+    unittest.main()
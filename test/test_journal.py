@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.entities import DownloadCallback, JobState, Metadata
+from src.journal import Journal
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        config = SimpleNamespace(extended=SimpleNamespace(state_directory=self.tmp_dir.name))
+        self.patcher = patch('src.storage.get_config', return_value=config)
+        self.patcher.start()
+        self.journal = Journal()
+        self.url = "https://www.youtube.com/watch?v=YYwmlS8wkW0"
+        self.audio_path = os.path.join(self.tmp_dir.name, "tmp", "track.webm")
+        os.makedirs(os.path.dirname(self.audio_path))
+        with open(self.audio_path, "wb") as f:
+            f.write(b"data")
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def _downloaded(self):
+        self.journal.enqueue([self.url], self.tmp_dir.name)
+        self.journal.mark_downloading(self.url, self.tmp_dir.name)
+        self.journal.mark_downloaded(DownloadCallback(
+            audio_path=self.audio_path,
+            thumbnail_path="",
+            metadata=Metadata(title="t", artist="a", date="20240101", comment=""),
+            bitrate_check=True,
+            url=self.url,
+            save_path=self.tmp_dir.name
+        ))
+
+    def test_queued_is_not_resumable(self):
+        self.journal.enqueue([self.url], self.tmp_dir.name)
+        self.assertEqual(self.journal.get_state(self.url, self.tmp_dir.name), JobState.QUEUED)
+        self.assertIsNone(self.journal.restore_callback(self.url, self.tmp_dir.name))
+        self.assertEqual(self.journal.unfinished_count(self.tmp_dir.name), 0)
+
+    def test_restore_downloaded(self):
+        self._downloaded()
+        callback = self.journal.restore_callback(self.url, self.tmp_dir.name)
+        assert callback is not None
+        self.assertEqual(callback.audio_path, self.audio_path)
+        self.assertEqual(callback.converted_path, "")
+        self.assertEqual(callback.save_path, self.tmp_dir.name)
+        self.assertEqual(callback.metadata.title, "t")
+        self.assertEqual(self.journal.resumable_urls(self.tmp_dir.name), [self.url])
+        self.assertEqual(self.journal.unfinished_count(self.tmp_dir.name), 1)
+
+    def test_restore_converted_skips_conversion(self):
+        self._downloaded()
+        converted = os.path.join(self.tmp_dir.name, "track.opus")
+        with open(converted, "wb") as f:
+            f.write(b"data")
+        self.journal.mark_converted(self.url, self.tmp_dir.name, converted)
+        callback = self.journal.restore_callback(self.url, self.tmp_dir.name)
+        assert callback is not None
+        self.assertEqual(callback.converted_path, converted)
+
+    def test_missing_file_is_not_resumable(self):
+        self._downloaded()
+        os.remove(self.audio_path)
+        self.assertIsNone(self.journal.restore_callback(self.url, self.tmp_dir.name))
+
+    def test_tagged_is_finished(self):
+        self._downloaded()
+        self.journal.mark(self.url, self.tmp_dir.name, JobState.TAGGED)
+        self.assertIsNone(self.journal.restore_callback(self.url, self.tmp_dir.name))
+        self.assertEqual(self.journal.unfinished_count(self.tmp_dir.name), 0)
+
+    def test_same_url_in_two_directories(self):
+        self._downloaded()
+        self.journal.mark(self.url, self.tmp_dir.name, JobState.TAGGED)
+        other = os.path.join(self.tmp_dir.name, "Other playlist")
+        self.journal.enqueue([self.url], other)
+
+        self.assertEqual(self.journal.get_state(self.url, other), JobState.QUEUED)
+        self.assertEqual(self.journal.get_state(self.url, self.tmp_dir.name), JobState.TAGGED)
+        # Последним обновлялось задание во втором каталоге, оно еще не выполнено
+        self.assertFalse(self.journal.all_finished([self.url]))
+        self.journal.mark(self.url, other, JobState.SKIPPED)
+        self.assertTrue(self.journal.all_finished([self.url]))
+
+    def test_failed_too_many_times_does_not_keep_tmp(self):
+        self.journal.enqueue([self.url], self.tmp_dir.name)
+        for attempt in range(Journal.max_attempts):
+            self.journal.mark_downloading(self.url, self.tmp_dir.name)
+            self.journal.mark(self.url, self.tmp_dir.name, JobState.FAILED, "HTTP Error 403")
+            expected = 1 if attempt < Journal.max_attempts - 1 else 0
+            self.assertEqual(self.journal.unfinished_count(self.tmp_dir.name), expected)
+
+    def test_migrates_url_keyed_journal(self):
+        db = sqlite3.connect(os.path.join(self.tmp_dir.name, "journal.sqlite3"))
+        with db:
+            db.execute("CREATE TABLE jobs (url TEXT PRIMARY KEY, save_path TEXT NOT NULL, "
+                       "state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                       "last_error TEXT NOT NULL DEFAULT '', "
+                       "audio_path TEXT NOT NULL DEFAULT '', "
+                       "thumbnail_path TEXT NOT NULL DEFAULT '', "
+                       "converted_path TEXT NOT NULL DEFAULT '', "
+                       "metadata TEXT NOT NULL DEFAULT '', "
+                       "bitrate_check INTEGER NOT NULL DEFAULT 1, updated_at REAL NOT NULL)")
+            db.execute("INSERT INTO jobs (url, save_path, state, updated_at) "
+                       "VALUES (?, ?, ?, 0)", (self.url, self.tmp_dir.name, JobState.TAGGED))
+        db.close()
+
+        self.journal.enqueue([self.url], os.path.join(self.tmp_dir.name, "Other playlist"))
+        self.assertEqual(self.journal.get_state(self.url, self.tmp_dir.name), JobState.TAGGED)
+        self.assertEqual(self.journal.get_state(
+            self.url, os.path.join(self.tmp_dir.name, "Other playlist")), JobState.QUEUED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import logging
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.config.app_config import ConfigManager
+from src.migrate import LibraryMigrator
+
+logger = logging.getLogger()
+logger.disabled = True
+
+ENV_EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env.example")
+
+
+class TestLibraryMigrator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        config = SimpleNamespace(download=SimpleNamespace(audio_ext="mp3"))
+        self.patcher = patch('src.migrate.get_config', return_value=config)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def _touch(self, *names: str) -> None:
+        for name in names:
+            with open(os.path.join(self.tmp_dir.name, name), "wb") as f:
+                f.write(b"data")
+
+    def test_same_stem_sources_are_skipped(self):
+        self._touch("a.opus", "a.m4a", "b.opus", "c.opus", "c.mp3")
+        tasks, skipped = LibraryMigrator()._find_files(self.tmp_dir.name)
+
+        # a.opus и a.m4a дали бы один a.mp3, c.mp3 уже есть
+        self.assertEqual(tasks, [(os.path.join(self.tmp_dir.name, "b.opus"),
+                                  os.path.join(self.tmp_dir.name, "b.mp3"))])
+        self.assertEqual(skipped, 1)
+
+    def test_worker_failure_keeps_source(self):
+        self._touch("broken.opus")
+        # Процессы пула запускаются через spawn и получают настройки родителя
+        env = {"API_KEY_YOUTUBE": "offline", "AUDIO_EXT": "mp3",
+               "STATE_DIRECTORY": os.path.join(self.tmp_dir.name, ".state")}
+        saved = ConfigManager._instance
+        with patch.dict(os.environ, env):
+            ConfigManager._instance = None
+            config = ConfigManager.load_config(ENV_EXAMPLE)
+        try:
+            with patch('src.migrate.get_config', return_value=config):
+                migrator = LibraryMigrator()
+                with patch.object(migrator._logger, "error") as log_error:
+                    migrator.migrate(self.tmp_dir.name)
+        finally:
+            ConfigManager._instance = saved
+
+        self.assertIn("Failed to migrate", str(log_error.call_args))
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["broken.opus"])
+
+
+if __name__ == '__main__':
+    unittest.main()
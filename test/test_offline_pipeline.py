@@ -0,0 +1,190 @@
+import os
+import time
+import logging
+import threading
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from mutagen.oggopus import OggOpus
+
+from src import scripts
+from src.api_query import ApiQuery
+from src.converter.converter import Converter
+from src.downloader import Downloader, _Progress, _TaskQueue
+from src.proxy_pool import get_proxy_pool
+from src.quota import get_quota_ledger
+from src.sync_state import SyncState
+from test.fake_youtube import FakeYoutube, make_videos, offline_environment
+
+logger = logging.getLogger()
+logger.disabled = True
+logging.getLogger('yt-dlp').disabled = True
+
+
+class TestOfflinePipeline(unittest.TestCase):
+    """Полный конвейер ApiQuery -> Filter -> Downloader -> Converter без сети."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fake = FakeYoutube(audio_seconds=2).start()
+
+    def tearDown(self):
+        self.fake.stop()
+        self.tmp_dir.cleanup()
+
+    def _downloaded(self, folder: str):
+        path = os.path.join(self.tmp_dir.name, "downloads", folder)
+        return sorted(name for name in os.listdir(path) if name.endswith(".opus")), path
+
+    def test_playlist(self):
+        videos = make_videos(5)
+        videos[1].privacy = "private"
+        videos[3].privacy = "deleted"
+        playlist_id = self.fake.add_playlist("Offline mix", videos)
+        # Первая страница API и первый файл упираются в лимиты YouTube
+        self.fake.fail("/youtube/v3/playlistItems", 429, retry_after=0)
+        self.fake.fail("/media/", 403)
+
+        with offline_environment(self.fake, self.tmp_dir.name):
+            scripts.download_audio(f"https://www.youtube.com/playlist?list={playlist_id}")
+            # Повтор после 429 тоже расходует квоту
+            api_calls = sum(count for name, count in self.fake.hits.items()
+                            if name not in ("watch", "manifest", "media", "thumb", "fault"))
+            self.assertEqual(get_quota_ledger().run_used, api_calls + 1)
+
+        names, path = self._downloaded("Offline mix")
+        self.assertEqual(names, ["Track 001.opus", "Track 003.opus", "Track 005.opus"])
+        self.assertFalse(os.path.exists(os.path.join(path, "tmp")))
+
+        audio = OggOpus(os.path.join(path, names[0]))
+        self.assertEqual(audio["title"], ["Track 001"])
+        self.assertIn("metadata_block_picture", audio)
+        self.assertAlmostEqual(audio.info.length, 2, delta=0.1)
+
+        # Ответы с ошибкой не считаются запросами к эндпоинтам
+        self.assertEqual(self.fake.hits["fault"], 2)
+        self.assertEqual(self.fake.hits["media"], 3)
+
+    def test_post_processing_in_process_pool(self):
+        playlist_id = self.fake.add_playlist("Offline mix", make_videos(3))
+
+        # Процессы пула запускаются через spawn и читают настройки заново
+        with offline_environment(self.fake, self.tmp_dir.name, CONVERT_WORKERS="2",
+                                 DOWNLOAD_WORKERS="2"):
+            scripts.download_audio(f"https://www.youtube.com/playlist?list={playlist_id}")
+
+        names, path = self._downloaded("Offline mix")
+        self.assertEqual(names, ["Track 001.opus", "Track 002.opus", "Track 003.opus"])
+        self.assertEqual(OggOpus(os.path.join(path, names[2]))["title"], ["Track 003"])
+        self.assertFalse(os.path.exists(os.path.join(path, "tmp")))
+
+    def test_channel_stops_paging_at_filter_date(self):
+        # По одному видео в месяц: 2024 год занимает первую страницу из трех
+        videos = make_videos(120, newest=datetime(2024, 3, 15, tzinfo=timezone.utc),
+                             interval=timedelta(days=30))
+        uploads = self.fake.add_channel("@offline", "Offline channel", videos)
+
+        with offline_environment(self.fake, self.tmp_dir.name, FILTER_DATE="[x] >= 2024"):
+            scripts.download_audio("https://www.youtube.com/@offline")
+            # Старые видео не прочитаны, при другом фильтре они понадобятся
+            self.assertIsNone(SyncState().get_mark(uploads))
+
+        names, _ = self._downloaded("Offline channel")
+        self.assertEqual(names, ["Track 001.opus", "Track 002.opus", "Track 003.opus"])
+        self.assertEqual(self.fake.hits["playlistItems"], 1)
+
+    def test_failed_page_keeps_sync_mark(self):
+        self.fake.page_size = 2
+        uploads = self.fake.add_channel("@offline", "Offline channel", make_videos(5))
+        # Вторая страница не приходит даже после повторов транспорта
+        self.fake.fail("/youtube/v3/playlistItems", 400, skip=1)
+
+        with offline_environment(self.fake, self.tmp_dir.name):
+            scripts.download_audio("https://www.youtube.com/@offline")
+            names, _ = self._downloaded("Offline channel")
+            self.assertEqual(names, ["Track 001.opus", "Track 002.opus"])
+            self.assertIsNone(SyncState().get_mark(uploads))
+
+            scripts.download_audio("https://www.youtube.com/@offline")
+            self.assertEqual(len(self._downloaded("Offline channel")[0]), 5)
+            self.assertEqual(SyncState().get_mark(uploads)[1], "2024-06-01T00:00:00Z")
+
+    def test_quota_budget_stops_paging(self):
+        self.fake.page_size = 2
+        self.fake.add_channel("@offline", "Offline channel", make_videos(5))
+
+        # channels + первая страница + проверка ее видео
+        with offline_environment(self.fake, self.tmp_dir.name, QUOTA_BUDGET="3"), \
+                patch.object(scripts.logger, "error") as log_error:
+            scripts.download_audio("https://www.youtube.com/@offline")
+
+        self.assertEqual(len(self._downloaded("Offline channel")[0]), 2)
+        self.assertIn("Run budget of 3 quota units is spent", str(log_error.call_args))
+
+    def test_batch_with_failing_resolver(self):
+        self.fake.page_size = 2
+        good = self.fake.add_playlist("Good mix", make_videos(5))
+        bad = self.fake.add_playlist("Bad mix", make_videos(3, prefix="Other"))
+        get_playlist_info = ApiQuery.get_playlist_info
+
+        def failing_info(query, playlist_id):
+            if playlist_id == bad:
+                raise RuntimeError("resolver crashed")
+            return get_playlist_info(query, playlist_id)
+
+        links = [f"https://www.youtube.com/playlist?list={playlist_id}"
+                 for playlist_id in (bad, good)]
+        with offline_environment(self.fake, self.tmp_dir.name, RESOLVE_WORKERS="2"), \
+                patch.object(ApiQuery, "get_playlist_info", failing_info), \
+                patch.object(scripts.logger, "error") as log_error:
+            scripts.download_batch(links)
+
+        # Второй источник скачан целиком, все три страницы прошли через
+        # ограниченную очередь, а ошибка первого выведена в лог
+        self.assertEqual(len(self._downloaded("Good mix")[0]), 5)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, "downloads",
+                                                     "Bad mix")))
+        self.assertIn(f"Failed to resolve {links[0]}: resolver crashed",
+                      str(log_error.call_args_list))
+
+    def test_cached_handle_is_checked(self):
+        self.fake.add_channel("@offline", "Offline channel", make_videos(3))
+
+        with offline_environment(self.fake, self.tmp_dir.name):
+            scripts.download_audio("https://www.youtube.com/@offline")
+            # Хэндл из кэша: проверочная страница и есть первая страница загрузки
+            scripts.download_audio("https://www.youtube.com/@offline")
+            self.assertEqual(self.fake.hits["channels"], 1)
+            self.assertEqual(self.fake.hits["playlistItems"], 2)
+
+            # Плейлист загрузок пропал: хэндл ищется заново
+            self.fake.fail("/youtube/v3/playlistItems", 404)
+            scripts.download_audio("https://www.youtube.com/@offline")
+            self.assertEqual(self.fake.hits["channels"], 2)
+            self.assertEqual(self.fake.hits["playlistItems"], 3)
+
+        self.assertEqual(len(self._downloaded("Offline channel")[0]), 3)
+
+    def test_waiting_worker_does_not_hold_proxy(self):
+        with offline_environment(self.fake, self.tmp_dir.name):
+            downloader = Downloader(Converter())
+            pool = get_proxy_pool()
+            stop = threading.Event()
+            # Очередь открыта и пуста: поток ждет следующую страницу плейлиста
+            thread = threading.Thread(
+                target=downloader._process_queue,
+                args=(downloader._create_worker(0), _TaskQueue(closed=False),
+                      self.tmp_dir.name, _Progress(total=0, counter=0), stop))
+            thread.start()
+            try:
+                time.sleep(0.2)
+                self.assertEqual(pool._proxies[""].in_use, 0)
+            finally:
+                stop.set()
+                thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import logging
+
+from src.pacing import PacingController
+
+logger = logging.getLogger()
+logger.disabled = True
+
+
+class TestPacingController(unittest.TestCase):
+
+    def setUp(self):
+        self.pacing = PacingController()
+
+    def test_healthy_ramps_up_additively(self):
+        delay, ratelimit = self.pacing.delay, self.pacing.ratelimit
+        self.pacing.on_success(ratelimit * 10, 10.0, 1.0)
+        self.assertEqual(self.pacing.delay, delay - PacingController.delay_step)
+        self.assertEqual(self.pacing.ratelimit, ratelimit + PacingController.ratelimit_step)
+
+    def test_ramp_up_is_bounded(self):
+        for _ in range(500):
+            self.pacing.on_success(None, None, 1.0)
+        self.assertEqual(self.pacing.delay, PacingController.min_delay)
+        self.assertEqual(self.pacing.ratelimit, PacingController.max_ratelimit)
+
+    def test_rate_limited_backs_off_multiplicatively(self):
+        delay, ratelimit = self.pacing.delay, self.pacing.ratelimit
+        self.pacing.on_error("ERROR: unable to download video data: HTTP Error 429: "
+                             "Too Many Requests")
+        self.assertEqual(self.pacing.delay, delay * 2)
+        self.assertEqual(self.pacing.ratelimit, ratelimit // 2)
+
+    def test_generic_error_backs_off_softer(self):
+        delay = self.pacing.delay
+        self.pacing.on_error("ERROR: Unable to extract uploader id")
+        self.assertEqual(self.pacing.delay, delay * 1.5)
+
+    def test_backoff_is_bounded(self):
+        for _ in range(50):
+            self.pacing.on_error("HTTP Error 403: Forbidden")
+        self.assertEqual(self.pacing.delay, PacingController.max_delay)
+        self.assertEqual(self.pacing.ratelimit, PacingController.min_ratelimit)
+
+    def test_throughput_collapse(self):
+        ratelimit = self.pacing.ratelimit
+        # Скорость в 10 раз ниже лимита
+        self.pacing.on_success(ratelimit * 10, 100.0, 1.0)
+        self.assertLess(self.pacing.ratelimit, ratelimit)
+
+    def test_slow_extraction(self):
+        self.pacing.on_success(None, None, 1.0)
+        delay = self.pacing.delay
+        self.pacing.on_success(None, None, 10.0)
+        self.assertGreater(self.pacing.delay, delay)
+
+    def test_cache_hits_do_not_skew_latency(self):
+        self.pacing.on_success(None, None, 2.0)
+        # Информация из кэша: времени извлечения нет
+        for _ in range(3):
+            self.pacing.on_success(None, None, None)
+        self.pacing.on_shorts(None)
+        delay = self.pacing.delay
+        self.pacing.on_success(None, None, 2.5)
+        self.assertEqual(self.pacing.delay, delay - PacingController.delay_step)
+
+
+if __name__ == '__main__':
+    unittest.main()
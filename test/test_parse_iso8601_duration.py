@@ -0,0 +1,25 @@
+import unittest
+from src.utils import parse_iso8601_duration
+
+
+class TestParseIso8601Duration(unittest.TestCase):
+
+    def test_durations(self):
+        self.assertEqual(parse_iso8601_duration('PT45S'), 45)
+        self.assertEqual(parse_iso8601_duration('PT1M'), 60)
+        self.assertEqual(parse_iso8601_duration('PT1H2M3S'), 3723)
+        self.assertEqual(parse_iso8601_duration('P1DT2H'), 93600)
+        self.assertEqual(parse_iso8601_duration('P1W'), 604800)
+
+    def test_live_stream(self):
+        # У трансляций API возвращает нулевую длительность
+        self.assertEqual(parse_iso8601_duration('P0D'), 0)
+
+    def test_invalid(self):
+        for value in ('', 'P', 'PT', 'P1DT', '45S', 'abc'):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_iso8601_duration(value))
+
+
+if __name__ == '__main__':
+    unittest.main()
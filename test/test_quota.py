@@ -0,0 +1,63 @@
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.quota import QuotaExceeded, QuotaLedger, quota_day
+
+
+class TestQuotaLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        config = SimpleNamespace(extended=SimpleNamespace(state_directory=self.tmp_dir.name))
+        self.patcher = patch('src.storage.get_config', return_value=config)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def test_day_resets_at_pacific_midnight(self):
+        # Летом в Калифорнии UTC-7: полночь там - это 07:00 UTC
+        before = datetime(2024, 7, 2, 6, 59, tzinfo=timezone.utc).timestamp()
+        after = datetime(2024, 7, 2, 7, 1, tzinfo=timezone.utc).timestamp()
+        self.assertEqual(quota_day(before), "2024-07-01")
+        self.assertEqual(quota_day(after), "2024-07-02")
+
+    def test_run_budget(self):
+        ledger = QuotaLedger(budget=2, job="nightly")
+        for _ in range(2):
+            ledger.reserve("playlistItems")
+            ledger.record("playlistItems", 0.1, 1024, False, 200)
+        with self.assertRaises(QuotaExceeded):
+            ledger.reserve("playlistItems")
+        self.assertEqual(ledger.day_used(), 2)
+
+    def test_daily_limit_counts_all_jobs(self):
+        QuotaLedger.daily_limit = 150
+        try:
+            first = QuotaLedger(job="first")
+            first.reserve("search")
+            first.record("search", 0.1, 100, False, 200)
+            second = QuotaLedger(job="second")
+            with self.assertRaises(QuotaExceeded):
+                second.reserve("search")
+            second.reserve("videos")
+        finally:
+            QuotaLedger.daily_limit = 10000
+
+    def test_report_by_job_and_endpoint(self):
+        ledger = QuotaLedger(job="nightly")
+        for cache_hit in (False, True):
+            ledger.reserve("playlistItems")
+            ledger.record("playlistItems", 0.2, 2048, cache_hit, 200)
+        report = ledger.report()
+        self.assertIn("nightly", report)
+        self.assertIn("playlistItems", report)
+        self.assertIn("Total: 2 of", report)
+
+
+if __name__ == '__main__':
+    unittest.main()
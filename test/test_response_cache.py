@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = SimpleNamespace(
+            extended=SimpleNamespace(state_directory=self.tmp_dir.name),
+            performance=SimpleNamespace(api_cache_ttl=3600, api_cache_size_mb=1)
+        )
+        self.patchers = [
+            patch('src.storage.get_config', return_value=self.config),
+            patch('src.response_cache.get_config', return_value=self.config)
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+        self.cache = ResponseCache()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def test_key_ignores_api_key(self):
+        params = {'part': 'snippet', 'playlistId': 'PL1', 'key': 'first'}
+        self.assertEqual(
+            ResponseCache.make_key('/playlistItems', params),
+            ResponseCache.make_key('/playlistItems', {**params, 'key': 'second'}))
+        self.assertNotEqual(
+            ResponseCache.make_key('/playlistItems', params),
+            ResponseCache.make_key('/playlistItems', {**params, 'pageToken': 'CDIQAA'}))
+
+    def test_not_modified_served_from_cache(self):
+        key = ResponseCache.make_key('/playlistItems', {'playlistId': 'PL1'})
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, '"etag1"', {'items': [1, 2, 3]})
+
+        etag, _ = self.cache.get(key)
+        self.assertEqual(etag, '"etag1"')
+        self.assertEqual(self.cache.touch(key), {'items': [1, 2, 3]})
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_expired_entry(self):
+        key = ResponseCache.make_key('/playlistItems', {'playlistId': 'PL1'})
+        self.cache.put(key, '"etag1"', {'items': []})
+        with patch('src.response_cache.time.time', return_value=10 ** 10):
+            self.assertIsNone(self.cache.get(key))
+
+    def test_evicts_least_recently_used(self):
+        self.cache._max_size = 300
+        first = ResponseCache.make_key('/videos', {'id': 'a'})
+        second = ResponseCache.make_key('/videos', {'id': 'b'})
+        self.cache.put(first, '"a"', {'data': 'x' * 200})
+        self.cache.put(second, '"b"', {'data': 'y' * 200})
+        self.assertIsNone(self.cache.get(first))
+        self.assertIsNotNone(self.cache.get(second))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import re
+import logging
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from src.segmented import SegmentedDownloader
+
+logger = logging.getLogger('yt-dlp')
+logger.disabled = True
+
+DATA = os.urandom(1024 * 1024 + 17)
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    # Диапазоны, которые начинаются с этого смещения и дальше, получают 503
+    fail_from = len(DATA)
+    bytes_sent = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        start, end = int(match.group(1)), int(match.group(2))
+        if start >= self.fail_from:
+            self.send_error(503)
+            return
+        body = DATA[start:end + 1]
+        with self.lock:
+            _RangeHandler.bytes_sent += len(body)
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(DATA)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSegmentedDownloader(unittest.TestCase):
+
+    def test_split_ranges_covers_file(self):
+        ranges = SegmentedDownloader.split_ranges(10, 3)
+        self.assertEqual(ranges, [(0, 2), (3, 5), (6, 9)])
+
+    def test_split_ranges_small_file(self):
+        self.assertEqual(SegmentedDownloader.split_ranges(2, 4), [(0, 0), (1, 1)])
+
+    def setUp(self):
+        _RangeHandler.fail_from = len(DATA)
+        _RangeHandler.bytes_sent = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/track.webm"
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "tmp", "track.webm")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def test_download_reassembles_in_order(self):
+        segmented = SegmentedDownloader(4)
+        downloaded, _ = segmented.download(self.url, len(DATA), self.path)
+        segmented.close()
+
+        self.assertEqual(downloaded, len(DATA))
+        self.assertFalse(os.path.exists(self.path + ".part"))
+        self.assertFalse(os.path.exists(self.path + ".segments"))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), DATA)
+
+    def test_failed_download_resumes_missing_segment(self):
+        last_start = SegmentedDownloader.split_ranges(len(DATA), 4)[-1][0]
+        _RangeHandler.fail_from = last_start
+        segmented = SegmentedDownloader(4)
+        with self.assertRaises(Exception):
+            segmented.download(self.url, len(DATA), self.path)
+        # Скачанные сегменты не потеряны
+        self.assertTrue(os.path.exists(self.path + ".part"))
+        self.assertEqual(_RangeHandler.bytes_sent, last_start)
+
+        _RangeHandler.fail_from = len(DATA)
+        downloaded, _ = segmented.download(self.url, len(DATA), self.path)
+        segmented.close()
+
+        self.assertEqual(downloaded, len(DATA) - last_start)
+        self.assertEqual(_RangeHandler.bytes_sent, len(DATA))
+        self.assertFalse(os.path.exists(self.path + ".segments"))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), DATA)
+
+    def test_broken_state_restarts_segments(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path + ".part", "wb") as f:
+            f.write(b"\x00" * len(DATA))
+        # Валидный JSON, но не словарь состояния
+        with open(self.path + ".segments", "w") as f:
+            f.write("[]")
+
+        segmented = SegmentedDownloader(4)
+        downloaded, _ = segmented.download(self.url, len(DATA), self.path)
+        segmented.close()
+
+        self.assertEqual(downloaded, len(DATA))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), DATA)
+
+    def test_positions_are_saved_during_download(self):
+        saved = []
+        save_positions = SegmentedDownloader._save_positions
+
+        def record(state_path, filesize, positions):
+            saved.append(list(positions))
+            save_positions(state_path, filesize, positions)
+
+        segmented = SegmentedDownloader(4)
+        segmented.save_interval = 64 * 1024
+        with patch.object(SegmentedDownloader, "_save_positions", staticmethod(record)):
+            segmented.download(self.url, len(DATA), self.path)
+        segmented.close()
+
+        # Кроме начального состояния, позиции сохранялись по ходу загрузки
+        starts = [start for start, _ in SegmentedDownloader.split_ranges(len(DATA), 4)]
+        self.assertEqual(saved[0], starts)
+        self.assertGreater(len(saved), 4)
+        self.assertTrue(any(position > start for position, start in zip(saved[-1], starts)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.journal import Journal
+from src.entities import JobState
+from src.sync_state import IncrementalSync, SyncState
+
+
+def make_page(*items):
+    return [{'title': video_id, 'url': f"https://www.youtube.com/watch?v={video_id}",
+             'published': published, 'video_id': video_id}
+            for video_id, published in items]
+
+
+class TestIncrementalSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        config = SimpleNamespace(extended=SimpleNamespace(state_directory=self.tmp_dir.name))
+        self.patcher = patch('src.storage.get_config', return_value=config)
+        self.patcher.start()
+        self.state = SyncState()
+        self.journal = Journal()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def run_sync(self, pages, finish: bool = True, complete: bool = True,
+                 date_filter=None) -> IncrementalSync:
+        sync = IncrementalSync("UUchannel", self.state, self.journal, date_filter)
+
+        def api_pages():
+            # Так ApiQuery отмечает ответ без nextPageToken
+            yield from pages
+            sync.paging['complete'] = complete
+
+        tracked = sync.track_snippets(api_pages())
+        filtered = sync.track_urls(([item['url'] for item in page], len(page))
+                                   for page in tracked)
+        for urls, _ in filtered:
+            self.journal.enqueue(urls, "/tmp")
+            if finish:
+                for url in urls:
+                    self.journal.mark(url, "/tmp", JobState.TAGGED)
+        sync.commit()
+        return sync
+
+    def test_mark_moves_after_complete_sync(self):
+        self.run_sync([make_page(("new", "2024-05-02T00:00:00Z"),
+                                 ("old", "2024-05-01T00:00:00Z"))])
+        self.assertEqual(self.state.get_mark("UUchannel"), ("new", "2024-05-02T00:00:00Z"))
+
+    def test_mark_kept_when_downloads_unfinished(self):
+        self.state.set_mark("UUchannel", "old", "2024-05-01T00:00:00Z")
+        sync = self.run_sync([make_page(("new", "2024-05-02T00:00:00Z"))], finish=False)
+        self.assertEqual(sync.stop_at, ("old", "2024-05-01T00:00:00Z"))
+        self.assertEqual(self.state.get_mark("UUchannel"), ("old", "2024-05-01T00:00:00Z"))
+
+
+    def test_mark_kept_when_paging_failed(self):
+        self.run_sync([make_page(("new", "2024-05-02T00:00:00Z"))], complete=False)
+        self.assertIsNone(self.state.get_mark("UUchannel"))
+
+
+    def test_mark_kept_when_date_filter_dropped_videos(self):
+        self.run_sync([make_page(("new", "2024-05-02T00:00:00Z"),
+                                 ("old", "2023-05-01T00:00:00Z"))],
+                      date_filter=lambda published: published >= "2024")
+        self.assertIsNone(self.state.get_mark("UUchannel"))
+
+
+if __name__ == '__main__':
+    unittest.main()
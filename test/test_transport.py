@@ -0,0 +1,96 @@
+import gzip
+import json
+import logging
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.transport import HttpTransport
+
+logger = logging.getLogger()
+logger.disabled = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Сколько первых запросов получат 503
+    failures = 0
+    requests_seen = 0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests_seen += 1
+        if cls.requests_seen <= cls.failures:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = json.dumps({"path": self.path}).encode()
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpTransport(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/items"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _Handler.requests_seen = 0
+        _Handler.failures = 0
+        self.transport = HttpTransport(read_timeout=5, retries=2)
+        self.transport.backoff_base = 0.01
+
+    def tearDown(self):
+        self.transport.close()
+
+    def test_gzip_response(self):
+        response = self.transport.get(self.url, params={"part": "snippet"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.json(), {"path": "/items?part=snippet"})
+
+    def test_retries_transient_status(self):
+        _Handler.failures = 2
+        response = self.transport.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_Handler.requests_seen, 3)
+
+    def test_gives_up_after_retries(self):
+        _Handler.failures = 10
+        response = self.transport.get(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(_Handler.requests_seen, 3)
+
+    def test_attempt_hooks_see_every_retry(self):
+        _Handler.failures = 1
+        attempts = []
+        statuses = []
+        self.transport.get(self.url,
+                           before_attempt=lambda: attempts.append(len(statuses)),
+                           after_attempt=lambda response, _: statuses.append(
+                               response.status_code))
+        self.assertEqual(attempts, [0, 1])
+        self.assertEqual(statuses, [503, 200])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import logging
+
+from src.validator import (
+    validate_api,
+    validate_caches,
+    validate_ffmpeg_timeouts,
+    validate_resolve_workers
+)
+
+logger = logging.getLogger()
+logger.disabled = True
+
+
+class TestValidateRanges(unittest.TestCase):
+
+    def test_ffmpeg_timeouts(self):
+        self.assertTrue(validate_ffmpeg_timeouts(1800, 120))
+        self.assertTrue(validate_ffmpeg_timeouts(0, 0))      # лимиты отключены
+        self.assertFalse(validate_ffmpeg_timeouts(-1, 120))
+        self.assertFalse(validate_ffmpeg_timeouts(1800, -5))
+
+    def test_caches(self):
+        self.assertTrue(validate_caches(API_CACHE_TTL=604800, API_CACHE_SIZE_MB=0))
+        self.assertFalse(validate_caches(INFO_CACHE_TTL=3600, INFO_CACHE_SIZE_MB=-1))
+
+    def test_api(self):
+        self.assertTrue(validate_api(20, 4, 0))
+        self.assertTrue(validate_api(1, 0, 500))
+        self.assertFalse(validate_api(0, 4, 0))
+        self.assertFalse(validate_api(20, -1, 0))
+        self.assertFalse(validate_api(20, 11, 0))
+        self.assertFalse(validate_api(20, 4, -100))
+
+    def test_resolve_workers(self):
+        self.assertTrue(validate_resolve_workers(8))
+        self.assertFalse(validate_resolve_workers(0))
+        self.assertFalse(validate_resolve_workers(33))
+
+
+if __name__ == '__main__':
+    unittest.main()
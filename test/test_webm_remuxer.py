@@ -0,0 +1,116 @@
+import os
+import struct
+import tempfile
+import unittest
+from base64 import b64decode, b64encode
+
+from mutagen.flac import Picture
+from mutagen.ogg import OggPage
+from mutagen.oggopus import OggOpus
+
+from src.converter.webm_remuxer import (
+    WebmError,
+    ogg_crc,
+    opus_packet_samples,
+    remux_webm_to_opus
+)
+
+
+def _size(value: int) -> bytes:
+    # Размер всегда 8 байт: так проще собирать тестовый файл
+    return bytes((0x01,)) + value.to_bytes(7, "big")
+
+
+def _element(element_id: int, payload: bytes) -> bytes:
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + \
+        _size(len(payload)) + payload
+
+
+def make_webm(packets, discard_padding_ns=0) -> bytes:
+    opus_head = b"OpusHead" + struct.pack("<BBHIhB", 1, 2, 312, 48000, 0, 0)
+    track = _element(0xAE, _element(0xD7, b"\x01") + _element(0x86, b"A_OPUS") +
+                     _element(0x63A2, opus_head))
+    blocks = b"".join(_element(0xA3, b"\x81" + struct.pack(">hB", i * 20 % 30000, 0x80) + p)
+                      for i, p in enumerate(packets[:-1]))
+    last = _element(0xA1, b"\x81" + struct.pack(">hB", 0, 0) + packets[-1])
+    blocks += _element(0xA0, last + _element(0x75A2, discard_padding_ns.to_bytes(4, "big")))
+    cluster = _element(0x1F43B675, _element(0xE7, b"\x00") + blocks)
+    info = _element(0x1549A966, _element(0x2AD7B1, (1_000_000).to_bytes(3, "big")) +
+                    _element(0x4489, struct.pack(">d", len(packets) * 20.0)))
+    # Segment с неизвестным размером, как при записи потока
+    segment = bytes.fromhex("18538067") + b"\x01\xff\xff\xff\xff\xff\xff\xff" + \
+        info + _element(0x1654AE6B, track) + cluster
+    return _element(0x1A45DFA3, _element(0x4282, b"webm")) + segment
+
+
+class TestWebmRemuxer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.webm_path = os.path.join(self.tmp_dir.name, "track.webm")
+        self.opus_path = os.path.join(self.tmp_dir.name, "track.opus")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_ogg_crc_matches_mutagen(self):
+        page = OggPage()
+        page.packets = [os.urandom(1000)]
+        data = page.write()
+        self.assertEqual(struct.unpack("<I", data[22:26])[0],
+                         ogg_crc(data[:22] + b"\x00" * 4 + data[26:]))
+
+    def test_packet_samples(self):
+        self.assertEqual(opus_packet_samples(bytes((31 << 3,))), 960)  # CELT 20 мс
+        self.assertEqual(opus_packet_samples(bytes((1 << 3 | 1,))), 1920)  # 2 x SILK 20 мс
+        self.assertEqual(opus_packet_samples(bytes((16 << 3 | 3, 3))), 360)
+
+    def test_remux_is_readable_by_mutagen(self):
+        # 250 пакетов по 20 мс = 5 секунд, больше одной страницы Ogg
+        packets = [bytes((31 << 3,)) + os.urandom(300) for _ in range(250)]
+        with open(self.webm_path, "wb") as f:
+            f.write(make_webm(packets, discard_padding_ns=10_000_000))
+
+        written = remux_webm_to_opus(self.webm_path, self.opus_path)
+        self.assertEqual(written, os.path.getsize(self.opus_path))
+
+        audio = OggOpus(self.opus_path)
+        self.assertEqual(audio.info.channels, 2)
+        # 5 с минус pre-skip (312 сэмплов) и DiscardPadding (10 мс)
+        self.assertAlmostEqual(audio.info.length, 5 - 312 / 48000 - 0.01, places=4)
+
+        audio["title"] = "Track"
+        audio.save()
+        self.assertEqual(OggOpus(self.opus_path)["title"], ["Track"])
+
+    def test_remux_writes_tags_and_large_cover(self):
+        packets = [bytes((31 << 3,)) + os.urandom(100) for _ in range(10)]
+        with open(self.webm_path, "wb") as f:
+            f.write(make_webm(packets))
+        # Обложка больше 64 КиБ не помещается в одну страницу Ogg
+        picture = Picture()
+        picture.data = os.urandom(100 * 1024)
+        picture.mime = "image/jpeg"
+        comments = {
+            "title": "Track = 1",
+            "METADATA_BLOCK_PICTURE": b64encode(picture.write()).decode("ascii")
+        }
+
+        remux_webm_to_opus(self.webm_path, self.opus_path, comments)
+
+        audio = OggOpus(self.opus_path)
+        self.assertEqual(audio["title"], ["Track = 1"])
+        cover = Picture(b64decode(audio["metadata_block_picture"][0]))
+        self.assertEqual(cover.data, picture.data)
+        self.assertAlmostEqual(audio.info.length, 0.2 - 312 / 48000, places=4)
+
+    def test_not_webm_removes_output(self):
+        with open(self.webm_path, "wb") as f:
+            f.write(b"ID3 not a webm file")
+        with self.assertRaises(WebmError):
+            remux_webm_to_opus(self.webm_path, self.opus_path)
+        self.assertFalse(os.path.exists(self.opus_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from src.filter import FIRST_VIDEO_YEAR, get_year_bounds
+
+
+class TestGetYearBounds(unittest.TestCase):
+
+    def test_lower_bound(self):
+        self.assertEqual(get_year_bounds("[x] >= 2024", last_year=2026), (2024, 2026))
+
+    def test_range(self):
+        self.assertEqual(get_year_bounds("2017 < [x] <= 2020", last_year=2026), (2018, 2020))
+
+    def test_set_of_years(self):
+        self.assertEqual(get_year_bounds("[x] in {2019, 2023}", last_year=2026), (2019, 2023))
+
+    def test_no_lower_bound(self):
+        self.assertEqual(get_year_bounds("([x] <= 2017) or ([x] >= 2020)", last_year=2026),
+                         (FIRST_VIDEO_YEAR, 2026))
+
+    def test_unsatisfiable(self):
+        self.assertIsNone(get_year_bounds("[x] < 2000", last_year=2026))
+
+    def test_invalid_expression_is_not_pushed_down(self):
+        self.assertEqual(get_year_bounds("[x] >=", last_year=2026), (FIRST_VIDEO_YEAR, 2026))
+
+
+if __name__ == '__main__':
+    unittest.main()